@@ -6,8 +6,11 @@ import json
 import time
 from db.session import get_db
 import asyncio
+from contextlib import aclosing
 from schemas.sandbox.chatbot import ChatRequest, ChatResponse
 from services.sandbox.chatbot.llm_service import MockLLMService, LLMService
+from services.sandbox.chatbot.response_cache import response_cache
+from services.sandbox.chatbot.semantic_cache import semantic_cache
 
 router = APIRouter(prefix="/playground/chatbot", tags=["Chatbot"])
 
@@ -17,6 +20,7 @@ llm_service = LLMService()
 @router.post("/chat", response_model=ChatResponse, response_model_exclude_unset=True)
 async def chat(
     request: ChatRequest,
+    http_request: Request,
     db: Session = Depends(get_db)
 ):
     """
@@ -41,7 +45,9 @@ async def chat(
         top_p=request.top_p,
         frequency_penalty=request.frequency_penalty,
         presence_penalty=request.presence_penalty,
-        stream=False
+        stream=False,
+        cache=request.cache,
+        semantic_cache=use_semantic_cache(http_request),
     ):
         response = chunk
     
@@ -53,6 +59,7 @@ async def chat(
 @router.post("/chat/stream")
 async def chat_stream(
     request: ChatRequest,
+    http_request: Request,
     db: Session = Depends(get_db)
 ):
     """
@@ -65,7 +72,7 @@ async def chat_stream(
         raise HTTPException(status_code=400, detail="Model must be specified")
         
     async def event_generator():
-        async for chunk in llm_service.generate_chat_completion(
+        completion = llm_service.generate_chat_completion(
             messages=request.messages,
             model=request.model,
             llm_alias=request.llm_alias,
@@ -75,16 +82,49 @@ async def chat_stream(
             top_p=request.top_p,
             frequency_penalty=request.frequency_penalty,
             presence_penalty=request.presence_penalty,
-            stream=True
-        ):
-            yield f"data: {json.dumps(chat_completion_chunk_to_dict(chunk))}\n\n"
-            await asyncio.sleep(0.01)
+            stream=True,
+            cache=request.cache,
+            semantic_cache=use_semantic_cache(http_request),
+        )
+        # aclosing: a disconnect closes the provider stream right away (and frees local model slots)
+        async with aclosing(completion):
+            async for chunk in completion:
+                if await http_request.is_disconnected():
+                    return
+                yield f"data: {json.dumps(chat_completion_chunk_to_dict(chunk))}\n\n"
+                await asyncio.sleep(0)
         
         yield 'data: [DONE]\n\n'
     
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
 
+@router.get("/cache/stats", description="Response cache hit ratio, bytes saved and tier sizes")
+def get_cache_stats():
+    return response_cache.stats()
+
+
+@router.get("/cache/semantic/stats", description="Semantic cache hit ratio, similarity and index sizes")
+def get_semantic_cache_stats():
+    return semantic_cache.stats()
+
+
+@router.get("/single-flight/stats", description="Upstream calls started vs identical in-flight requests coalesced onto them")
+def get_single_flight_stats():
+    return llm_service.single_flight.stats()
+
+
+@router.delete("/cache", status_code=204, description="Drop every cached chatbot response")
+def clear_cache():
+    response_cache.clear()
+    semantic_cache.clear()
+
+
+def use_semantic_cache(http_request: Request) -> bool:
+    """Requests sent with `X-Semantic-Cache: bypass` always reach the provider."""
+    return http_request.headers.get("X-Semantic-Cache", "").lower() != "bypass"
+
+
 def chat_completion_chunk_to_dict(chunk: Dict) -> Dict:
     """Convert a chat completion chunk to a dictionary."""
     return {
@@ -1,10 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import json
+import shutil
+import time
+import uuid
+from contextlib import aclosing
+from pathlib import Path
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, Form
+from fastapi.responses import StreamingResponse, FileResponse
 from typing import Optional, Dict
 from sqlalchemy.orm import Session
 from schemas.flows import FlowCreate, FlowOut, FlowPayload
+from schemas.batches import BatchJobOut
 from crud.flows import create_flow, get_flow_by_id, update_flow_by_id, delete_flow_by_id, get_flows
+from crud.batches import create_batch_job, get_batch_job_by_id, get_batch_jobs, get_row_latencies
 from db.session import get_db
+from core.config import root_dir, BATCH_STORAGE_DIR, BATCH_INPUT_DIR, BATCH_DEFAULT_CONCURRENCY, BATCH_MAX_CONCURRENCY, FLOW_RUN_STALE_AFTER_S
+from services.flows.batch import batch_runner, batch_job_stats
 from services.flows.codegen import CodeGenerator
+from services.flows.graph_cache import compiled_flow_cache
+from services.flows.codegen_cache import codegen_cache
+from services.flows.runner import FlowCompileError, FlowRunError, run_flow as execute_flow, stream_flow
+from services.flows.checkpoints import checkpoint_store
 
 router = APIRouter(
     prefix="/flows",
@@ -65,12 +81,14 @@ def delete_flow(id: int, db: Session = Depends(get_db)):
 ## Code Generation
 ##################
 
-@router.post("/generate/code", description="Generate flow code by submitting the canvas graph")
-def generate_flow_code(flow: FlowPayload):
+@router.post("/generate/code", description="Generate flow code by submitting the canvas graph. With `incremental`, also return the code version and a unified diff against `base_version`")
+def generate_flow_code(flow: FlowPayload, incremental: bool = False, base_version: Optional[str] = None, db: Session = Depends(get_db)):
     print(f"DEBUG: Starting code generation for flow: {flow.name}")
-    codegen = CodeGenerator()
+    codegen = CodeGenerator(db=db)
     try:
         print("DEBUG: Calling codegen.generate()")
+        if incremental or base_version:
+            return codegen.generate_incremental(flow, base_version)
         code = codegen.generate(flow)
         print("DEBUG: Code generation completed successfully")
     except Exception as e:
@@ -93,38 +111,189 @@ async def run_flow(
         flow = get_flow_by_id(db, id)
         if not flow:
             raise HTTPException(status_code=404, detail="Flow not found")
-        
-        # Create a simple execution for now
-        # TODO: Implement proper LangGraph execution
-        nodes = flow.graph.get('nodes', [])
-        edges = flow.graph.get('edges', [])
-        
-        # Extract and execute the first node (simplified execution)
-        if nodes and len(nodes) > 1:
-            execution_node = nodes[1] if nodes[0].get('type') == 'start' else nodes[0]
-            node_data = execution_node.get('data', {})
-            
-            # Simulate execution result
-            result = {
-                "message": f"Executed flow '{flow.name}' with node '{execution_node.get('data', {}).get('label', 'Unknown')}'",
-                "node_type": execution_node.get('type'),
-                "node_data": node_data,
-                "flow_id": id,
-                "input_data": input_data or {"messages": [{"content": "Start workflow"}]}
-            }
-        else:
-            result = {
-                "message": f"Flow '{flow.name}' executed (no execution nodes found)",
-                "flow_id": id,
-                "input_data": input_data or {"messages": [{"content": "Start workflow"}]}
-            }
-        
+
+        result = await execute_flow(flow, db, input_data)
         return {"result": result, "status": "success"}
-        
+
+    except HTTPException:
+        raise
+    except FlowCompileError as e:
+        raise HTTPException(status_code=422, detail=f"Failed to run flow: {str(e)}")
+    except FlowRunError as e:
+        resume = f" Resume it with POST /api/flows/runs/{e.run_id}/resume" if e.run_id else ""
+        raise HTTPException(status_code=500, detail=f"Failed to run flow: {str(e)}.{resume}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to run flow: {str(e)}")
 
 
+@router.get("/{id}/runs", description="List the checkpointed runs of a flow")
+def list_flow_runs(id: int, limit: int = 50):
+    return checkpoint_store.list_runs(id, limit)
+
+
+@router.get("/runs/{run_id}", description="Get a checkpointed run: status, input and the outputs of its completed nodes")
+def get_flow_run(run_id: str):
+    run = checkpoint_store.load_run(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return run
+
+
+@router.post("/runs/{run_id}/resume", description="Resume a failed or interrupted run from its last completed nodes")
+async def resume_flow_run(run_id: str, db: Session = Depends(get_db)):
+    run = checkpoint_store.load_run(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    if run["status"] == "completed":
+        raise HTTPException(status_code=409, detail="Run already completed")
+    if run["status"] == "running" and time.time() - run["updated_at"] < FLOW_RUN_STALE_AFTER_S:
+        raise HTTPException(status_code=409, detail="Run is still running")  # resumable once it has stopped checkpointing (e.g. the server died)
+    flow = get_flow_by_id(db, run["flow_id"])
+    if not flow:
+        raise HTTPException(status_code=404, detail="Flow not found")
+    try:
+        result = await execute_flow(flow, db, run=run)
+        return {"result": result, "status": "success"}
+    except FlowCompileError as e:
+        raise HTTPException(status_code=409, detail=f"Failed to resume run: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to resume run: {str(e)}")
+
+
+@router.post("/{id}/run/stream", description="Run a flow, streaming node, tool and token events over SSE")
+async def run_flow_stream(
+    id: int,
+    http_request: Request,
+    db: Session = Depends(get_db),
+    input_data: Optional[dict] = None
+):
+    """Execute a saved workflow by ID, streaming its progress as server-sent events"""
+    flow = get_flow_by_id(db, id)
+    if not flow:
+        raise HTTPException(status_code=404, detail="Flow not found")
+    try:
+        events = await stream_flow(flow, db, input_data)
+    except FlowCompileError as e:
+        raise HTTPException(status_code=422, detail=f"Failed to run flow: {str(e)}")
+
+    async def event_generator():
+        # aclosing: a disconnect cancels the run, including in-flight LLM streams
+        async with aclosing(events):
+            async for event in events:
+                if await http_request.is_disconnected():
+                    return
+                yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+        yield 'data: [DONE]\n\n'
+
+    return StreamingResponse(event_generator(), media_type="text/event-stream")
+
+
+#############
+## Batch Runs
+#############
+
+def _save_upload(file: UploadFile, destination: Path) -> None:
+    """Copy an upload to disk. Blocking: call it through `asyncio.to_thread` from a route."""
+    with open(destination, "wb") as f:
+        shutil.copyfileobj(file.file, f)
+
+
+@router.post("/{id}/batch", description="Run a flow over every row of a JSONL/CSV upload or server-side file", response_model=BatchJobOut)
+async def start_batch(
+    id: int,
+    file: Optional[UploadFile] = File(None),
+    path: Optional[str] = Form(None),
+    concurrency: int = Form(BATCH_DEFAULT_CONCURRENCY),
+    input_column: str = Form("input"),
+    db: Session = Depends(get_db)
+):
+    """Start a background batch job; rows with a `messages` field are used as is, otherwise `input_column` is the user message"""
+    if not get_flow_by_id(db, id):
+        raise HTTPException(status_code=404, detail="Flow not found")
+    if (file is None) == (path is None):
+        raise HTTPException(status_code=400, detail="Provide either an uploaded file or a server-side path")
+    if not 1 <= concurrency <= BATCH_MAX_CONCURRENCY:
+        raise HTTPException(status_code=400, detail=f"Concurrency must be between 1 and {BATCH_MAX_CONCURRENCY}")
+
+    job_dir = Path(BATCH_STORAGE_DIR) / f"flow_{id}_{uuid.uuid4().hex[:12]}"
+    (root_dir / job_dir).mkdir(parents=True, exist_ok=True)
+    if file is not None:
+        suffix = ".csv" if (file.filename or "").lower().endswith(".csv") else ".jsonl"
+        input_path = job_dir / f"input{suffix}"
+        await asyncio.to_thread(_save_upload, file, root_dir / input_path)
+    else:
+        allowed_dir = (root_dir / BATCH_INPUT_DIR).resolve()
+        resolved = (root_dir / path).resolve()
+        if not resolved.is_relative_to(allowed_dir) or not resolved.is_file():
+            raise HTTPException(status_code=400, detail=f"Path must be an existing file inside {BATCH_INPUT_DIR}")
+        input_path = resolved.relative_to(root_dir)
+
+    job = create_batch_job(db, flow_id=id, input_path=str(input_path), output_path=str(job_dir / "output.jsonl"), input_column=input_column, concurrency=concurrency)
+    batch_runner.start(job.id)
+    return job
+
+
+@router.get("/{id}/batch", description="List the batch jobs of a flow", response_model=list[BatchJobOut])
+def list_batches(id: int, db: Session = Depends(get_db)):
+    return get_batch_jobs(db, flow_id=id)
+
+
+@router.get("/batch/{job_id}", description="Batch job progress: rows done, errors, rows/s and p50/p95 latency", response_model=BatchJobOut)
+def get_batch(job_id: int, db: Session = Depends(get_db)):
+    job = get_batch_job_by_id(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    if batch_runner.is_running(job_id):
+        job.stats = batch_job_stats(job, get_row_latencies(db, job_id))
+    return job
+
+
+@router.get("/batch/{job_id}/results", description="Download the JSONL results of a batch job")
+def get_batch_results(job_id: int, db: Session = Depends(get_db)):
+    job = get_batch_job_by_id(db, job_id)
+    if not job or not (root_dir / job.output_path).exists():
+        raise HTTPException(status_code=404, detail="Batch results not found")
+    return FileResponse(root_dir / job.output_path, media_type="application/x-ndjson", filename=f"batch_{job_id}.jsonl")
+
+
+@router.post("/batch/{job_id}/cancel", description="Cancel a running batch job; it can be resumed later", response_model=BatchJobOut)
+async def cancel_batch(job_id: int, db: Session = Depends(get_db)):
+    job = get_batch_job_by_id(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    if not await batch_runner.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Batch job is not running")
+    db.refresh(job)
+    return job
+
+
+@router.post("/batch/{job_id}/resume", description="Resume a cancelled, failed or interrupted batch job from its last checkpoint", response_model=BatchJobOut)
+async def resume_batch(job_id: int, db: Session = Depends(get_db)):
+    job = get_batch_job_by_id(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    if batch_runner.is_running(job_id):
+        raise HTTPException(status_code=409, detail="Batch job is already running")
+    batch_runner.start(job_id)
+    return job
+
+
+@router.get("/metrics/compiled", description="Compiled flow cache counters (size, hits, misses, invalidations)")
+def get_compiled_flow_metrics():
+    return compiled_flow_cache.stats()
+
+
+@router.get("/metrics/codegen", description="Generated code and fragment cache counters")
+def get_codegen_metrics():
+    return codegen_cache.stats()
+
+
+@router.get("/metrics/checkpoints", description="Run checkpoint writes: count, raw vs stored bytes and average write time")
+def get_checkpoint_metrics():
+    return checkpoint_store.stats()
+
+
 @router.post("/{id}/test", description="Test a flow")
 async def test_flow(
     id: int, 
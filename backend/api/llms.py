@@ -5,6 +5,11 @@ from typing import Optional
 from sqlalchemy.orm import Session
 from db.session import get_db
 from services.llms.factory import get_llm_client_by_provider, get_llm_client_by_alias
+from services.llms.registry import llm_client_registry
+from services.llms.local.model_cache import model_residency_manager
+from services.llms.local.scheduler import local_inference_scheduler
+from services.llms.local.prompt_cache import prompt_cache_manager
+from services.llms.rate_limit import rate_limiter_registry
 
 
 router = APIRouter(prefix="/llms", tags=["LLM"])
@@ -16,6 +21,31 @@ def list_llms(limit: Optional[int] = None, db: Session = Depends(get_db)):
     return ListLLMs(api=[], local=[])
 
 
+@router.get("/metrics/clients", description="LLM client registry counters (size, hits, misses, evictions)")
+def get_client_registry_metrics():
+    return llm_client_registry.stats()
+
+
+@router.get("/metrics/local-models", description="Resident llama.cpp models: load time, resident size and hit rate")
+def get_local_model_metrics():
+    return model_residency_manager.stats()
+
+
+@router.get("/metrics/local-scheduler", description="Local inference queues: slots, queue depth and wait times per model")
+def get_local_scheduler_metrics():
+    return local_inference_scheduler.stats()
+
+
+@router.get("/metrics/rate-limits", description="Per-alias rate limiting: queue time, throttle events, retries and concurrency limit")
+def get_rate_limit_metrics():
+    return rate_limiter_registry.stats()
+
+
+@router.get("/metrics/prompt-cache", description="llama.cpp prompt KV-cache reuse: tokens reused vs evaluated")
+def get_prompt_cache_metrics():
+    return prompt_cache_manager.stats()
+
+
 ###########################
 ## Remote LLMs - though API
 ###########################
@@ -115,7 +145,7 @@ def list_local_llms(limit: Optional[int] = None, db: Session = Depends(get_db)):
 
 @router.post("/local")
 def new_local_llm(llm: LocalLLM, db: Session = Depends(get_db)):
-    return create_local_llm(db, llm.alias, llm.provider, llm.path)
+    return create_local_llm(db, llm.alias, llm.provider, llm.path, llm.parameters)
 
 
 @router.get("/local/{alias}", description="Get a local LLM by alias", response_model=LocalLLMOut)
@@ -125,7 +155,7 @@ def get_local_llm(alias: str = Path(..., description="The local LLM alias"), db:
 
 @router.put("/local/{alias}", description="Update a local LLM by alias")
 def update_local_llm(alias: str, llm: LocalLLM, db: Session = Depends(get_db)):
-    updated = update_local_llm_by_alias(db, alias, llm.provider, llm.path)
+    updated = update_local_llm_by_alias(db, alias, llm.provider, llm.path, llm.parameters)
     if not updated:
         raise HTTPException(status_code=404, detail="LLM not found")
     return updated
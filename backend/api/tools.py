@@ -1,10 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, Path
+import asyncio
+import shutil
+import uuid
+from pathlib import Path as FilePath
+from fastapi import APIRouter, Depends, HTTPException, Path, UploadFile, File, Form
 from schemas.tools import ToolOut, ToolCreate
+from schemas.ingestion import IngestionJobOut, IngestionManifestOut
 from crud.tools import get_tools, create_tool, get_tool_by_id, update_tool_by_id, delete_tool_by_id
-from typing import Optional
+from crud.ingestion import create_ingestion_job, get_ingestion_job_by_id, get_ingestion_jobs, get_manifest_summary
+from models.tools import ToolType
+from models.ingestion import IngestionMode
+from typing import List, Optional
 from sqlalchemy.orm import Session
 from db.session import get_db
+from core.config import root_dir, INGEST_STORAGE_DIR, INGEST_INPUT_DIR
 from services.tools.factory import get_tool as get_tool_object, get_tool_by_name
+from services.tools.rag.ingestion import ingestion_runner
+from core.templates import template_registry
 
 
 router = APIRouter(prefix="/tools", tags=["Tool"])
@@ -53,6 +64,138 @@ def preview_tool_code(tool: ToolCreate):
     return {"code": tool.to_code()}
 
 
+@router.get("/metrics/templates", description="Shared template environment: compiled templates, lookups and (re)loads")
+def get_template_stats():
+    return template_registry.stats()
+
+
+#####################
+## Document Ingestion
+#####################
+
+def _get_rag_tool(db: Session, id: int):
+    tool = get_tool_by_id(db, id)
+    if not tool:
+        raise HTTPException(status_code=404, detail="Tool not found")
+    if tool.type != ToolType.RAG:
+        raise HTTPException(status_code=400, detail="Only RAG tools can ingest documents")
+    try:
+        get_tool_object(tool)  # the ingestion job needs its vector writer
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    _check_no_running_ingestion(db, id)
+    return tool
+
+
+def _check_no_running_ingestion(db: Session, tool_id: int) -> None:
+    """One job per tool at a time: two pipelines writing the same collection and manifest would race.
+
+    Checks every job of the tool, not just RUNNING ones: a job that was just started or resumed
+    keeps its previous status until its task has listed the input files.
+    """
+    if any(ingestion_runner.is_running(job.id) for job in get_ingestion_jobs(db, tool_id=tool_id)):
+        raise HTTPException(status_code=409, detail="An ingestion job is already running for this tool")
+
+
+def _save_upload(file: UploadFile, destination: FilePath) -> None:
+    """Copy an upload to disk. Blocking: call it through `asyncio.to_thread` from a route."""
+    with open(destination, "wb") as f:
+        shutil.copyfileobj(file.file, f)
+
+
+def _server_side_path(path: str) -> FilePath:
+    allowed_dir = (root_dir / INGEST_INPUT_DIR).resolve()
+    resolved = (root_dir / path).resolve()
+    if not resolved.is_relative_to(allowed_dir) or not resolved.exists():
+        raise HTTPException(status_code=400, detail=f"Path must be an existing file or directory inside {INGEST_INPUT_DIR}")
+    return resolved.relative_to(root_dir)
+
+
+@router.post("/{id}/ingest", description="Parse, chunk, embed and write documents into a RAG tool's collection", response_model=IngestionJobOut)
+async def start_ingestion(
+    id: int,
+    files: Optional[List[UploadFile]] = File(None),
+    path: Optional[str] = Form(None),
+    db: Session = Depends(get_db)
+):
+    """Start a background ingestion job over uploaded files or a server-side file or directory"""
+    _get_rag_tool(db, id)
+    if (not files) == (path is None):
+        raise HTTPException(status_code=400, detail="Provide either uploaded files or a server-side path")
+
+    if files:
+        input_path = FilePath(INGEST_STORAGE_DIR) / f"tool_{id}_{uuid.uuid4().hex[:12]}"
+        (root_dir / input_path).mkdir(parents=True, exist_ok=True)
+        for file in files:
+            await asyncio.to_thread(_save_upload, file, root_dir / input_path / FilePath(file.filename or "upload.txt").name)
+    else:
+        input_path = _server_side_path(path)
+
+    job = create_ingestion_job(db, tool_id=id, input_path=str(input_path))
+    ingestion_runner.start(job.id)
+    return job
+
+
+@router.post("/{id}/reindex", description="Bring a RAG tool's collection up to date with its source_path: only changed files are re-embedded", response_model=IngestionJobOut)
+async def start_reindex(id: int, db: Session = Depends(get_db)):
+    """Start a background reindex of the directory in the tool's `source_path` config; chunks of removed files are deleted"""
+    tool = _get_rag_tool(db, id)
+    source_path = (tool.config or {}).get("source_path")
+    if not source_path:
+        raise HTTPException(status_code=400, detail="Set source_path in the tool config to reindex it")
+    job = create_ingestion_job(db, tool_id=id, input_path=str(_server_side_path(source_path)), mode=IngestionMode.REINDEX)
+    ingestion_runner.start(job.id)
+    return job
+
+
+@router.get("/{id}/manifest", description="What a RAG tool's collection holds according to its manifest: files, chunks and bytes", response_model=IngestionManifestOut)
+def get_manifest(id: int, db: Session = Depends(get_db)):
+    tool = get_tool_by_id(db, id)
+    if not tool or tool.type != ToolType.RAG:
+        raise HTTPException(status_code=404, detail="RAG tool not found")
+    collection = tool.config.get("index_name", "default")
+    return {"tool_id": id, "collection": collection, "source_path": tool.config.get("source_path"), **get_manifest_summary(db, id, collection)}
+
+
+@router.get("/{id}/ingest", description="List the ingestion jobs of a RAG tool", response_model=list[IngestionJobOut])
+def list_ingestions(id: int, db: Session = Depends(get_db)):
+    return get_ingestion_jobs(db, tool_id=id)
+
+
+@router.get("/ingestion/{job_id}", description="Ingestion job progress: files processed, skipped and failed, docs/s and chunks/s", response_model=IngestionJobOut)
+def get_ingestion(job_id: int, db: Session = Depends(get_db)):
+    job = get_ingestion_job_by_id(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    live_stats = ingestion_runner.live_stats(job_id)
+    if live_stats is not None:
+        job.stats = live_stats
+    return job
+
+
+@router.post("/ingestion/{job_id}/cancel", description="Stop a running ingestion job; it can be resumed later", response_model=IngestionJobOut)
+async def cancel_ingestion(job_id: int, db: Session = Depends(get_db)):
+    job = get_ingestion_job_by_id(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    if not await ingestion_runner.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Ingestion job is not running")
+    db.refresh(job)
+    return job
+
+
+@router.post("/ingestion/{job_id}/resume", description="Resume a cancelled, failed or interrupted ingestion job; files already written are skipped", response_model=IngestionJobOut)
+async def resume_ingestion(job_id: int, db: Session = Depends(get_db)):
+    job = get_ingestion_job_by_id(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    if ingestion_runner.is_running(job_id):
+        raise HTTPException(status_code=409, detail="Ingestion job is already running")
+    _check_no_running_ingestion(db, job.tool_id)
+    ingestion_runner.start(job_id)
+    return job
+
+
 @router.get("/{name}/default_agent_prompts")
 def get_default_agent_prompts(name: str = Path(..., description="Tool name"), db: Session = Depends(get_db)):
     tool = get_tool_by_name(db, name)
@@ -0,0 +1,296 @@
+"""
+Benchmark CodeGenerator on synthetic flows of increasing size.
+
+Flows of 10/100/1000 agent nodes cycle through every tool type the tool factory supports
+and through remote LLM aliases of every provider, all seeded into an in-memory SQLite
+database. Each size is generated in three scenarios:
+
+    cold: codegen and LLM client caches cleared, as after a restart
+    edit: one node's prompt changed since the previous generation
+    warm: the same graph again (output cache hit)
+
+and each run records end-to-end time plus the time spent in DB lookups (tool and LLM
+client fetches), template rendering and edge resolution, and the number of SQL queries.
+
+Usage (from backend/):
+    python -m benchmarks.codegen --save benchmarks/results/base.json
+    python -m benchmarks.codegen --compare benchmarks/results/base.json
+
+With --compare the run exits with status 1 when an end-to-end median regressed by more
+than --threshold (relative) and --min-delta-ms (absolute).
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Backend modules read the key and database URL at import time: point them at throwaway ones.
+if "FERNET_SECRET_KEY" not in os.environ:
+    from cryptography.fernet import Fernet
+    _key_path = Path(tempfile.mkdtemp(prefix="codegen-bench-")) / "fernet.key"
+    _key_path.write_bytes(Fernet.generate_key())
+    os.environ["FERNET_SECRET_KEY"] = str(_key_path)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from jinja2 import Template
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from crud.llms import create_remote_llm
+from crud.tools import create_tool
+from db.base import Base
+from models.llms import LLMRemote, LLMLocal  # noqa: F401 (registers the tables)
+from models.tools import Tool, ToolType  # noqa: F401
+from schemas.flows import FlowPayload
+from services.flows import codegen as codegen_module
+from services.flows.codegen import CodeGenerator
+from services.flows.codegen_cache import codegen_cache
+from services.llms.registry import llm_client_registry
+
+
+DEFAULT_SIZES = [10, 100, 1000]
+SCENARIOS = ["cold", "edit", "warm"]
+PHASES = ["end_to_end", "db_lookup", "template_render", "edge_resolution"]
+NODES_PER_TOOL = 5  # nodes sharing a tool, so larger flows also reference more tools
+
+# One config per tool implementation in services/tools/factory.py
+TOOL_CONFIGS = [
+    (ToolType.RAG, {"library": "chromadb", "vector_store_path": "storage/chroma", "index_name": "docs", "retriever_top_k": 3}),
+    (ToolType.RAG, {"library": "qdrant", "vector_store_url": "http://localhost:6333", "index_name": "docs", "retriever_top_k": 3}),
+    (ToolType.WEB_SEARCH, {"library": "duckduckgo", "max_results": 5}),
+    (ToolType.API_CALL, {"base_url": "https://api.example.com", "endpoint": "/v1/items", "http_method": "GET", "auth_type": "bearer", "auth_token": "token"}),
+    (ToolType.SAP, {"system_url": "https://sap.example.com", "client": "100", "auth_type": "basic", "username": "user", "password": "secret"}),
+    (ToolType.DATABRICKS, {"workspace_url": "https://example.cloud.databricks.com", "sql_warehouse_id": "wh", "access_token": "token"}),
+    (ToolType.WORKDAY, {"tenant_url": "https://wd.example.com", "tenant_name": "acme", "client_id": "id", "client_secret": "secret"}),
+    (ToolType.SALESFORCE, {"instance_url": "https://acme.my.salesforce.com", "access_token": "token", "default_object": "Account"}),
+]
+LLMS = [("bench-openai", "openai", "gpt-4o"), ("bench-anthropic", "anthropic", "claude-sonnet-4-5"), ("bench-hf", "huggingface", "meta-llama/Llama-3.1-8B-Instruct")]
+
+
+def tool_name(index: int) -> str:
+    return f"bench tool {index}"
+
+
+def seed_database(session, tool_count: int) -> None:
+    """Create `tool_count` tools cycling through every tool type, and one remote LLM per provider."""
+    for i in range(tool_count):
+        tool_type, config = TOOL_CONFIGS[i % len(TOOL_CONFIGS)]
+        create_tool(session, tool_name(i), f"Synthetic {tool_type.value} tool", tool_type, config, None, True)
+    for alias, provider, _ in LLMS:
+        create_remote_llm(session, alias, provider, "sk-benchmark")
+
+
+def synthetic_flow(size: int, revision: int = 0) -> FlowPayload:
+    """
+    A flow of `size` agent nodes between a start and an end node.
+
+    Nodes form a chain with a skip edge every third node, so there are about 1.3 edges per
+    node. `revision` changes the system prompt of the middle node, to simulate an edit.
+    """
+    nodes = [{"id": "start", "type": "start", "position": {"x": 0, "y": 0}, "data": {"label": "Start", "type": "start"}}]
+    for i in range(size):
+        alias, _, model = LLMS[i % len(LLMS)]
+        system_prompt = f"You are agent {i}. Answer using the tool output."
+        if revision and i == size // 2:
+            system_prompt += f" Revision {revision}."
+        nodes.append({
+            "id": f"n{i}",
+            "type": "agent",
+            "position": {"x": 200 * (i % 10), "y": 150 * (i // 10)},
+            "data": {
+                "label": f"Agent {i}",
+                "description": f"Synthetic agent {i}",
+                "type": "agent",
+                "tool": {"name": tool_name(i // NODES_PER_TOOL)},
+                "llm": {"alias": alias, "model": model, "type": "remote"},
+                "node": {"systemPrompt": system_prompt, "userPrompt": "{context}\n\n{query}", "inputFormat": 'messages[-1]["content"]', "outputMode": "text"},
+            },
+        })
+    nodes.append({"id": "end", "type": "end", "position": {"x": 0, "y": 150 * (size // 10 + 1)}, "data": {"label": "End", "type": "end"}})
+
+    ids = [node["id"] for node in nodes]
+    pairs = list(zip(ids, ids[1:])) + [(ids[i], ids[i + 2]) for i in range(1, len(ids) - 2, 3)]
+    edges = [
+        {"id": f"e{source}-{target}", "type": "default", "source": source, "target": target, "sourceHandle": None, "targetHandle": None, "style": None, "markerEnd": None}
+        for source, target in pairs
+    ]
+    return FlowPayload(name=f"bench-{size}", graph={"nodes": nodes, "edges": edges})
+
+
+class PhaseTimer:
+    """Accumulates time spent in wrapped functions, per phase."""
+    def __init__(self):
+        self.seconds = {phase: 0.0 for phase in PHASES}
+        self.queries = 0
+        self._depth = {phase: 0 for phase in PHASES}
+
+    def wrap(self, phase: str, fn):
+        def timed(*args, **kwargs):
+            # Only the outermost call counts, so nested renders aren't counted twice.
+            self._depth[phase] += 1
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._depth[phase] -= 1
+                if self._depth[phase] == 0:
+                    self.seconds[phase] += time.perf_counter() - started
+        return timed
+
+    def count_query(self, *args) -> None:
+        self.queries += 1
+
+
+@contextlib.contextmanager
+def instrumented(engine, timer: PhaseTimer):
+    """Route the codegen path's DB lookups, template renders and edge resolution through `timer`."""
+    patches = [
+        (CodeGenerator, "preload", timer.wrap("db_lookup", CodeGenerator.preload)),
+        (codegen_module, "get_tool_by_name", timer.wrap("db_lookup", codegen_module.get_tool_by_name)),
+        (codegen_module, "get_llm_client_by_alias", timer.wrap("db_lookup", codegen_module.get_llm_client_by_alias)),
+        (Template, "render", timer.wrap("template_render", Template.render)),
+        (CodeGenerator, "resolve_edges", timer.wrap("edge_resolution", CodeGenerator.resolve_edges)),
+    ]
+    originals = [(owner, name, getattr(owner, name)) for owner, name, _ in patches]
+    for owner, name, replacement in patches:
+        setattr(owner, name, replacement)
+    event.listen(engine, "before_cursor_execute", timer.count_query)
+    try:
+        yield
+    finally:
+        event.remove(engine, "before_cursor_execute", timer.count_query)
+        for owner, name, original in originals:
+            setattr(owner, name, original)
+
+
+def run_once(engine, session_factory, flow: FlowPayload) -> dict:
+    timer = PhaseTimer()
+    session = session_factory()
+    try:
+        # The generator prints and logs every node; keep that off the console (its file log still runs).
+        with instrumented(engine, timer), contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            CodeGenerator(db=session).generate(flow)
+            timer.seconds["end_to_end"] = time.perf_counter() - started
+    finally:
+        session.close()
+    return {**{f"{phase}_ms": seconds * 1000 for phase, seconds in timer.seconds.items()}, "db_queries": timer.queries}
+
+
+def benchmark_size(engine, session_factory, size: int, repeat: int) -> dict:
+    """Median of `repeat` runs of each scenario for a flow of `size` nodes."""
+    runs = {scenario: [] for scenario in SCENARIOS}
+    for attempt in range(repeat):
+        codegen_cache.clear()
+        llm_client_registry.clear()
+        runs["cold"].append(run_once(engine, session_factory, synthetic_flow(size)))
+        runs["edit"].append(run_once(engine, session_factory, synthetic_flow(size, revision=attempt + 1)))
+        runs["warm"].append(run_once(engine, session_factory, synthetic_flow(size, revision=attempt + 1)))
+    return {
+        scenario: {metric: statistics.median(run[metric] for run in scenario_runs) for metric in scenario_runs[0]}
+        for scenario, scenario_runs in runs.items()
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(sizes, repeat: int) -> dict:
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with contextlib.closing(session_factory()) as session:
+        seed_database(session, max(sizes) // NODES_PER_TOOL + 1)
+
+    logging.disable(logging.INFO)
+    try:
+        # Untimed warm-up: imports of provider SDKs and template compilation happen once per process, not per cold run.
+        run_once(engine, session_factory, synthetic_flow(min(sizes)))
+        results = {str(size): benchmark_size(engine, session_factory, size, repeat) for size in sizes}
+    finally:
+        logging.disable(logging.NOTSET)
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float, min_delta_ms: float) -> list:
+    """
+    Print current vs baseline end-to-end medians.
+
+    Returns:
+        list: (size, scenario) pairs that regressed beyond both thresholds.
+    """
+    regressions = []
+    print(f"\nvs {baseline['meta']['revision']} (end-to-end median, ms)")
+    for size, scenarios in current["results"].items():
+        for scenario, metrics in scenarios.items():
+            base = baseline["results"].get(size, {}).get(scenario)
+            if base is None:
+                continue
+            before, after = base["end_to_end_ms"], metrics["end_to_end_ms"]
+            ratio = after / before if before else float("inf")
+            regressed = after - before > min_delta_ms and ratio > 1 + threshold
+            if regressed:
+                regressions.append((size, scenario))
+            print(f"  {size:>5} {scenario:<5} {before:10.2f} -> {after:10.2f}  x{ratio:5.2f}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def print_results(report: dict) -> None:
+    print(f"codegen benchmark @ {report['meta']['revision']} (median of {report['meta']['repeat']}, ms)")
+    print(f"  {'nodes':>5} {'run':<5} {'total':>10} {'db':>10} {'render':>10} {'edges':>10} {'queries':>8}")
+    for size, scenarios in report["results"].items():
+        for scenario, m in scenarios.items():
+            print(
+                f"  {size:>5} {scenario:<5} {m['end_to_end_ms']:10.2f} {m['db_lookup_ms']:10.2f} "
+                f"{m['template_render_ms']:10.2f} {m['edge_resolution_ms']:10.2f} {m['db_queries']:8.0f}"
+            )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark flow code generation on synthetic flows.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Agent node counts")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per size and scenario (the median is kept)")
+    parser.add_argument("--save", type=Path, help="Write the results as a JSON baseline")
+    parser.add_argument("--compare", type=Path, help="Baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Relative end-to-end slowdown counted as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="Ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.repeat)
+    print_results(report)
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(report, indent=2))
+        print(f"\nSaved to {args.save}")
+    if args.compare:
+        regressions = compare(json.loads(args.compare.read_text()), report, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""Runtime settings, overridable through environment variables (see root .env)."""
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+
+
+root_dir = Path(__file__).resolve().parents[2]
+load_dotenv(root_dir / ".env")
+
+
+# LLM client registry (services/llms/registry.py)
+LLM_CLIENT_CACHE_SIZE = int(os.getenv("LLM_CLIENT_CACHE_SIZE", "32"))
+
+# Local inference (services/llms/local/)
+LOCAL_INFERENCE_MAX_WORKERS = int(os.getenv("LOCAL_INFERENCE_MAX_WORKERS", "4"))
+LOCAL_STREAM_BUFFER_SIZE = int(os.getenv("LOCAL_STREAM_BUFFER_SIZE", "64"))
+LLAMA_CPP_MAX_RESIDENT_MODELS = int(os.getenv("LLAMA_CPP_MAX_RESIDENT_MODELS", "2"))
+LLAMA_CPP_MEMORY_BUDGET_MB = int(os.getenv("LLAMA_CPP_MEMORY_BUDGET_MB", "0"))  # 0 = no limit
+LLAMA_CPP_DEFAULT_SLOTS = int(os.getenv("LLAMA_CPP_DEFAULT_SLOTS", "1"))
+LOCAL_SCHEDULER_MAX_QUEUE_DEPTH = int(os.getenv("LOCAL_SCHEDULER_MAX_QUEUE_DEPTH", "32"))
+LOCAL_SCHEDULER_QUEUE_TIMEOUT_S = float(os.getenv("LOCAL_SCHEDULER_QUEUE_TIMEOUT_S", "120"))
+LLAMA_CPP_PROMPT_CACHE_MB = int(os.getenv("LLAMA_CPP_PROMPT_CACHE_MB", "512"))
+
+# Chatbot response cache (services/sandbox/chatbot/response_cache.py)
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+RESPONSE_CACHE_MAX_MEMORY_MB = int(os.getenv("RESPONSE_CACHE_MAX_MEMORY_MB", "64"))  # byte budget of the in-memory tier, on top of the entry cap
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "storage/response_cache.db")  # empty = memory only
+RESPONSE_CACHE_TTL_S = float(os.getenv("RESPONSE_CACHE_TTL_S", str(7 * 24 * 3600)))
+RESPONSE_CACHE_MAX_DISK_MB = int(os.getenv("RESPONSE_CACHE_MAX_DISK_MB", "256"))
+
+# Chatbot semantic cache (services/sandbox/chatbot/semantic_cache.py)
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+SEMANTIC_CACHE_EMBEDDER = os.getenv("SEMANTIC_CACHE_EMBEDDER", "hashing")  # or sentence-transformers:<model>
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "10000"))
+SEMANTIC_CACHE_TTL_S = float(os.getenv("SEMANTIC_CACHE_TTL_S", str(24 * 3600)))
+# hnswlib is an optional dependency (the "ann" extra in pyproject.toml); without it every index is searched by brute force
+SEMANTIC_CACHE_ANN_THRESHOLD = int(os.getenv("SEMANTIC_CACHE_ANN_THRESHOLD", "2048"))  # HNSW above this, if hnswlib is installed
+
+# Coalescing of identical in-flight chatbot requests (services/sandbox/chatbot/single_flight.py)
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Provider rate limiting (services/llms/rate_limit.py); 0 rpm/tpm = learn from response headers
+RATE_LIMIT_DEFAULT_RPM = float(os.getenv("RATE_LIMIT_DEFAULT_RPM", "0"))
+RATE_LIMIT_DEFAULT_TPM = float(os.getenv("RATE_LIMIT_DEFAULT_TPM", "0"))
+RATE_LIMIT_INITIAL_CONCURRENCY = int(os.getenv("RATE_LIMIT_INITIAL_CONCURRENCY", "8"))
+RATE_LIMIT_MIN_CONCURRENCY = int(os.getenv("RATE_LIMIT_MIN_CONCURRENCY", "1"))
+RATE_LIMIT_MAX_CONCURRENCY = int(os.getenv("RATE_LIMIT_MAX_CONCURRENCY", "64"))
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "4"))
+RATE_LIMIT_BACKOFF_BASE_S = float(os.getenv("RATE_LIMIT_BACKOFF_BASE_S", "0.5"))
+RATE_LIMIT_BACKOFF_MAX_S = float(os.getenv("RATE_LIMIT_BACKOFF_MAX_S", "30"))
+
+# Flow execution (services/flows/runner.py)
+FLOW_GRAPH_CACHE_SIZE = int(os.getenv("FLOW_GRAPH_CACHE_SIZE", "64"))
+FLOW_TOOL_MAX_WORKERS = int(os.getenv("FLOW_TOOL_MAX_WORKERS", "16"))
+FLOW_STREAM_QUEUE_SIZE = int(os.getenv("FLOW_STREAM_QUEUE_SIZE", "64"))
+
+# Flow run checkpoints (services/flows/checkpoints.py)
+FLOW_CHECKPOINTS_ENABLED = os.getenv("FLOW_CHECKPOINTS_ENABLED", "true").lower() in ("1", "true", "yes")
+FLOW_CHECKPOINT_PATH = os.getenv("FLOW_CHECKPOINT_PATH", "storage/flow_checkpoints.db")
+FLOW_CHECKPOINT_TTL_S = float(os.getenv("FLOW_CHECKPOINT_TTL_S", str(7 * 24 * 3600)))
+FLOW_CHECKPOINT_COMPRESS_MIN_BYTES = int(os.getenv("FLOW_CHECKPOINT_COMPRESS_MIN_BYTES", "1024"))
+FLOW_RUN_STALE_AFTER_S = float(os.getenv("FLOW_RUN_STALE_AFTER_S", "600"))  # a "running" run untouched this long is presumed dead and may be resumed
+
+# Batch flow runs (services/flows/batch.py); paths are relative to the repository root
+BATCH_STORAGE_DIR = os.getenv("BATCH_STORAGE_DIR", "storage/batches")  # uploads and result files
+BATCH_INPUT_DIR = os.getenv("BATCH_INPUT_DIR", "storage")  # server-side input paths must be inside it
+BATCH_DEFAULT_CONCURRENCY = int(os.getenv("BATCH_DEFAULT_CONCURRENCY", "4"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "32"))
+BATCH_CHECKPOINT_ROWS = int(os.getenv("BATCH_CHECKPOINT_ROWS", "50"))
+BATCH_CHECKPOINT_INTERVAL_S = float(os.getenv("BATCH_CHECKPOINT_INTERVAL_S", "2"))
+
+# Code generation caches (services/flows/codegen_cache.py)
+CODEGEN_CACHE_SIZE = int(os.getenv("CODEGEN_CACHE_SIZE", "128"))
+CODEGEN_FRAGMENT_CACHE_SIZE = int(os.getenv("CODEGEN_FRAGMENT_CACHE_SIZE", "2048"))
+
+# Shared Jinja environment for code templates (core/templates.py)
+TEMPLATE_AUTO_RELOAD = os.getenv("TEMPLATE_AUTO_RELOAD", "false").lower() in ("1", "true", "yes")  # dev only: re-check files on every lookup
+TEMPLATE_BYTECODE_CACHE_DIR = os.getenv("TEMPLATE_BYTECODE_CACHE_DIR", "")  # e.g. storage/template_cache; empty = in-memory only
+
+# Defaults baked into the HTTP runtime of generated tool code (templates/tools/runtime/http.jinja);
+# the generated module reads HTTP_POOL_SIZE etc. from its own environment first
+HTTP_RUNTIME_POOL_SIZE = int(os.getenv("HTTP_RUNTIME_POOL_SIZE", "10"))
+HTTP_RUNTIME_TIMEOUT_S = float(os.getenv("HTTP_RUNTIME_TIMEOUT_S", "30"))
+HTTP_RUNTIME_MAX_RETRIES = int(os.getenv("HTTP_RUNTIME_MAX_RETRIES", "2"))
+HTTP_RUNTIME_TOKEN_REFRESH_MARGIN_S = float(os.getenv("HTTP_RUNTIME_TOKEN_REFRESH_MARGIN_S", "60"))
+
+# Defaults for generated RAG tools (templates/tools/rag/); a tool's config overrides them
+# with query_cache_size, query_cache_ttl_s and warm_up
+RAG_QUERY_CACHE_SIZE = int(os.getenv("RAG_QUERY_CACHE_SIZE", "128"))  # 0 disables the per-query result cache
+RAG_QUERY_CACHE_TTL_S = float(os.getenv("RAG_QUERY_CACHE_TTL_S", "300"))
+RAG_WARM_UP = os.getenv("RAG_WARM_UP", "true").lower() in ("1", "true", "yes")  # build clients and load the index on import
+
+# RAG document ingestion (services/tools/rag/ingestion.py); paths are relative to the repository root
+INGEST_STORAGE_DIR = os.getenv("INGEST_STORAGE_DIR", "storage/ingest")  # uploaded documents
+INGEST_INPUT_DIR = os.getenv("INGEST_INPUT_DIR", "storage")  # server-side input paths must be inside it
+INGEST_EMBEDDING_MODEL = os.getenv("INGEST_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")  # local model name or path
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "1000"))  # characters
+INGEST_CHUNK_OVERLAP = int(os.getenv("INGEST_CHUNK_OVERLAP", "150"))
+INGEST_EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "64"))  # chunks per embedding call and vector store write
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "8"))  # items buffered between pipeline stages
+INGEST_PROGRESS_INTERVAL_S = float(os.getenv("INGEST_PROGRESS_INTERVAL_S", "1"))
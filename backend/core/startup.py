@@ -1,7 +1,9 @@
 from db.init_db import init_db
 from utils.security import generate_fernet_key_file
+from core.templates import template_registry
 
 
 def startup():
     generate_fernet_key_file()  # generate fernet key if it doesn't exist
     init_db()  # initialize DB if it doesn't exist
+    template_registry.precompile()  # compile code templates before the first codegen/preview request
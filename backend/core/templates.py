@@ -0,0 +1,95 @@
+"""Process-wide Jinja environment for the code templates under backend/templates."""
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template, select_autoescape
+from core.config import root_dir, TEMPLATE_AUTO_RELOAD, TEMPLATE_BYTECODE_CACHE_DIR
+
+
+templates_dir = Path(__file__).resolve().parents[1] / "templates"
+
+
+class _CountingLoader(FileSystemLoader):
+    """FileSystemLoader that counts source reads, i.e. template (re)compilations."""
+    def __init__(self, searchpath):
+        super().__init__(searchpath)
+        self.loads = 0
+
+    def get_source(self, environment, template):
+        self.loads += 1
+        return super().get_source(environment, template)
+
+
+class TemplateRegistry:
+    """
+    Shares one Jinja environment, and so one cache of compiled templates, across tools, LLM
+    clients and code generation.
+
+    Templates are compiled once per process (`precompile` runs them all at startup) and, when
+    a bytecode cache directory is configured, their compiled code is kept on disk so a restart
+    skips parsing too. Template files are only re-checked for changes with `auto_reload`, which
+    is meant for development: in production every lookup is a plain dict hit.
+
+    Attributes:
+        env (Environment): The shared environment; `get_template` on it is safe across threads.
+        auto_reload (bool): Re-check template mtimes on every lookup.
+    """
+    def __init__(self, path: Path = templates_dir, auto_reload: bool = TEMPLATE_AUTO_RELOAD, bytecode_cache_dir: Optional[str] = TEMPLATE_BYTECODE_CACHE_DIR):
+        self._loader = _CountingLoader(str(path))
+        bytecode_cache = None
+        if bytecode_cache_dir:
+            cache_path = (root_dir / bytecode_cache_dir).resolve()
+            cache_path.mkdir(parents=True, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(str(cache_path))
+        self.auto_reload = auto_reload
+        self.env = Environment(
+            loader=self._loader,
+            autoescape=select_autoescape(),
+            auto_reload=auto_reload,
+            bytecode_cache=bytecode_cache,
+            cache_size=-1,  # never evict: the template set is small and fixed
+        )
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.precompile_seconds = None
+
+
+    def get_template(self, template_name: str) -> Template:
+        with self._lock:
+            self.lookups += 1
+        return self.env.get_template(template_name)
+
+
+    def render(self, template_name: str, **kwargs) -> str:
+        return self.get_template(template_name).render(**kwargs)
+
+
+    def precompile(self) -> int:
+        """
+        Compile every template up front so the first codegen or preview request doesn't pay for it.
+
+        Returns:
+            int: Number of templates compiled.
+        """
+        started = time.perf_counter()
+        names = self.env.list_templates(extensions=["jinja", "jinja2"])
+        for name in names:
+            self.env.get_template(name)
+        self.precompile_seconds = time.perf_counter() - started
+        return len(names)
+
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "auto_reload": self.auto_reload,
+                "bytecode_cache": self.env.bytecode_cache is not None,
+                "compiled": len(self.env.cache) if self.env.cache is not None else 0,
+                "lookups": self.lookups,
+                "loads": self._loader.loads,
+                "precompile_ms": self.precompile_seconds * 1000 if self.precompile_seconds is not None else None,
+            }
+
+
+template_registry = TemplateRegistry()
@@ -0,0 +1,52 @@
+from sqlalchemy.orm import Session
+from models.batches import BatchJob, BatchRow, BatchStatus
+from typing import List, Optional, Set
+
+
+def create_batch_job(db: Session, flow_id: int, input_path: str, output_path: str, input_column: str, concurrency: int) -> BatchJob:
+    job = BatchJob(flow_id=flow_id, input_path=input_path, output_path=output_path, input_column=input_column, concurrency=concurrency)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def get_batch_job_by_id(db: Session, job_id: int):
+    return db.query(BatchJob).filter(BatchJob.id == job_id).first()
+
+
+def get_batch_jobs(db: Session, flow_id: Optional[int] = None, status: Optional[BatchStatus] = None):
+    query = db.query(BatchJob)
+    if flow_id is not None:
+        query = query.filter(BatchJob.flow_id == flow_id)
+    if status is not None:
+        query = query.filter(BatchJob.status == status)
+    return query.order_by(BatchJob.id.desc()).all()
+
+
+def get_processed_row_indices(db: Session, job_id: int) -> Set[int]:
+    return {row_index for (row_index,) in db.query(BatchRow.row_index).filter(BatchRow.job_id == job_id)}
+
+
+def get_row_latencies(db: Session, job_id: int) -> List[float]:
+    return [latency for (latency,) in db.query(BatchRow.latency_ms).filter(BatchRow.job_id == job_id)]
+
+
+def checkpoint_batch_rows(db: Session, job: BatchJob, rows: List[dict], output_offset: int, run_seconds: float) -> BatchJob:
+    """Record processed rows and the job's progress in one transaction."""
+    db.bulk_insert_mappings(BatchRow, [{"job_id": job.id, **row} for row in rows])
+    job.completed_rows += sum(1 for row in rows if not row.get("error"))
+    job.failed_rows += sum(1 for row in rows if row.get("error"))
+    job.output_offset = output_offset
+    job.run_seconds = run_seconds
+    db.commit()
+    return job
+
+
+def update_batch_job_status(db: Session, job: BatchJob, status: BatchStatus, **fields) -> BatchJob:
+    job.status = status
+    for key, value in fields.items():
+        setattr(job, key, value)
+    db.commit()
+    db.refresh(job)
+    return job
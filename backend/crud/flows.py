@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
 from models.flows import Flow
+from services.flows.graph_cache import compiled_flow_cache
 from typing import Optional
 
 def create_flow(db: Session, name: str, description: str, graph: dict, state: dict) -> Flow:
@@ -30,6 +31,7 @@ def update_flow_by_id(db: Session, flow_id: int, name: str, description: str, gr
     flow.state = state
     db.commit()
     db.refresh(flow)
+    compiled_flow_cache.invalidate_flow(flow_id)
     return flow
 
 
@@ -39,4 +41,5 @@ def delete_flow_by_id(db: Session, flow_id: int) -> Flow | None:
         return None
     db.delete(flow)
     db.commit()
+    compiled_flow_cache.invalidate_flow(flow_id)
     return flow
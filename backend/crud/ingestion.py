@@ -0,0 +1,77 @@
+from datetime import datetime, timezone
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from models.ingestion import IngestedDocument, IngestionJob, IngestionMode, IngestionStatus
+from typing import List, Optional
+
+
+def create_ingestion_job(db: Session, tool_id: int, input_path: str, mode: IngestionMode = IngestionMode.INGEST) -> IngestionJob:
+    job = IngestionJob(tool_id=tool_id, input_path=input_path, mode=mode)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def get_ingestion_job_by_id(db: Session, job_id: int):
+    return db.query(IngestionJob).filter(IngestionJob.id == job_id).first()
+
+
+def get_ingestion_jobs(db: Session, tool_id: Optional[int] = None, status: Optional[IngestionStatus] = None):
+    query = db.query(IngestionJob)
+    if tool_id is not None:
+        query = query.filter(IngestionJob.tool_id == tool_id)
+    if status is not None:
+        query = query.filter(IngestionJob.status == status)
+    return query.order_by(IngestionJob.id.desc()).all()
+
+
+def update_ingestion_job(db: Session, job: IngestionJob, status: Optional[IngestionStatus] = None, **fields) -> IngestionJob:
+    if status is not None:
+        job.status = status
+    for key, value in fields.items():
+        setattr(job, key, value)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def get_ingested_documents(db: Session, tool_id: int, collection: str) -> List[IngestedDocument]:
+    return db.query(IngestedDocument).filter(IngestedDocument.tool_id == tool_id, IngestedDocument.collection == collection).all()
+
+
+def record_ingested_documents(db: Session, tool_id: int, collection: str, documents: List[dict]) -> None:
+    """Insert or replace the manifest entries of `documents` (keyed by path) in one transaction."""
+    paths = [document["path"] for document in documents]
+    existing = {
+        row.path: row for row in db.query(IngestedDocument).filter(
+            IngestedDocument.tool_id == tool_id, IngestedDocument.collection == collection, IngestedDocument.path.in_(paths)
+        )
+    }
+    for document in documents:
+        row = existing.get(document["path"])
+        if row is None:
+            db.add(IngestedDocument(tool_id=tool_id, collection=collection, **document))
+        else:
+            for key, value in document.items():
+                setattr(row, key, value)
+            row.ingested_at = datetime.now(timezone.utc)
+    db.commit()
+
+
+def delete_ingested_documents(db: Session, tool_id: int, collection: str, paths: List[str]) -> int:
+    deleted = db.query(IngestedDocument).filter(
+        IngestedDocument.tool_id == tool_id, IngestedDocument.collection == collection, IngestedDocument.path.in_(paths)
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+def get_manifest_summary(db: Session, tool_id: int, collection: str) -> dict:
+    query = db.query(IngestedDocument).filter(IngestedDocument.tool_id == tool_id, IngestedDocument.collection == collection)
+    files, size, last_ingested_at = query.with_entities(
+        func.count(IngestedDocument.id), func.sum(IngestedDocument.size), func.max(IngestedDocument.ingested_at)
+    ).one()
+    # duplicates share chunks, so count each content once
+    chunks = {content_hash: len(chunk_ids) for content_hash, chunk_ids in query.with_entities(IngestedDocument.content_hash, IngestedDocument.chunk_ids)}
+    return {"files": files, "chunks": sum(chunks.values()), "bytes": size or 0, "last_ingested_at": last_ingested_at}
@@ -1,7 +1,9 @@
 from sqlalchemy.orm import Session
 from models.llms import LLMRemote, LLMLocal
-from typing import Optional
-from core.encryption import fernet_encrypt, fernet_decrypt
+from typing import Iterable, Optional
+from core.encryption import fernet_encrypt
+from services.llms.registry import llm_client_registry
+from services.llms.rate_limit import rate_limiter_registry
 
 
 #####################
@@ -18,6 +20,13 @@ def get_remote_llm_by_alias(db: Session, alias: str):
     return db.query(LLMRemote).filter(LLMRemote.alias == alias).first()
 
 
+def get_remote_llms_by_aliases(db: Session, aliases: Iterable[str]):
+    aliases = list(set(aliases))
+    if not aliases:
+        return []
+    return db.query(LLMRemote).filter(LLMRemote.alias.in_(aliases)).all()
+
+
 def create_remote_llm(db: Session, alias: str, provider: str, api_key: str):
     cred = LLMRemote(alias=alias, provider=provider)
     cred.api_key = fernet_encrypt(api_key)
@@ -34,6 +43,9 @@ def update_remote_llm_by_alias(db: Session, old_alias: str, new_alias: str, api_
     llm.api_key = fernet_encrypt(api_key)
     db.commit()
     db.refresh(llm)
+    for alias in (old_alias, new_alias):
+        llm_client_registry.invalidate(alias)
+        rate_limiter_registry.invalidate(alias)
     return llm
 
 
@@ -43,15 +55,11 @@ def delete_remote_llm_by_alias(db: Session, alias: str):
         return None
     db.delete(llm)
     db.commit()
+    llm_client_registry.invalidate(alias)
+    rate_limiter_registry.invalidate(alias)
     return llm
 
 
-def get_api_key_by_alias(db: Session, alias: str) -> Optional[str]:
-    llm = db.query(LLMRemote).filter_by(alias=alias).first()
-    if not llm:
-        return None
-    return fernet_decrypt(llm.api_key)
-
 ###############
 ## Local LLMs
 ###############
@@ -66,22 +74,32 @@ def get_local_llm_by_alias(db: Session, alias: str):
     return db.query(LLMLocal).filter(LLMLocal.alias == alias).first()
 
 
-def create_local_llm(db: Session, alias: str, provider: str, path: str):
-    llm = LLMLocal(alias=alias, provider=provider, path=path)
+def get_local_llms_by_aliases(db: Session, aliases: Iterable[str]):
+    aliases = list(set(aliases))
+    if not aliases:
+        return []
+    return db.query(LLMLocal).filter(LLMLocal.alias.in_(aliases)).all()
+
+
+def create_local_llm(db: Session, alias: str, provider: str, path: str, parameters: Optional[dict] = None):
+    llm = LLMLocal(alias=alias, provider=provider, path=path, parameters=parameters)
     db.add(llm)
     db.commit()
     db.refresh(llm)
     return llm
 
 
-def update_local_llm_by_alias(db: Session, alias: str, provider: str, path: str):
+def update_local_llm_by_alias(db: Session, alias: str, provider: str, path: str, parameters: Optional[dict] = None):
     llm = db.query(LLMLocal).filter(LLMLocal.alias == alias).first()
     if not llm:
         return None
     llm.provider = provider
     llm.path = path
+    llm.parameters = parameters
     db.commit()
     db.refresh(llm)
+    llm_client_registry.invalidate(alias)
+    rate_limiter_registry.invalidate(alias)
     return llm
 
 
@@ -91,4 +109,6 @@ def delete_local_llm_by_alias(db: Session, alias: str):
         return None
     db.delete(llm)
     db.commit()
+    llm_client_registry.invalidate(alias)
+    rate_limiter_registry.invalidate(alias)
     return llm
\ No newline at end of file
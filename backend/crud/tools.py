@@ -1,6 +1,8 @@
 from models.tools import Tool
-from typing import Optional
+from typing import Iterable, Optional
 from sqlalchemy.orm import Session
+from services.flows.graph_cache import compiled_flow_cache
+from services.flows.codegen_cache import codegen_cache
 
 
 def get_tools(db: Session, limit: Optional[int] = None):
@@ -25,10 +27,19 @@ def get_tool_by_name(db: Session, name: str):
     return db.query(Tool).filter(Tool.name == name).first()
 
 
+def get_tools_by_names(db: Session, names: Iterable[str]):
+    """Fetch several tools in one query; unknown names are simply missing from the result."""
+    names = list(set(names))
+    if not names:
+        return []
+    return db.query(Tool).filter(Tool.name.in_(names)).all()
+
+
 def update_tool_by_id(db: Session, id: int, name: str, description: str, type: str, config: dict, code: str, is_active: bool):
     tool = db.query(Tool).filter(Tool.id == id).first()
     if not tool:
         return None
+    old_name = tool.name
     tool.name = name
     tool.description = description
     tool.type = type
@@ -37,6 +48,11 @@ def update_tool_by_id(db: Session, id: int, name: str, description: str, type: s
     tool.is_active = is_active
     db.commit()
     db.refresh(tool)
+    # Compiled flows and generated code hold the tool's code, so drop the ones using it. After
+    # the commit, so a generation racing the update can't re-cache code from the old row.
+    for cached_name in {old_name, name}:
+        compiled_flow_cache.invalidate_tool(cached_name)
+        codegen_cache.invalidate_tool(cached_name)
     return tool
 
 
@@ -44,6 +60,9 @@ def delete_tool_by_id(db: Session, id: int):
     tool = db.query(Tool).filter(Tool.id == id).first()
     if not tool:
         return None
+    name = tool.name
     db.delete(tool)
     db.commit()
+    compiled_flow_cache.invalidate_tool(name)
+    codegen_cache.invalidate_tool(name)
     return tool
\ No newline at end of file
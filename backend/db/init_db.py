@@ -4,6 +4,8 @@ from db.base import Base
 from models.llms import LLMRemote, LLMLocal
 from models.flows import Flow
 from models.tools import Tool
+from models.batches import BatchJob, BatchRow
+from models.ingestion import IngestionJob, IngestedDocument
 from db.utils import get_absolute_db_path
 from core.constants import PROJECT_NAME
 
@@ -17,6 +19,7 @@ def init_db():
         print(f"[{PROJECT_NAME} DB] ✅ Database and tables created.")
     else:
         print(f"[{PROJECT_NAME} DB] ✅ Database already exists, skipping creation.")
+        Base.metadata.create_all(bind=engine)  # only adds tables introduced since the database was created
 
 
 # in case the file is ran directly
@@ -7,6 +7,8 @@ from api.flows import router as flow_router
 from api.tools import router as tool_router
 from api.chatbot import router as chatbot_router
 from core.startup import startup
+from services.flows.batch import batch_runner
+from services.tools.rag.ingestion import ingestion_runner
 from core.constants import PROJECT_NAME
 
 app = FastAPI(title=f"{PROJECT_NAME} API", description=f"{PROJECT_NAME} API", version="0.0.1")
@@ -16,6 +18,8 @@ app = FastAPI(title=f"{PROJECT_NAME} API", description=f"{PROJECT_NAME} API", ve
 async def startup_event():
     """Run startup tasks when the application starts."""
     startup()
+    batch_runner.resume_interrupted()  # batch jobs cut short by a restart pick up from their last checkpoint
+    ingestion_runner.resume_interrupted()  # so do ingestion jobs, skipping the files they already wrote
 
 
 # CORS middleware configuration
@@ -0,0 +1,45 @@
+from sqlalchemy import Column, Integer, String, Text, JSON, Enum, Float, DateTime, ForeignKey, UniqueConstraint
+from datetime import datetime, timezone
+from db.base import Base
+import enum
+
+
+class BatchStatus(enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class BatchJob(Base):
+    __tablename__ = "batch_jobs"
+
+    id = Column(Integer, primary_key=True)
+    flow_id = Column(Integer, ForeignKey("flows.id", ondelete="CASCADE"), nullable=False, index=True)
+    status = Column(Enum(BatchStatus), nullable=False, default=BatchStatus.PENDING)
+    input_path = Column(String, nullable=False)  # JSONL or CSV rows
+    output_path = Column(String, nullable=False)  # JSONL results, one line per row
+    output_offset = Column(Integer, nullable=False, default=0)  # bytes of output covered by the last checkpoint
+    input_column = Column(String, nullable=False, default="input")  # column sent as the user message
+    concurrency = Column(Integer, nullable=False, default=4)
+    total_rows = Column(Integer, nullable=True)  # known once the input has been read to the end
+    completed_rows = Column(Integer, nullable=False, default=0)
+    failed_rows = Column(Integer, nullable=False, default=0)
+    run_seconds = Column(Float, nullable=False, default=0.0)  # time spent running, across resumes
+    stats = Column(JSON, nullable=True)  # throughput and latency percentiles
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    finished_at = Column(DateTime, nullable=True)
+
+
+class BatchRow(Base):
+    """Checkpoint of a processed row: rows recorded here are skipped when a job resumes."""
+    __tablename__ = "batch_rows"
+    __table_args__ = (UniqueConstraint("job_id", "row_index"),)
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(Integer, ForeignKey("batch_jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+    row_index = Column(Integer, nullable=False)
+    latency_ms = Column(Float, nullable=False)
+    error = Column(Text, nullable=True)
@@ -0,0 +1,62 @@
+from sqlalchemy import Column, Integer, String, Text, JSON, Enum, Float, DateTime, ForeignKey, UniqueConstraint
+from datetime import datetime, timezone
+from db.base import Base
+import enum
+
+
+class IngestionStatus(enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class IngestionMode(enum.Enum):
+    INGEST = "ingest"  # add the input's files to the collection
+    REINDEX = "reindex"  # make the collection match the input: also drop the files removed from it
+
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(Integer, primary_key=True)
+    tool_id = Column(Integer, ForeignKey("tools.id", ondelete="CASCADE"), nullable=False, index=True)
+    status = Column(Enum(IngestionStatus), nullable=False, default=IngestionStatus.PENDING)
+    mode = Column(Enum(IngestionMode), nullable=False, default=IngestionMode.INGEST)
+    input_path = Column(String, nullable=False)  # file or directory, relative to the project root
+    total_files = Column(Integer, nullable=True)
+    processed_files = Column(Integer, nullable=False, default=0)  # parsed, chunked, embedded and written
+    skipped_files = Column(Integer, nullable=False, default=0)  # unchanged, or content already in the collection
+    removed_files = Column(Integer, nullable=False, default=0)  # reindex: gone from the input, chunks deleted
+    failed_files = Column(Integer, nullable=False, default=0)
+    total_chunks = Column(Integer, nullable=False, default=0)
+    run_seconds = Column(Float, nullable=False, default=0.0)  # time spent running, across resumes
+    stats = Column(JSON, nullable=True)  # throughput, per-stage busy time and file errors
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    finished_at = Column(DateTime, nullable=True)
+
+
+class IngestedDocument(Base):
+    """
+    A file written to a RAG tool's collection. Together these rows are the collection's manifest,
+    used to skip unchanged files, dedupe content, resume jobs and delete the chunks of changed or
+    removed files.
+    """
+    __tablename__ = "ingested_documents"
+    __table_args__ = (UniqueConstraint("tool_id", "collection", "path"),)
+
+    id = Column(Integer, primary_key=True)
+    tool_id = Column(Integer, ForeignKey("tools.id", ondelete="CASCADE"), nullable=False, index=True)
+    collection = Column(String, nullable=False)  # the tool's index_name
+    path = Column(String, nullable=False)  # relative to the project root
+    size = Column(Integer, nullable=False)
+    mtime = Column(Float, nullable=False)
+    content_hash = Column(String(64), nullable=False, index=True)  # sha256 of the file's bytes
+    chunk_ids = Column(JSON, nullable=False)  # ids of the chunks in the vector store
+    job_id = Column(Integer, ForeignKey("ingestion_jobs.id", ondelete="SET NULL"), nullable=True)  # job that wrote it
+    embedding_model = Column(String, nullable=True)  # settings the chunks were built with: a mismatch means re-embed
+    chunk_size = Column(Integer, nullable=True)
+    chunk_overlap = Column(Integer, nullable=True)
+    ingested_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+from typing import Optional, Dict, Any
+from datetime import datetime
+from models.batches import BatchStatus
+
+
+class BatchJobOut(BaseModel):
+    id: int
+    flow_id: int
+    status: BatchStatus
+    input_path: str
+    output_path: str
+    input_column: str
+    concurrency: int
+    total_rows: Optional[int] = None
+    completed_rows: int
+    failed_rows: int
+    run_seconds: float
+    stats: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -55,6 +55,7 @@ class GraphEdge(BaseModel):
 class Graph(BaseModel):
     nodes: List[GraphNode]
     edges: List[GraphEdge]
+    target: Literal["sync", "async"] = "sync"  # code generation target picked in the code sidebar, saved with the flow
 
 # ----- Main Flow Parser -----
 
@@ -63,6 +64,7 @@ class FlowPayload(BaseModel):
     description: Optional[str] = ""
     graph: Graph
     state: Optional[State] = State()
+    target: Literal["sync", "async"] = "sync"  # generated code: blocking nodes and app.invoke, or async def nodes and app.ainvoke
 
 
 # ----- CRUD Operations -----
@@ -0,0 +1,36 @@
+from pydantic import BaseModel
+from typing import Optional, Dict, Any
+from datetime import datetime
+from models.ingestion import IngestionMode, IngestionStatus
+
+
+class IngestionJobOut(BaseModel):
+    id: int
+    tool_id: int
+    status: IngestionStatus
+    mode: IngestionMode
+    input_path: str
+    total_files: Optional[int] = None
+    processed_files: int
+    skipped_files: int
+    removed_files: int
+    failed_files: int
+    total_chunks: int
+    run_seconds: float
+    stats: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class IngestionManifestOut(BaseModel):
+    tool_id: int
+    collection: str
+    source_path: Optional[str] = None
+    files: int
+    chunks: int
+    bytes: int
+    last_ingested_at: Optional[datetime] = None
@@ -76,6 +76,10 @@ class LocalLLM(BaseLLM):
         ...,
         description="Filesystem path to the model file"
     )
+    parameters: Optional[Dict[str, Any]] = Field(
+        None,
+        description="Model load options, e.g. n_ctx, n_threads, n_batch, use_mmap, use_mlock for llama-cpp."
+    )
 
     class Config:
         json_schema_extra = {
@@ -83,7 +87,8 @@ class LocalLLM(BaseLLM):
                 "alias": "My Local LLaMA",
                 "type": "local",
                 "provider": "llama-cpp",
-                "path": "/models/llama/llama-3-8b.Q4_K_M.gguf"
+                "path": "/models/llama/llama-3-8b.Q4_K_M.gguf",
+                "parameters": {"n_ctx": 4096, "n_threads": 8}
             }
         }
 
@@ -92,6 +97,7 @@ class LocalLLMOut(BaseModel):
     alias: str
     provider: LocalProvider
     path: str
+    parameters: Optional[Dict[str, Any]] = None
 
     class Config:
         from_attributes = True
@@ -16,6 +16,7 @@ class ChatRequest(BaseModel):
     top_p: Optional[float] = Field(None, ge=0, le=1)
     frequency_penalty: Optional[float] = Field(None, ge=0, le=2)
     presence_penalty: Optional[float] = Field(None, ge=0, le=2)
+    cache: bool = Field(False, description="Serve and store the completion in the response cache")
 
 class TokenUsage(BaseModel):
     prompt_tokens: int
@@ -29,6 +30,7 @@ class ChatResponse(BaseModel):
     model: str
     usage: TokenUsage
     choices: List[Dict[str, Any]]
+    cached: Optional[bool] = None
 
 class ChatCompletionChunk(BaseModel):
     id: str
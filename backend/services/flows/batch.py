@@ -0,0 +1,264 @@
+import asyncio
+import csv
+import itertools
+import json
+import os
+import time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import BinaryIO, Deque, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from core.config import root_dir, BATCH_CHECKPOINT_ROWS, BATCH_CHECKPOINT_INTERVAL_S
+from crud.batches import (
+    checkpoint_batch_rows,
+    get_batch_job_by_id,
+    get_batch_jobs,
+    get_processed_row_indices,
+    get_row_latencies,
+    update_batch_job_status,
+)
+from crud.flows import get_flow_by_id
+from db.session import SessionLocal
+from models.batches import BatchJob, BatchStatus
+from services.flows.runner import final_output, get_compiled_flow
+
+
+def read_rows(path: str) -> Iterator[Tuple[int, dict]]:
+    """
+    Lazily read the rows of a JSONL or CSV file.
+
+    Args:
+        path (str): Input file; `.csv` files are read as CSV with a header row, anything else as JSONL.
+
+    Yields:
+        Tuple[int, dict]: The row index (stable across reads of the same file) and the row.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            yield from enumerate(csv.DictReader(f))
+            return
+        index = 0
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            yield index, row if isinstance(row, dict) else {"input": row}
+            index += 1
+
+
+def row_to_input(row: dict, input_column: str) -> dict:
+    """Turn a dataset row into the flow's initial state: `messages` is used as is, otherwise `input_column` becomes the user message."""
+    state = {key: value for key, value in row.items() if key not in ("messages", input_column)}
+    messages = row.get("messages")
+    if isinstance(messages, str):
+        messages = json.loads(messages)
+    if not messages:
+        messages = [{"role": "user", "content": str(row.get(input_column, ""))}]
+    return {**state, "messages": messages}
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))]
+
+
+def batch_job_stats(job: BatchJob, latencies: List[float]) -> dict:
+    processed = job.completed_rows + job.failed_rows
+    return {
+        "processed_rows": processed,
+        "rows_per_s": processed / job.run_seconds if job.run_seconds else 0.0,
+        "p50_latency_ms": percentile(latencies, 0.5),
+        "p95_latency_ms": percentile(latencies, 0.95),
+        "errors": job.failed_rows,
+    }
+
+
+async def _to_thread_uninterrupted(func, *args):
+    """`asyncio.to_thread` that, when cancelled, still waits for the call to finish before re-raising.
+
+    A cancelled checkpoint or output write keeps running in its thread; waiting for it keeps the
+    lock it was called under held until the file and the checkpoint agree again.
+    """
+    task = asyncio.ensure_future(asyncio.to_thread(func, *args))
+    try:
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        await task
+        raise
+
+
+class BatchRunner:
+    """
+    Runs batch jobs in the background, one asyncio task per job.
+
+    Each row's result is appended to the job's output file; every `checkpoint_rows` rows (or
+    `checkpoint_interval_s` seconds) the processed rows and the output size are committed
+    together. A job that stops for any reason resumes from its last checkpoint: checkpointed
+    rows are skipped and the output is truncated back to the checkpointed size, so rows are
+    never written twice.
+
+    Reading rows, writing the output and checkpointing all run in worker threads, so a job
+    never stalls the event loop (and the API) while it waits on the disk.
+    """
+    def __init__(self, checkpoint_rows: int = BATCH_CHECKPOINT_ROWS, checkpoint_interval_s: float = BATCH_CHECKPOINT_INTERVAL_S):
+        self.checkpoint_rows = checkpoint_rows
+        self.checkpoint_interval_s = checkpoint_interval_s
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+
+    def start(self, job_id: int) -> None:
+        """Start (or resume) a job unless it is already running in this process."""
+        if not self.is_running(job_id):
+            self._tasks[job_id] = asyncio.create_task(self._run(job_id))
+
+
+    def is_running(self, job_id: int) -> bool:
+        return job_id in self._tasks and not self._tasks[job_id].done()
+
+
+    async def cancel(self, job_id: int) -> bool:
+        """Cancel a running job and wait for it to checkpoint what it has processed."""
+        if not self.is_running(job_id):
+            return False
+        task = self._tasks[job_id]
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        return True
+
+
+    def resume_interrupted(self) -> List[int]:
+        """Restart the jobs that were running when the process stopped."""
+        db = SessionLocal()
+        try:
+            job_ids = [job.id for job in get_batch_jobs(db, status=BatchStatus.RUNNING)]
+        finally:
+            db.close()
+        for job_id in job_ids:
+            self.start(job_id)
+        return job_ids
+
+
+    async def _run(self, job_id: int) -> None:
+        # Job bookkeeping gets its own session: checkpoints commit it in a worker thread while the
+        # flow's session is in use on the event loop.
+        db, job_db = SessionLocal(), SessionLocal()
+        job = await asyncio.to_thread(get_batch_job_by_id, job_db, job_id)
+        output = None
+        pending: List[dict] = []
+        io_lock = asyncio.Lock()  # serializes output writes, checkpoints and row reads
+        resumed_seconds = job.run_seconds
+        started = time.perf_counter()
+        last_checkpoint = started
+
+        def persist(rows: List[dict], run_seconds: float) -> None:
+            output.flush()
+            os.fsync(output.fileno())
+            checkpoint_batch_rows(job_db, job, rows, output.tell(), run_seconds)
+
+        async def checkpoint() -> None:
+            """Commit the pending rows with the output size. Call with `io_lock` held."""
+            nonlocal last_checkpoint
+            rows = list(pending)
+            pending.clear()
+            await _to_thread_uninterrupted(persist, rows, resumed_seconds + time.perf_counter() - started)
+            last_checkpoint = time.perf_counter()
+
+        try:
+            flow = get_flow_by_id(db, job.flow_id)
+            if flow is None:
+                raise RuntimeError(f"Flow {job.flow_id} no longer exists")
+            compiled, _ = await get_compiled_flow(flow, db)
+            processed = await asyncio.to_thread(get_processed_row_indices, job_db, job_id)
+            await asyncio.to_thread(update_batch_job_status, job_db, job, BatchStatus.RUNNING, error=None, finished_at=None)
+            output = await asyncio.to_thread(self._open_output, root_dir / job.output_path, job.output_offset)
+
+            rows = read_rows(str(root_dir / job.input_path))
+            buffered: Deque[Tuple[int, dict]] = deque()
+            total = 0
+
+            async def next_row() -> Optional[Tuple[int, dict]]:
+                # Rows are read in a worker thread, a buffer at a time; one reader at a time so each row goes to exactly one worker.
+                async with io_lock:
+                    if not buffered:
+                        buffered.extend(await asyncio.to_thread(list, itertools.islice(rows, max(self.checkpoint_rows, 1))))
+                    return buffered.popleft() if buffered else None
+
+            async def worker():
+                nonlocal total
+                while (item := await next_row()) is not None:
+                    index, row = item
+                    total = max(total, index + 1)
+                    if index in processed:
+                        continue
+                    row_started = time.perf_counter()
+                    result, error = None, None
+                    try:
+                        result = await compiled.run(row_to_input(row, job.input_column), db)
+                    except Exception as e:
+                        error = str(e)
+                    latency_ms = (time.perf_counter() - row_started) * 1000
+                    record = {
+                        "row": index,
+                        "input": row,
+                        "output": final_output(result["state"]) if result else None,
+                        "error": error,
+                        "latency_ms": latency_ms,
+                    }
+                    async with io_lock:
+                        pending.append({"row_index": index, "latency_ms": latency_ms, "error": error})
+                        await _to_thread_uninterrupted(output.write, (json.dumps(record, default=str) + "\n").encode("utf-8"))
+                        if len(pending) >= self.checkpoint_rows or time.perf_counter() - last_checkpoint >= self.checkpoint_interval_s:
+                            await checkpoint()
+
+            await asyncio.gather(*(worker() for _ in range(job.concurrency)))
+            async with io_lock:
+                await checkpoint()
+            await asyncio.to_thread(self._finish, job_db, job, BatchStatus.COMPLETED, total_rows=total)
+        except asyncio.CancelledError:
+            await self._stop(job_db, job, output, checkpoint, io_lock, BatchStatus.CANCELLED)
+            raise
+        except Exception as e:
+            print(f"Batch job {job_id} failed: {e}")
+            await self._stop(job_db, job, output, checkpoint, io_lock, BatchStatus.FAILED, error=str(e))
+        finally:
+            if output is not None:
+                output.close()
+            db.close()
+            job_db.close()
+            self._tasks.pop(job_id, None)
+
+
+    @staticmethod
+    def _open_output(path: Path, offset: int) -> BinaryIO:
+        """Open the output for appending, dropping anything written after the last checkpoint."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        output = open(path, "ab")
+        output.truncate(offset)
+        output.seek(offset)
+        return output
+
+
+    @staticmethod
+    def _finish(db: Session, job: BatchJob, status: BatchStatus, **fields) -> None:
+        update_batch_job_status(
+            db, job, status,
+            stats=batch_job_stats(job, get_row_latencies(db, job.id)),
+            finished_at=datetime.now(timezone.utc),
+            **fields,
+        )
+
+
+    async def _stop(self, db: Session, job: BatchJob, output, checkpoint, io_lock: asyncio.Lock, status: BatchStatus, error: Optional[str] = None) -> None:
+        if output is not None:
+            async with io_lock:
+                await checkpoint()
+        await asyncio.to_thread(self._finish, db, job, status, error=error)
+
+
+batch_runner = BatchRunner()
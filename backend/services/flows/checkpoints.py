@@ -0,0 +1,239 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+from core.config import (
+    root_dir,
+    FLOW_CHECKPOINT_PATH,
+    FLOW_CHECKPOINT_TTL_S,
+    FLOW_CHECKPOINT_COMPRESS_MIN_BYTES,
+)
+
+try:
+    import ormsgpack
+    ORMSGPACK_AVAILABLE = True
+except ImportError:
+    ORMSGPACK_AVAILABLE = False
+    ormsgpack = None
+
+try:
+    import zstandard
+    ZSTANDARD_AVAILABLE = True
+except ImportError:
+    ZSTANDARD_AVAILABLE = False
+    zstandard = None
+
+
+def _default(value: Any) -> Any:
+    return str(value)
+
+
+def encode_payload(value: Any, compress_min_bytes: int = FLOW_CHECKPOINT_COMPRESS_MIN_BYTES) -> Tuple[bytes, str, int]:
+    """
+    Serialize a checkpoint payload as compactly as the installed libraries allow.
+
+    msgpack (ormsgpack) with zstd when available, JSON with zlib otherwise; payloads smaller
+    than `compress_min_bytes` are stored uncompressed.
+
+    Args:
+        value (Any): JSON-like value (node update, run input).
+        compress_min_bytes (int): Size from which payloads are compressed.
+
+    Returns:
+        Tuple[bytes, str, int]: The encoded bytes, the codec (e.g. "msgpack+zstd") and the size before compression.
+    """
+    if ORMSGPACK_AVAILABLE:
+        data, codec = ormsgpack.packb(value, default=_default, option=ormsgpack.OPT_NON_STR_KEYS), "msgpack"
+    else:
+        data, codec = json.dumps(value, default=_default, separators=(",", ":")).encode("utf-8"), "json"
+    raw_size = len(data)
+    if raw_size >= compress_min_bytes:
+        if ZSTANDARD_AVAILABLE:
+            data, codec = zstandard.ZstdCompressor(level=3).compress(data), codec + "+zstd"
+        else:
+            data, codec = zlib.compress(data, 6), codec + "+zlib"
+    return data, codec, raw_size
+
+
+def decode_payload(data: bytes, codec: str) -> Any:
+    """Inverse of `encode_payload`."""
+    serializer, _, compression = codec.partition("+")
+    if compression == "zstd":
+        if not ZSTANDARD_AVAILABLE:
+            raise RuntimeError("zstandard is required to read this checkpoint. Install it with 'pip install zstandard'.")
+        data = zstandard.ZstdDecompressor().decompress(data)
+    elif compression == "zlib":
+        data = zlib.decompress(data)
+    if serializer == "msgpack":
+        if not ORMSGPACK_AVAILABLE:
+            raise RuntimeError("ormsgpack is required to read this checkpoint. Install it with 'pip install ormsgpack'.")
+        return ormsgpack.unpackb(data)
+    return json.loads(data)
+
+
+class CheckpointStore:
+    """
+    Durable record of flow runs in a SQLite (WAL) file.
+
+    A run stores its input once, then each node's state update as the node finishes. Since a
+    node's state is the input plus its ancestors' updates applied in topological order, these
+    updates are the whole graph state: a run resumes by replaying them and running the nodes
+    that have none.
+
+    Attributes:
+        db_path (Path): SQLite file.
+        ttl_s (float): Runs not updated for this long are pruned.
+    """
+    def __init__(self, db_path: str = FLOW_CHECKPOINT_PATH, ttl_s: float = FLOW_CHECKPOINT_TTL_S):
+        self.db_path = (root_dir / db_path).resolve()
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.checkpoints = 0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+        self.write_seconds = 0.0
+
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the store on first use. Must hold the lock."""
+        if self._conn is None:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                "run_id TEXT PRIMARY KEY, flow_id INTEGER NOT NULL, version TEXT NOT NULL, status TEXT NOT NULL, "
+                "input BLOB NOT NULL, codec TEXT NOT NULL, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS node_outputs ("
+                "run_id TEXT NOT NULL, node_id TEXT NOT NULL, seq INTEGER NOT NULL, "
+                "payload BLOB NOT NULL, codec TEXT NOT NULL, PRIMARY KEY (run_id, node_id))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS runs_updated_at ON runs (updated_at)")
+            self._conn = conn
+        return self._conn
+
+
+    def _write(self, sql: str, params: tuple, raw_size: int = 0, stored_size: int = 0) -> None:
+        started = time.perf_counter()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(sql, params)
+            self.checkpoints += 1
+            self.raw_bytes += raw_size
+            self.stored_bytes += stored_size
+            self.write_seconds += time.perf_counter() - started
+
+
+    def create_run(self, run_id: str, flow_id: int, version: str, input_data: Optional[dict]) -> None:
+        self.prune()
+        data, codec, raw_size = encode_payload(input_data or {})
+        now = time.time()
+        self._write(
+            "INSERT INTO runs (run_id, flow_id, version, status, input, codec, created_at, updated_at) VALUES (?, ?, ?, 'running', ?, ?, ?, ?)",
+            (run_id, flow_id, version, data, codec, now, now), raw_size, len(data),
+        )
+
+
+    def save_node(self, run_id: str, node_id: str, update: dict, timing: dict) -> None:
+        """Checkpoint a finished node's state update and timing."""
+        data, codec, raw_size = encode_payload({"update": update, "timing": timing})
+        started = time.perf_counter()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                seq = conn.execute("SELECT COUNT(*) FROM node_outputs WHERE run_id = ?", (run_id,)).fetchone()[0]
+                conn.execute(
+                    "INSERT OR REPLACE INTO node_outputs (run_id, node_id, seq, payload, codec) VALUES (?, ?, ?, ?, ?)",
+                    (run_id, node_id, seq, data, codec),
+                )
+                conn.execute("UPDATE runs SET updated_at = ? WHERE run_id = ?", (time.time(), run_id))
+            self.checkpoints += 1
+            self.raw_bytes += raw_size
+            self.stored_bytes += len(data)
+            self.write_seconds += time.perf_counter() - started
+
+
+    def set_run_status(self, run_id: str, status: str, error: Optional[str] = None) -> None:
+        self._write("UPDATE runs SET status = ?, error = ?, updated_at = ? WHERE run_id = ?", (status, error, time.time(), run_id))
+
+
+    def load_run(self, run_id: str) -> Optional[dict]:
+        """
+        Load a run and its checkpointed node outputs.
+
+        Returns:
+            Optional[dict]: run_id, flow_id, version, status, error, input, and `nodes`
+                (node id -> {"update", "timing"}) in completion order; None if unknown.
+        """
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT flow_id, version, status, input, codec, error, created_at, updated_at FROM runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            outputs = conn.execute(
+                "SELECT node_id, payload, codec FROM node_outputs WHERE run_id = ? ORDER BY seq", (run_id,)
+            ).fetchall()
+        flow_id, version, status, data, codec, error, created_at, updated_at = row
+        return {
+            "run_id": run_id,
+            "flow_id": flow_id,
+            "version": version,
+            "status": status,
+            "error": error,
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "input": decode_payload(data, codec),
+            "nodes": {node_id: decode_payload(payload, node_codec) for node_id, payload, node_codec in outputs},
+        }
+
+
+    def list_runs(self, flow_id: int, limit: int = 50) -> List[dict]:
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute(
+                "SELECT r.run_id, r.status, r.error, r.created_at, r.updated_at, COUNT(n.node_id) "
+                "FROM runs r LEFT JOIN node_outputs n ON n.run_id = r.run_id "
+                "WHERE r.flow_id = ? GROUP BY r.run_id ORDER BY r.created_at DESC LIMIT ?",
+                (flow_id, limit),
+            ).fetchall()
+        return [
+            {"run_id": run_id, "status": status, "error": error, "created_at": created_at, "updated_at": updated_at, "completed_nodes": nodes}
+            for run_id, status, error, created_at, updated_at, nodes in rows
+        ]
+
+
+    def prune(self) -> None:
+        """Delete runs not updated within the TTL."""
+        cutoff = time.time() - self.ttl_s
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM node_outputs WHERE run_id IN (SELECT run_id FROM runs WHERE updated_at < ?)", (cutoff,))
+                conn.execute("DELETE FROM runs WHERE updated_at < ?", (cutoff,))
+
+
+    def stats(self) -> dict:
+        """Return checkpoint write counts, sizes and the average write time."""
+        with self._lock:
+            return {
+                "serializer": "msgpack" if ORMSGPACK_AVAILABLE else "json",
+                "compression": "zstd" if ZSTANDARD_AVAILABLE else "zlib",
+                "checkpoints": self.checkpoints,
+                "raw_bytes": self.raw_bytes,
+                "stored_bytes": self.stored_bytes,
+                "compression_ratio": self.raw_bytes / self.stored_bytes if self.stored_bytes else None,
+                "avg_write_ms": self.write_seconds / self.checkpoints * 1000 if self.checkpoints else 0.0,
+            }
+
+
+checkpoint_store = CheckpointStore()
@@ -1,10 +1,14 @@
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from core.templates import template_registry
 from schemas.flows import FlowPayload
-import os
+import difflib
 from db.session import get_db 
 from services.llms.factory import get_llm_client_by_alias
-from services.tools.factory import get_tool_by_name
+from services.tools.factory import get_tool_by_name, get_tools_by_names
+from services.tools.base import render_runtime
+from crud.llms import get_remote_llms_by_aliases, get_local_llms_by_aliases
+from services.flows.codegen_cache import codegen_cache, GeneratedCode
 from sqlalchemy.orm import Session
+from typing import Optional
 
 import logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -12,16 +16,12 @@ logger = logging.getLogger(__name__)
 
 
 class CodeGenerator:
-    def __init__(self, template_name: str = "langgraph_main.jinja2"):
+    def __init__(self, template_name: str = "langgraph_main.jinja2", db: Optional[Session] = None):
         self.template_name = template_name
-        templates_path = os.path.abspath(
-            os.path.join(os.path.dirname(__file__), "../../templates/flows")
-        )
-        self.env = Environment(
-            loader=FileSystemLoader(templates_path),
-            autoescape=select_autoescape()
-        )
-        self.db: Session = next(get_db())
+        self.env = template_registry.env
+        self.db: Session = db if db is not None else next(get_db())
+        self._tools = {}
+        self._llms = {}  # (alias, is_remote) -> LLMRemote/LLMLocal row, filled by preload()
         
         # Add file logging
         self.log_file = "/tmp/codegen_debug.log"
@@ -38,13 +38,98 @@ class CodeGenerator:
             f.write(f"{message}\n")
             f.flush()
 
+    def get_tool(self, name: str):
+        """Fetch a tool once per generator instead of once per use."""
+        if name not in self._tools:
+            self._tools[name] = get_tool_by_name(self.db, name)
+        return self._tools[name]
+
+    def get_llm(self, alias: str, is_remote: bool):
+        """A warm client for the alias, built from the preloaded row on a registry miss."""
+        return get_llm_client_by_alias(alias, db=self.db, is_remote=is_remote, llm=self._llms.get((alias, is_remote)))
+
+    def preload(self, flow: FlowPayload):
+        """
+        Fetch every tool and LLM the graph references with one `IN (...)` query per table,
+        so rendering reads them from memory instead of querying once per node.
+        Names that don't exist are remembered as missing and not queried again.
+        """
+        tool_names = {node.data.tool.name for node in flow.graph.nodes if node.data.tool is not None} - self._tools.keys()
+        if tool_names:
+            found = get_tools_by_names(self.db, tool_names)
+            self._tools.update({name: found.get(name) for name in tool_names})
+
+        aliases = {(node.data.llm.alias, node.data.llm.type == "remote") for node in flow.graph.nodes if node.data.llm is not None}
+        remote = [alias for alias, is_remote in aliases if is_remote]
+        local = [alias for alias, is_remote in aliases if not is_remote]
+        self._llms.update({(llm.alias, True): llm for llm in get_remote_llms_by_aliases(self.db, remote)})
+        self._llms.update({(llm.alias, False): llm for llm in get_local_llms_by_aliases(self.db, local)})
+        self.log(f"Preloaded {len(tool_names)} tools and {len(aliases)} LLMs")
+
     def generate(self, flow: FlowPayload) -> str:
+        return self.generate_code(flow).code
+
+    def generate_incremental(self, flow: FlowPayload, base_version: Optional[str] = None) -> dict:
+        """
+        Generate the flow's code and describe what changed since `base_version`.
+
+        Only nodes, tools and LLM blocks whose inputs changed are re-rendered (the others come
+        from the fragment cache), and when the base version is still cached a unified diff
+        against it is returned so the client can patch the code it already shows.
+
+        Args:
+            flow (FlowPayload): The canvas flow.
+            base_version (Optional[str]): `version` of the code the client currently has.
+
+        Returns:
+            dict: code, version, base_version, diff (None when the base is unknown) and the
+                changed/added/removed fragments (e.g. "node:<id>", "tool:<name>", "llm:<alias>").
+        """
+        generated = self.generate_code(flow)
+        base = codegen_cache.get_version(base_version) if base_version else None
+        if base is None:
+            return {"code": generated.code, "version": generated.version, "base_version": None, "diff": None, "changes": None}
+
+        diff = "".join(difflib.unified_diff(
+            base.code.splitlines(keepends=True), generated.code.splitlines(keepends=True),
+            fromfile=f"flow@{base.version}", tofile=f"flow@{generated.version}",
+        ))
+        return {
+            "code": generated.code,
+            "version": generated.version,
+            "base_version": base.version,
+            "diff": diff,
+            "changes": {
+                "changed": sorted(k for k in generated.fragments.keys() & base.fragments.keys() if generated.fragments[k] != base.fragments[k]),
+                "added": sorted(generated.fragments.keys() - base.fragments.keys()),
+                "removed": sorted(base.fragments.keys() - generated.fragments.keys()),
+            },
+        }
+
+    def generate_code(self, flow: FlowPayload) -> GeneratedCode:
         self.log(f"Starting code generation for flow: {flow.name}")
-        template = self.env.get_template(self.template_name)
+
+        cache_key = codegen_cache.output_key(
+            self.template_name,
+            flow.graph.model_dump(),
+            [node.data.tool.name for node in flow.graph.nodes if node.data.tool is not None],
+            [node.data.llm.alias for node in flow.graph.nodes if node.data.llm is not None],
+            flow.target,
+        )
+        cached = codegen_cache.get_output(cache_key)
+        if cached is not None:
+            self.log("Returning cached code (graph, tools and LLMs unchanged)")
+            return cached
+
+        template = template_registry.get_template(f"flows/{self.template_name}")
+        is_async = flow.target == "async"
+        self.preload(flow)
 
         llms = {}
         tools = {}
+        runtimes = {}  # shared runtime code (e.g. pooled HTTP) emitted once, ahead of the tools using it
         nodes = []
+        fragments = {}  # fragment name -> cache key, to tell what changed between versions
         
         self.log(f"Flow has {len(flow.graph.nodes)} nodes and {len(flow.graph.edges)} edges")
 
@@ -52,17 +137,30 @@ class CodeGenerator:
 
             # LLMs
             if node.data.llm is not None and node.data.llm.alias not in llms.keys():
+                alias, model = node.data.llm.alias, node.data.llm.model
                 is_remote = node.data.llm.type == "remote"
-                llm = get_llm_client_by_alias(node.data.llm.alias, db=self.db, is_remote=is_remote)
-                llms[node.data.llm.alias] = llm.to_code(node.data.llm.model)
+                fragments[f"llm:{alias}"] = ("llm", alias, is_remote, model, codegen_cache.llm_generation(alias))
+                llms[alias] = codegen_cache.fragment(
+                    fragments[f"llm:{alias}"],
+                    lambda: self.get_llm(alias, is_remote).to_code(model),
+                )
 
             if len(llms) == 0: llms["default"] = "pass"
     
             # Tools
             if node.data.tool is not None and node.data.tool.name not in tools.keys():
                 # fetch tool and get code
-                tool = get_tool_by_name(self.db, node.data.tool.name)
-                tools[node.data.tool.name] = tool.to_code()
+                tool_name = node.data.tool.name
+                tool = self.get_tool(tool_name)
+                tool_runtimes = getattr(tool, "runtimes", [])
+                for runtime in tool_runtimes:
+                    if runtime not in runtimes:
+                        runtimes[runtime] = render_runtime(runtime)
+                fragments[f"tool:{tool_name}"] = ("tool", tool_name, codegen_cache.tool_generation(tool_name))
+                tools[tool_name] = codegen_cache.fragment(
+                    fragments[f"tool:{tool_name}"],
+                    lambda: tool.to_code(include_runtime=False) if tool_runtimes else tool.to_code(),
+                )
             if len(tools) == 0: tools["default"] = "pass"
 
             # Agent Node functions and code
@@ -71,16 +169,13 @@ class CodeGenerator:
                     nodes.append({"function_name": "pass", "code": "pass"})
                 else:
                     self.log(f"Processing node: {node.id} of type {node.type} with tool: {node.data.tool.name}")
-                    # fetch tool again to get the tool object
-                    tool = get_tool_by_name(self.db, node.data.tool.name)
                     # TODO - renaming here and in the frontend, and schema for node config
                     # TODO - fix text output code in plain text mode
-                    self.log(f"Got tool object, calling get_agent_fn with parameters:")
-                    self.log(f"  agent_label: {node.data.label}")
-                    self.log(f"  system_prompt: {node.data.node.get('systemPrompt')}")
-                    self.log(f"  user_prompt: {node.data.node.get('userPrompt')}")
-                    self.log(f"  tool_name: {tool.sanitize_to_func_name(node.data.tool.name)}")
-                    function_code = tool.get_agent_fn(agent_label=node.data.label, agent_description=node.data.description, system_prompt=f"""\"\"\"{node.data.node["systemPrompt"]}\"\"\"""", user_prompt=f"""f\"\"\"{node.data.node["userPrompt"]}\"\"\"""", tool_name=tool.sanitize_to_func_name(node.data.tool.name), agent_input=node.data.node["inputFormat"], agent_output=node.data.node["outputMode"])
+                    fragments[f"node:{node.id}"] = self.node_fragment_key(node, is_async)
+                    function_code = codegen_cache.fragment(
+                        fragments[f"node:{node.id}"],
+                        lambda: self.render_agent_fn(node, is_async),
+                    )
                     self.log(f"Generated function code length: {len(function_code)}")
                     
                     func_name = self.sanitize_label(node.data.label) or f"node_{node.id}"
@@ -96,33 +191,7 @@ class CodeGenerator:
         # finish_point = next((n.id for n in flow.graph.nodes if n.type == "end"), "end")
 
         # EDGES
-        edges = []
-        for edge in flow.graph.edges:
-            # Find matching node for source
-            for node in flow.graph.nodes:
-                if node.id == edge.source:  # Match node ID with edge source
-                    if node.type not in ["start", "end"]:
-                        func_name = self.sanitize_label(node.data.label) or f"node_{node.id}"
-                        edge.source = func_name
-                    elif node.type == "start":
-                        edge.source = 'START'
-                    elif node.type == "end":
-                        edge.source = 'END'
-                    break
-            
-            # Find matching node for target  
-            for node in flow.graph.nodes:
-                if node.id == edge.target:  # Match node ID with edge target
-                    if node.type not in ["start", "end"]:
-                        func_name = self.sanitize_label(node.data.label) or f"node_{node.id}"
-                        edge.target = func_name
-                    elif node.type == "start":
-                        edge.target = 'START'
-                    elif node.type == "end":
-                        edge.target = 'END'
-                    break
-            
-            edges.append({"source": edge.source, "target": edge.target})
+        edges = self.resolve_edges(flow)
 
         self.log(f"Rendering template with {len(nodes)} nodes, {len(edges)} edges, {len(llms)} llms, {len(tools)} tools")
         self.log(f"Nodes: {[n['function_name'] for n in nodes]}")
@@ -131,10 +200,47 @@ class CodeGenerator:
                 nodes=nodes,
                 edges=edges,
                 llms=list(llms.values()),
+                runtimes=list(runtimes.values()),
                 tools=list(tools.values()),
+                is_async=is_async,
             )
             self.log("Template render successful")
-            return result
+            generated = GeneratedCode(result, fragments)
+            codegen_cache.put_output(cache_key, generated)
+            return generated
         except Exception as e:
             self.log(f"Template render failed: {e}")
             raise
+
+    def resolve_edges(self, flow: FlowPayload) -> list:
+        """Map edge endpoints to function names ('START'/'END' for the terminals) through an id index, instead of scanning the nodes per edge."""
+        function_names = {}
+        for node in flow.graph.nodes:
+            if node.type == "start":
+                function_names.setdefault(node.id, 'START')
+            elif node.type == "end":
+                function_names.setdefault(node.id, 'END')
+            else:
+                function_names.setdefault(node.id, self.sanitize_label(node.data.label) or f"node_{node.id}")
+        return [
+            {"source": function_names.get(edge.source, edge.source), "target": function_names.get(edge.target, edge.target)}
+            for edge in flow.graph.edges
+        ]
+
+    def node_fragment_key(self, node, is_async: bool = False) -> tuple:
+        """Everything an agent function's code depends on: its tool, label, description, node config and the sync/async target."""
+        config = node.data.node or {}
+        tool_name = node.data.tool.name
+        return (
+            "node", is_async, tool_name, codegen_cache.tool_generation(tool_name), node.data.label, node.data.description,
+            config.get("systemPrompt"), config.get("userPrompt"), config.get("inputFormat"), config.get("outputMode"),
+        )
+
+    def render_agent_fn(self, node, is_async: bool = False) -> str:
+        tool = self.get_tool(node.data.tool.name)
+        self.log(f"Got tool object, calling get_agent_fn with parameters:")
+        self.log(f"  agent_label: {node.data.label}")
+        self.log(f"  system_prompt: {node.data.node.get('systemPrompt')}")
+        self.log(f"  user_prompt: {node.data.node.get('userPrompt')}")
+        self.log(f"  tool_name: {tool.sanitize_to_func_name(node.data.tool.name)}")
+        return tool.get_agent_fn(agent_label=node.data.label, agent_description=node.data.description, system_prompt=f"""\"\"\"{node.data.node["systemPrompt"]}\"\"\"""", user_prompt=f"""f\"\"\"{node.data.node["userPrompt"]}\"\"\"""", tool_name=tool.sanitize_to_func_name(node.data.tool.name), agent_input=node.data.node["inputFormat"], agent_output=node.data.node["outputMode"], is_async=is_async)
@@ -0,0 +1,158 @@
+import hashlib
+import json
+from collections import OrderedDict
+from threading import RLock
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+from core.config import CODEGEN_CACHE_SIZE, CODEGEN_FRAGMENT_CACHE_SIZE
+from services.flows.graph_cache import flow_version
+from services.llms.registry import llm_client_registry
+
+
+class _LRU:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = self._items.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class GeneratedCode:
+    """
+    Generated flow code plus what it was assembled from.
+
+    Attributes:
+        code (str): The generated module.
+        version (str): Short content hash of `code`, echoed back by clients as a diff base.
+        fragments (Dict[str, str]): Fragment name ("node:<id>", "tool:<name>", "llm:<alias>") -> hash of its cache key.
+    """
+    def __init__(self, code: str, fragments: Dict[str, Hashable]):
+        self.code = code
+        self.version = hashlib.sha256(code.encode("utf-8")).hexdigest()[:16]
+        self.fragments = {
+            name: hashlib.sha256(repr(key).encode("utf-8")).hexdigest()[:16] for name, key in fragments.items()
+        }
+
+
+class CodegenCache:
+    """
+    Memoizes generated flow code and the fragments it is assembled from.
+
+    Whole outputs are keyed by a content hash of the graph (canvas layout ignored, see
+    `flow_version`) plus a generation stamp for every tool and LLM alias it references. A
+    stamp changes when the tool or alias is updated or deleted, so stale code is never served
+    and needs no explicit purge: old entries just age out of the LRU. Fragments (tool code,
+    LLM client code, node functions) are keyed the same way, so a graph edit only re-renders
+    the nodes whose inputs changed.
+
+    Attributes:
+        max_size (int): Generated outputs kept.
+        max_fragments (int): Rendered fragments kept.
+    """
+    def __init__(self, max_size: int = CODEGEN_CACHE_SIZE, max_fragments: int = CODEGEN_FRAGMENT_CACHE_SIZE):
+        self._outputs = _LRU(max_size)
+        self._fragments = _LRU(max_fragments)
+        self._versions = _LRU(max_size)
+        self._tool_generations: Dict[str, int] = {}
+        self._lock = RLock()
+
+
+    def tool_generation(self, name: str) -> int:
+        with self._lock:
+            return self._tool_generations.get(name, 0)
+
+
+    def llm_generation(self, alias: str) -> int:
+        # The client registry already stamps aliases on every update/delete (crud/llms.py).
+        return llm_client_registry.generation(alias)
+
+
+    def invalidate_tool(self, name: str) -> None:
+        """Mark a tool as changed: code and fragments built from it are no longer served."""
+        with self._lock:
+            self._tool_generations[name] = self._tool_generations.get(name, 0) + 1
+
+
+    def output_key(self, template_name: str, graph: dict, tool_names: Iterable[str], llm_aliases: Iterable[str], target: str = "sync") -> str:
+        """Stable key of a flow's generated code; positions, selection and styles don't affect it."""
+        stamps = {
+            "template": template_name,
+            "target": target,
+            "graph": flow_version(graph),
+            "tools": {name: self.tool_generation(name) for name in sorted(set(tool_names))},
+            "llms": {alias: self.llm_generation(alias) for alias in sorted(set(llm_aliases))},
+        }
+        return hashlib.sha256(json.dumps(stamps, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+    def get_output(self, key: str) -> Optional[GeneratedCode]:
+        with self._lock:
+            generated = self._outputs.get(key)
+            if generated is not None:
+                self._versions.put(generated.version, generated)
+            return generated
+
+
+    def put_output(self, key: str, generated: GeneratedCode) -> None:
+        with self._lock:
+            self._outputs.put(key, generated)
+            self._versions.put(generated.version, generated)
+
+
+    def get_version(self, version: str) -> Optional[GeneratedCode]:
+        """Previously generated code by its `version`, used as the base of incremental diffs."""
+        with self._lock:
+            return self._versions.get(version)
+
+
+    def fragment(self, key: Hashable, render: Callable[[], str]) -> str:
+        """Return the memoized fragment for `key`, rendering it on a miss. Keys must include the relevant generation stamps."""
+        with self._lock:
+            fragment = self._fragments.get(key)
+        if fragment is None:
+            fragment = render()
+            with self._lock:
+                self._fragments.put(key, fragment)
+        return fragment
+
+
+    def clear(self) -> None:
+        with self._lock:
+            self._outputs.clear()
+            self._fragments.clear()
+            self._versions.clear()
+
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"outputs": self._outputs.stats(), "fragments": self._fragments.stats()}
+
+
+codegen_cache = CodegenCache()
@@ -0,0 +1,117 @@
+import hashlib
+import json
+from collections import OrderedDict
+from threading import RLock
+from typing import Any, Callable, Optional, Tuple
+from core.config import FLOW_GRAPH_CACHE_SIZE
+
+
+def flow_version(graph: dict, state: Optional[dict] = None) -> str:
+    """
+    Content hash of what a flow executes: node types, labels, configs, tools, LLMs and edges,
+    plus its state schema (initial values are compiled in) when given.
+    Canvas-only fields (positions, sizes, selection, edge styles) are ignored, so moving a
+    node around doesn't force a recompile.
+    """
+    nodes = sorted(
+        (
+            {"id": node.get("id"), "type": node.get("type"), "data": node.get("data")}
+            for node in graph.get("nodes", [])
+        ),
+        key=lambda node: str(node["id"]),
+    )
+    edges = sorted((str(edge.get("source")), str(edge.get("target"))) for edge in graph.get("edges", []))
+    content = {"nodes": nodes, "edges": edges}
+    if state is not None:
+        content["state"] = state
+    encoded = json.dumps(content, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+class CompiledFlowCache:
+    """
+    LRU of compiled flows keyed by (flow id, version).
+
+    A saved flow that changes gets a new version, so its old entry simply ages out; updating or
+    deleting a flow also drops its entries (see crud/flows.py). Entries that bound a tool are
+    dropped when that tool is updated or deleted (see crud/tools.py).
+
+    Attributes:
+        max_size (int): Maximum number of compiled flows kept.
+    """
+    def __init__(self, max_size: int = FLOW_GRAPH_CACHE_SIZE):
+        self.max_size = max_size
+        self._flows: "OrderedDict[Tuple[int, str], Any]" = OrderedDict()
+        self._lock = RLock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+
+    def get(self, flow_id: int, version: str) -> Optional[Any]:
+        with self._lock:
+            compiled = self._flows.get((flow_id, version))
+            if compiled is None:
+                self.misses += 1
+                return None
+            self._flows.move_to_end((flow_id, version))
+            self.hits += 1
+            return compiled
+
+
+    def put(self, flow_id: int, version: str, compiled: Any) -> None:
+        with self._lock:
+            # Only the latest version of a flow is worth keeping.
+            for key in [key for key in self._flows if key[0] == flow_id and key[1] != version]:
+                del self._flows[key]
+            self._flows[(flow_id, version)] = compiled
+            self._flows.move_to_end((flow_id, version))
+            while len(self._flows) > self.max_size:
+                self._flows.popitem(last=False)
+
+
+    def get_or_compile(self, flow_id: int, version: str, compile: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return the compiled flow and whether it came from the cache, compiling it on a miss."""
+        compiled = self.get(flow_id, version)
+        if compiled is not None:
+            return compiled, True
+        compiled = compile()
+        self.put(flow_id, version, compiled)
+        return compiled, False
+
+
+    def invalidate_flow(self, flow_id: int) -> None:
+        with self._lock:
+            for key in [key for key in self._flows if key[0] == flow_id]:
+                del self._flows[key]
+                self.invalidations += 1
+
+
+    def invalidate_tool(self, tool_name: str) -> None:
+        """Drop compiled flows that bound `tool_name`."""
+        with self._lock:
+            for key, compiled in list(self._flows.items()):
+                if tool_name in getattr(compiled, "tool_names", ()):
+                    del self._flows[key]
+                    self.invalidations += 1
+
+
+    def clear(self) -> None:
+        with self._lock:
+            self._flows.clear()
+
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._flows),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+compiled_flow_cache = CompiledFlowCache()
@@ -1,16 +1,618 @@
-# LangGraph runner from AgentGraph and StateDefinition
-
-from langgraph.graph import StateGraph
-from .models import AgentGraph
-from .state import StateDefinition
-
-def build_langgraph(agent_graph: AgentGraph, state_def: type) -> StateGraph:
-    builder = StateGraph(state_def)
-    for node in agent_graph.nodes:
-        builder.add_node(node.id, your_node_handler(node))
-    for edge in agent_graph.edges:
-        builder.add_edge(edge.source, edge.target)
-    return builder.compile()
-
-def run_agent_flow(compiled_graph, input_data: dict):
-    return compiled_graph.invoke(input_data)
+# Native execution of stored flows: compiles a canvas graph into a DAG of agent nodes and runs it in-process.
+
+import ast
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+import typing
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from schemas.flows import Graph, GraphNode
+from services.flows.checkpoints import checkpoint_store
+from services.flows.graph_cache import compiled_flow_cache, flow_version
+from services.llms.factory import get_llm_client_by_alias
+from services.tools.base import render_runtime
+from services.tools.factory import get_tool_by_name
+from utils.naming_utils import sanitize_to_func_name
+from core.config import FLOW_CHECKPOINTS_ENABLED, FLOW_STREAM_QUEUE_SIZE, FLOW_TOOL_MAX_WORKERS
+
+
+# Bounded pool for blocking tool calls (HTTP APIs, vector stores, web search), shared by every
+# flow run so a wide fan-out can't spawn an unbounded number of threads.
+flow_tool_executor = ThreadPoolExecutor(
+    max_workers=FLOW_TOOL_MAX_WORKERS,
+    thread_name_prefix="flow-tool",
+)
+
+
+class FlowRunError(RuntimeError):
+    """A flow failed to compile or one of its nodes failed to run."""
+    run_id: Optional[str] = None  # set when the run was checkpointed and can be resumed
+
+
+class FlowCompileError(FlowRunError):
+    """The stored flow graph cannot be run as it is (cycle, missing tool, bad node config)."""
+
+
+# Receives run events (node_start, tool_result, token, node_end); awaiting it applies backpressure.
+EventSink = Callable[[dict], Awaitable[None]]
+
+# Called with (node id, state update, timing) as each node finishes, e.g. to checkpoint it.
+NodeCallback = Callable[[str, dict, dict], Awaitable[None]]
+
+
+_INPUT_FORMAT = re.compile(r"^([A-Za-z_]\w*)((?:\[(?:-?\d+|\"[^\"]*\"|'[^']*')\])*)$")
+_SUBSCRIPT = re.compile(r"\[(-?\d+|\"[^\"]*\"|'[^']*')\]")
+
+
+def compile_input_format(expression: str) -> List[Any]:
+    """
+    Parse a node input format such as `messages[-1]["content"]` into a path of keys.
+
+    Only a state key followed by literal subscripts is accepted: the expression is never evaluated.
+
+    Args:
+        expression (str): The node's `inputFormat`.
+
+    Returns:
+        List[Any]: The state key followed by the subscripts, e.g. `["messages", -1, "content"]`.
+    """
+    match = _INPUT_FORMAT.match(expression.strip())
+    if not match:
+        raise FlowCompileError(f"Unsupported input format: {expression!r}")
+    return [match.group(1)] + [ast.literal_eval(key) for key in _SUBSCRIPT.findall(match.group(2))]
+
+
+def resolve_input(state: dict, path: List[Any]) -> Any:
+    """Follow a compiled input path through the state; missing keys and indices resolve to None."""
+    value = state
+    for key in path:
+        try:
+            value = value[key]
+        except (KeyError, IndexError, TypeError):
+            return None
+    return value
+
+
+class _PromptValues(dict):
+    """Leaves unknown placeholders in prompts untouched instead of raising."""
+    def __missing__(self, key):
+        return "{" + key + "}"
+
+
+def render_prompt(template: str, **values) -> str:
+    try:
+        return template.format_map(_PromptValues(values))
+    except (ValueError, IndexError, AttributeError):
+        # Prompts with stray braces (e.g. inline JSON) only get the named placeholders filled in.
+        for key, value in values.items():
+            template = template.replace("{" + key + "}", str(value))
+        return template
+
+
+_runtime_namespaces: Dict[str, Dict[str, Any]] = {}
+_runtime_namespaces_lock = threading.Lock()
+
+
+def runtime_namespace(runtime: str) -> Dict[str, Any]:
+    """Globals of a tool runtime (e.g. the pooled HTTP client), executed once per process so every tool and run shares its connection pools and token cache."""
+    with _runtime_namespaces_lock:
+        if runtime not in _runtime_namespaces:
+            namespace: Dict[str, Any] = {"__name__": f"flow_runtime_{sanitize_to_func_name(runtime)}"}
+            exec(compile(render_runtime(runtime), f"<runtime {runtime}>", "exec"), namespace)
+            _runtime_namespaces[runtime] = namespace
+        return _runtime_namespaces[runtime]
+
+
+def load_tool_function(name: str, code: str, runtimes: List[str] = ()) -> Callable:
+    """
+    Execute a tool's generated code and return the function the agent node calls.
+
+    Args:
+        name (str): The tool name, used to find the function among those the code defines.
+        code (str): Output of `BaseTool.to_code()`, without its runtimes when `runtimes` is given.
+        runtimes (List[str]): Runtimes the code calls into, shared through `runtime_namespace`.
+
+    Returns:
+        Callable: The tool function.
+    """
+    namespace: Dict[str, Any] = {"__name__": f"flow_tool_{sanitize_to_func_name(name)}", "os": os, "json": json}
+    namespace.update({type_name: getattr(typing, type_name) for type_name in ("Any", "Dict", "List", "Optional")})
+    for runtime in runtimes:
+        namespace.update({key: value for key, value in runtime_namespace(runtime).items() if not key.startswith("__")})
+    exec(compile(code, f"<tool {name}>", "exec"), namespace)
+
+    functions = {key: value for key, value in namespace.items() if callable(value) and getattr(value, "__module__", None) == namespace["__name__"]}
+    for candidate in (sanitize_to_func_name(name), name.lower().replace(" ", "_"), "api_call"):
+        if candidate in functions:
+            return functions[candidate]
+    if not functions:
+        raise FlowCompileError(f"Tool '{name}' does not define a function")
+    return list(functions.values())[-1]
+
+
+class CompiledNode:
+    """
+    An agent node bound to its tool function and LLM, ready to run.
+
+    Mirrors the generated `agent_fn` templates: read the input from the state, call the tool,
+    render the prompts with `{context}` and `{query}`, call the LLM and write the output back.
+    """
+    def __init__(self, node: GraphNode, tool_fn: Optional[Callable], default_prompts: dict):
+        config = node.data.node or {}
+        self.id = node.id
+        self.label = node.data.label or f"node_{node.id}"
+        self.tool_name = node.data.tool.name if node.data.tool else None
+        self.tool_fn = tool_fn
+        self.llm = node.data.llm if node.data.llm and node.data.llm.alias else None
+        self.system_prompt = config.get("systemPrompt") or default_prompts.get("system_prompt", "")
+        self.user_prompt = config.get("userPrompt") or default_prompts.get("user_prompt", "{context}\n\n{query}")
+        self.input_path = compile_input_format(config.get("inputFormat") or 'messages[-1]["content"]')
+        self.output_mode = config.get("outputMode") or "text"
+        self.predecessors: List[str] = []
+        self.successors: List[str] = []
+        self.ancestors: List[str] = []  # every upstream node, in topological order
+
+
+    async def run(self, state: dict, db: Session, timing: dict, emit: Optional[EventSink] = None) -> dict:
+        """
+        Run the node against a snapshot of the state.
+
+        Args:
+            state (dict): The flow state when the node starts; not modified.
+            db (Session): Database session used to resolve the LLM client on a registry miss.
+            timing (dict): Filled in with the tool and LLM durations in milliseconds.
+            emit (Optional[EventSink]): When set, the tool result is emitted and the LLM answer is streamed as token events.
+
+        Returns:
+            dict: The node's state update.
+        """
+        query = resolve_input(state, self.input_path)
+        if self.tool_fn is None and self.llm is None:
+            return {}
+
+        context = ""
+        if self.tool_fn is not None:
+            started = time.perf_counter()
+            result = await asyncio.get_running_loop().run_in_executor(flow_tool_executor, self.tool_fn, query)
+            timing["tool_ms"] = (time.perf_counter() - started) * 1000
+            if not result:
+                return {"messages": [{"role": "assistant", "content": f"The {self.tool_name} tool returned no results."}]}
+            context = "\n\n".join(map(str, result)) if isinstance(result, list) else str(result)
+            if emit is not None:
+                await emit({"type": "tool_result", "node_id": self.id, "tool": self.tool_name, "result": context})
+            if self.llm is None:
+                return {"messages": [{"role": "assistant", "content": context}]}
+
+        messages = [
+            {"role": "system", "content": render_prompt(self.system_prompt, context=context, query=query)},
+            {"role": "user", "content": render_prompt(self.user_prompt, context=context, query=query)},
+        ]
+        llm = get_llm_client_by_alias(self.llm.alias, db=db, is_remote=self.llm.type == "remote")
+        kwargs = {"model": self.llm.model} if self.llm.model else {}
+        started = time.perf_counter()
+        if emit is None:
+            text = await asyncio.to_thread(llm.get_chat_completion, messages, **kwargs)
+        else:
+            chunks = []
+            tokens = llm.stream_chat_completion(messages, **kwargs)
+            async with aclosing(tokens):
+                async for token in tokens:
+                    if not chunks:
+                        timing["first_token_ms"] = (time.perf_counter() - started) * 1000
+                    chunks.append(token)
+                    await emit({"type": "token", "node_id": self.id, "content": token})
+            text = "".join(chunks)
+        timing["llm_ms"] = (time.perf_counter() - started) * 1000
+        return self.output(text)
+
+
+    def output(self, text: str) -> dict:
+        update = {"messages": [{"role": "assistant", "content": text}]}
+        if self.output_mode == "structured":
+            try:
+                parsed = json.loads(text)
+            except json.JSONDecodeError:
+                parsed = None
+            if isinstance(parsed, dict):
+                update.update({key: value for key, value in parsed.items() if key != "messages"})
+        return update
+
+
+def merge_update(state: dict, update: dict) -> None:
+    """Apply a node's update: messages are appended, every other key is overwritten."""
+    for key, value in update.items():
+        if key == "messages":
+            state.setdefault("messages", []).extend(value)
+        else:
+            state[key] = value
+
+
+class CompiledFlow:
+    """
+    A flow graph compiled into a DAG of agent nodes.
+
+    Independent branches run concurrently. A node starts once all its predecessors have
+    finished, against a state built from the initial state plus the updates of its
+    ancestors applied in topological order, so a join node sees the same state however
+    its branches interleaved.
+
+    Attributes:
+        flow_id (int): The flow's database id.
+        version (str): Content hash of the graph it was compiled from.
+        nodes (Dict[str, CompiledNode]): Agent nodes reachable from the start node, by node id.
+        order (List[str]): Node ids in topological order, ties broken by canvas order.
+        branches (List[List[str]]): Chains of nodes between fan-outs and joins, for branch timings.
+        tool_names (set): Names of the tools the flow bound, for cache invalidation.
+        initial_state (dict): State fields with an initial value.
+    """
+    def __init__(self, flow_id: int, version: str, nodes: Dict[str, CompiledNode], order: List[str], initial_state: dict):
+        self.flow_id = flow_id
+        self.version = version
+        self.nodes = nodes
+        self.order = order
+        self.position = {node_id: i for i, node_id in enumerate(order)}
+        self.branches = self._branches()
+        self.tool_names = {node.tool_name for node in nodes.values() if node.tool_name}
+        self.initial_state = initial_state
+
+
+    def _branches(self) -> List[List[str]]:
+        """Split the DAG into maximal chains: a chain continues while a node has a single successor that has it as its single predecessor."""
+        def continues(node_id: str) -> bool:
+            node = self.nodes[node_id]
+            return len(node.successors) == 1 and len(self.nodes[node.successors[0]].predecessors) == 1
+
+        heads = [
+            node_id for node_id in self.order
+            if len(self.nodes[node_id].predecessors) != 1 or not continues(self.nodes[node_id].predecessors[0])
+        ]
+        branches = []
+        for head in heads:
+            branch = [head]
+            while continues(branch[-1]):
+                branch.append(self.nodes[branch[-1]].successors[0])
+            branches.append(branch)
+        return branches
+
+
+    def initial(self, input_data: Optional[dict]) -> dict:
+        input_data = dict(input_data or {})
+        messages = input_data.pop("messages", None) or [{"role": "user", "content": "Start workflow"}]
+        state = {"messages": [], "message_type": None, "next": None, **self.initial_state, **input_data}
+        for message in messages:
+            if isinstance(message, str):
+                message = {"content": message}
+            state["messages"].append({"role": message.get("role", "user"), **message})
+        return state
+
+
+    @staticmethod
+    def state_from(initial: dict, updates: Dict[str, dict], node_ids: List[str]) -> dict:
+        state = {**initial, "messages": list(initial["messages"])}
+        for node_id in node_ids:
+            merge_update(state, updates[node_id])
+        return state
+
+
+    async def run(
+        self,
+        input_data: Optional[dict],
+        db: Session,
+        emit: Optional[EventSink] = None,
+        completed: Optional[Dict[str, dict]] = None,
+        on_node_done: Optional[NodeCallback] = None,
+    ) -> dict:
+        """
+        Run the flow to completion, running independent branches concurrently.
+
+        Args:
+            input_data (Optional[dict]): Initial state, e.g. `{"messages": [{"role": "user", "content": "..."}]}`.
+            db (Session): Database session used to resolve LLM clients.
+            emit (Optional[EventSink]): Receives node_start/node_end events and the nodes' tool_result/token events.
+            completed (Optional[Dict[str, dict]]): Nodes finished by an earlier attempt of the run, as node id ->
+                {"update", "timing"}; they are not run again.
+            on_node_done (Optional[NodeCallback]): Awaited as each node finishes, before its successors start.
+
+        Returns:
+            dict: The final state, the per-node and per-branch timings.
+        """
+        initial = self.initial(input_data)
+        started = time.perf_counter()
+        updates: Dict[str, dict] = {}
+        timings: Dict[str, dict] = {}
+        waiting = {node_id: len(node.predecessors) for node_id, node in self.nodes.items()}
+        running: Dict[asyncio.Task, str] = {}
+
+        for node_id, checkpoint in (completed or {}).items():
+            if node_id in self.nodes:
+                updates[node_id] = checkpoint["update"]
+                timings[node_id] = {**checkpoint["timing"], "resumed": True}
+                for successor in self.nodes[node_id].successors:
+                    waiting[successor] -= 1
+
+        async def start(node_id: str) -> None:
+            node = self.nodes[node_id]
+            timings[node_id] = {"node_id": node.id, "label": node.label, "start_ms": (time.perf_counter() - started) * 1000}
+            if emit is not None:
+                await emit({"type": "node_start", "node_id": node.id, "label": node.label})
+            state = self.state_from(initial, updates, node.ancestors)
+            running[asyncio.create_task(node.run(state, db, timings[node_id], emit))] = node_id
+
+        for node_id in self.order:
+            if not waiting[node_id] and node_id not in updates:
+                await start(node_id)
+        try:
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                # Finish in topological order so successors are started deterministically.
+                for task in sorted(done, key=lambda task: self.position[running[task]]):
+                    node_id = running.pop(task)
+                    node = self.nodes[node_id]
+                    try:
+                        updates[node_id] = task.result()
+                    except FlowRunError:
+                        raise
+                    except Exception as e:
+                        raise FlowRunError(f"Node '{node.label}' failed: {e}") from e
+                    timings[node_id]["duration_ms"] = (time.perf_counter() - started) * 1000 - timings[node_id]["start_ms"]
+                    if on_node_done is not None:
+                        await on_node_done(node_id, updates[node_id], timings[node_id])
+                    if emit is not None:
+                        await emit({"type": "node_end", "node_id": node_id, "update": updates[node_id], "timing": timings[node_id]})
+                    for successor in node.successors:
+                        waiting[successor] -= 1
+                        if not waiting[successor]:
+                            await start(successor)
+        finally:
+            # A failed node stops the run: don't leave its siblings running.
+            for task in running:
+                task.cancel()
+
+        node_timings = [timings[node_id] for node_id in self.order]
+        branch_timings = []
+        for branch in self.branches:
+            start_ms = timings[branch[0]]["start_ms"]
+            end_ms = timings[branch[-1]]["start_ms"] + timings[branch[-1]]["duration_ms"]
+            branch_timings.append({"nodes": branch, "start_ms": start_ms, "duration_ms": end_ms - start_ms})
+        return {
+            "state": self.state_from(initial, updates, self.order),
+            "nodes": node_timings,
+            "branches": branch_timings,
+            "total_ms": (time.perf_counter() - started) * 1000,
+        }
+
+
+def compile_flow(flow_id: int, graph: dict, state: Optional[dict], db: Session, version: Optional[str] = None) -> CompiledFlow:
+    """
+    Compile a stored flow graph, binding every agent node to its tool.
+
+    Args:
+        flow_id (int): The flow's database id.
+        graph (dict): The stored `Flow.graph`.
+        state (Optional[dict]): The stored `Flow.state`, whose initial values seed each run.
+        db (Session): Database session used to look up the tools.
+        version (Optional[str]): Precomputed `flow_version(graph, state)`.
+
+    Returns:
+        CompiledFlow: The compiled flow.
+    """
+    try:
+        parsed = Graph.model_validate(graph)
+    except ValidationError as e:
+        raise FlowCompileError(f"Invalid flow graph: {e}") from e
+    canvas_order = {node.id: i for i, node in enumerate(parsed.nodes)}
+    starts = {node.id for node in parsed.nodes if node.type == "start"}
+    structural = starts | {node.id for node in parsed.nodes if node.type == "end"}
+
+    successors: Dict[str, List[str]] = {node.id: [] for node in parsed.nodes}
+    for edge in parsed.edges:
+        if edge.source not in successors or edge.target not in successors:
+            raise FlowCompileError(f"Edge {edge.id} references a node that does not exist")
+        successors[edge.source].append(edge.target)
+
+    # Only nodes reachable from the start node run, like in the generated LangGraph code.
+    reachable, stack = set(), list(starts or canvas_order)
+    while stack:
+        node_id = stack.pop()
+        if node_id not in reachable:
+            reachable.add(node_id)
+            stack.extend(successors[node_id])
+
+    tool_fns: Dict[str, Callable] = {}
+    default_prompts: Dict[str, dict] = {}
+    nodes: Dict[str, CompiledNode] = {}
+    for node in parsed.nodes:
+        if node.id in structural or node.id not in reachable:
+            continue
+        tool_name = node.data.tool.name if node.data.tool else None
+        if tool_name and tool_name not in tool_fns:
+            tool = get_tool_by_name(db, tool_name)
+            if tool is None:
+                raise FlowCompileError(f"Tool '{tool_name}' used by node '{node.data.label}' not found")
+            runtimes = getattr(tool, "runtimes", [])
+            code = tool.to_code(include_runtime=False) if runtimes else tool.to_code()
+            tool_fns[tool_name] = load_tool_function(tool_name, code, runtimes)
+            default_prompts[tool_name] = tool.get_default_agent_prompts()
+        nodes[node.id] = CompiledNode(node, tool_fns.get(tool_name), default_prompts.get(tool_name, {}))
+
+    for source, targets in successors.items():
+        for target in targets:
+            if source in nodes and target in nodes:
+                nodes[source].successors.append(target)
+                nodes[target].predecessors.append(source)
+
+    # Kahn's algorithm; a node becomes ready once all its predecessors have run.
+    indegree = {node_id: len(node.predecessors) for node_id, node in nodes.items()}
+    ready = sorted((node_id for node_id, degree in indegree.items() if degree == 0), key=canvas_order.get)
+    order = []
+    while ready:
+        node_id = ready.pop(0)
+        order.append(node_id)
+        for target in nodes[node_id].successors:
+            indegree[target] -= 1
+            if indegree[target] == 0:
+                ready.append(target)
+                ready.sort(key=canvas_order.get)
+    if len(order) != len(nodes):
+        raise FlowCompileError("Flow graph has a cycle; only acyclic flows can be run")
+
+    position = {node_id: i for i, node_id in enumerate(order)}
+    for node_id in order:
+        ancestors = set(nodes[node_id].predecessors)
+        for predecessor in nodes[node_id].predecessors:
+            ancestors.update(nodes[predecessor].ancestors)
+        nodes[node_id].ancestors = sorted(ancestors, key=position.get)
+
+    initial_state = {
+        field["name"]: field["initialValue"]
+        for field in (state or {}).get("fields", [])
+        if field.get("initialValue") is not None
+    }
+    return CompiledFlow(flow_id, version or flow_version(graph, state), nodes, order, initial_state)
+
+
+async def get_compiled_flow(flow, db: Session):
+    """Return the cached compilation of a stored flow, compiling it on a miss, and the compile timings."""
+    started = time.perf_counter()
+    version = flow_version(flow.graph, flow.state)
+    compiled, cached = await asyncio.to_thread(
+        compiled_flow_cache.get_or_compile, flow.id, version,
+        lambda: compile_flow(flow.id, flow.graph, flow.state, db, version),
+    )
+    return compiled, {"compile_ms": (time.perf_counter() - started) * 1000, "compiled_from_cache": cached}
+
+
+def final_output(state: dict) -> Optional[str]:
+    """The content of the last assistant message of a run's state."""
+    return next((m.get("content") for m in reversed(state["messages"]) if m.get("role") == "assistant"), None)
+
+
+def _run_result(compiled: CompiledFlow, result: dict, started: float, compile_timings: dict, run_id: Optional[str]) -> dict:
+    state = result["state"]
+    return {
+        "flow_id": compiled.flow_id,
+        "version": compiled.version,
+        "run_id": run_id,
+        "output": final_output(state),
+        "state": state,
+        "timings": {
+            "total_ms": (time.perf_counter() - started) * 1000,
+            **compile_timings,
+            "nodes": result["nodes"],
+            "branches": result["branches"],
+        },
+    }
+
+
+async def _execute(
+    compiled: CompiledFlow,
+    db: Session,
+    input_data: Optional[dict],
+    emit: Optional[EventSink] = None,
+    run: Optional[dict] = None,
+    checkpoint: bool = FLOW_CHECKPOINTS_ENABLED,
+) -> Tuple[Optional[str], dict]:
+    """Run a compiled flow, checkpointing each node so the run can be resumed; `run` is a checkpointed run to resume."""
+    if not checkpoint and run is None:
+        return None, await compiled.run(input_data, db, emit=emit)
+
+    if run is None:
+        run_id = uuid.uuid4().hex
+        await asyncio.to_thread(checkpoint_store.create_run, run_id, compiled.flow_id, compiled.version, input_data)
+    else:
+        run_id = run["run_id"]
+        await asyncio.to_thread(checkpoint_store.set_run_status, run_id, "running")
+
+    async def save(node_id: str, update: dict, timing: dict) -> None:
+        await asyncio.to_thread(checkpoint_store.save_node, run_id, node_id, update, timing)
+
+    try:
+        result = await compiled.run(input_data, db, emit=emit, completed=run["nodes"] if run else None, on_node_done=save)
+    except asyncio.CancelledError:
+        await asyncio.to_thread(checkpoint_store.set_run_status, run_id, "cancelled")
+        raise
+    except Exception as e:
+        await asyncio.to_thread(checkpoint_store.set_run_status, run_id, "failed", str(e))
+        if isinstance(e, FlowRunError):
+            e.run_id = run_id
+        raise
+    await asyncio.to_thread(checkpoint_store.set_run_status, run_id, "completed")
+    return run_id, result
+
+
+async def run_flow(flow, db: Session, input_data: Optional[dict] = None, run: Optional[dict] = None) -> dict:
+    """
+    Compile (or reuse the cached compilation of) a stored flow and run it.
+
+    Args:
+        flow: The `Flow` database object.
+        db (Session): Database session.
+        input_data (Optional[dict]): Initial state for the run.
+        run (Optional[dict]): A checkpointed run to resume (from `checkpoint_store.load_run`); its input is used.
+
+    Returns:
+        dict: The run id, the final state, the last assistant message and the timings.
+    """
+    started = time.perf_counter()
+    compiled, compile_timings = await get_compiled_flow(flow, db)
+    if run is not None:
+        if run["version"] != compiled.version:
+            raise FlowCompileError(f"Flow {flow.id} changed since run {run['run_id']} started; it can't be resumed")
+        input_data = run["input"]
+    run_id, result = await _execute(compiled, db, input_data, run=run)
+    return _run_result(compiled, result, started, compile_timings, run_id)
+
+
+async def stream_flow(flow, db: Session, input_data: Optional[dict] = None, queue_size: int = FLOW_STREAM_QUEUE_SIZE) -> AsyncGenerator[dict, None]:
+    """
+    Compile a stored flow and return a generator that runs it, yielding its events as they happen.
+
+    Compilation happens here, before anything is streamed, so compile errors can still be
+    reported as a plain HTTP error. The run writes into a bounded queue, so a slow consumer
+    pauses token streaming instead of buffering the whole run. Closing the generator (e.g. on
+    client disconnect) cancels the run.
+
+    Args:
+        flow: The `Flow` database object.
+        db (Session): Database session.
+        input_data (Optional[dict]): Initial state for the run.
+        queue_size (int): Maximum number of events buffered ahead of the consumer.
+
+    Returns:
+        AsyncGenerator[dict, None]: node_start, tool_result, token and node_end events, then a
+            `final` event with the `run_flow` result, or an `error` event.
+    """
+    started = time.perf_counter()
+    compiled, compile_timings = await get_compiled_flow(flow, db)
+
+    async def events() -> AsyncGenerator[dict, None]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+        async def produce():
+            try:
+                run_id, result = await _execute(compiled, db, input_data, emit=queue.put)
+                await queue.put({"type": "final", "result": _run_result(compiled, result, started, compile_timings, run_id)})
+            except FlowRunError as e:
+                await queue.put({"type": "error", "detail": str(e), "run_id": e.run_id})
+            except Exception as e:
+                await queue.put({"type": "error", "detail": f"Failed to run flow: {e}"})
+
+        task = asyncio.create_task(produce())
+        try:
+            while True:
+                event = await queue.get()
+                yield event
+                if event["type"] in ("final", "error"):
+                    return
+        finally:
+            task.cancel()
+
+    return events()
@@ -1,7 +1,10 @@
 from abc import ABC, abstractmethod
-import os
-from jinja2 import Environment, FileSystemLoader, select_autoescape
-from typing import Optional, AsyncGenerator
+from core.templates import template_registry
+from typing import Optional, AsyncGenerator, Dict, List
+
+
+# A chat message as sent to providers: {"role": "system" | "user" | "assistant", "content": "..."}
+ChatMessage = Dict[str, str]
 
 
 class BaseLLM(ABC):
@@ -11,31 +14,53 @@ class BaseLLM(ABC):
     Attributes:
         name (str): The name of the LLM.
         client: The client for the LLM.
-        env: The Jinja2 environment for rendering templates.
+        async_client: The asyncio client used for streaming, where the provider has one.
+        rate_limiter: The alias's ProviderRateLimiter, set by the factory; None for unlimited.
+        env: The shared Jinja2 environment for rendering templates.
     """
     def __init__(self, name: str):
         self.name = name
         self.client = None
-
-        templates_path = os.path.abspath(
-            os.path.join(os.path.dirname(__file__), "../../templates")
-        )
-        self.env = Environment(
-            loader=FileSystemLoader(templates_path),
-            autoescape=select_autoescape()
-        )
+        self.async_client = None
+        self.rate_limiter = None
+        self.env = template_registry.env
         self.template = None  # Template for rendering code
 
     @abstractmethod
-    def get_completion(self, system_prompt: str, user_prompt: str, **kwargs) -> str:
-        """Get a non-streaming completion from the LLM."""
+    def get_chat_completion(self, messages: List[ChatMessage], **kwargs) -> str:
+        """Get a non-streaming completion for a list of chat messages."""
         ...
 
 
     @abstractmethod
+    def stream_chat_completion(self, messages: List[ChatMessage], **kwargs) -> AsyncGenerator[str, None]:
+        """Stream a completion for a list of chat messages."""
+        ...
+
+
+    def get_completion(self, system_prompt: str, user_prompt: str, **kwargs) -> str:
+        """Get a non-streaming completion from the LLM."""
+        return self.get_chat_completion(self.to_messages(system_prompt, user_prompt), **kwargs)
+
+
     def stream_completion(self, system_prompt: str, user_prompt: str, **kwargs) -> AsyncGenerator[str, None]:
         """Stream a completion from the LLM."""
-        ...
+        return self.stream_chat_completion(self.to_messages(system_prompt, user_prompt), **kwargs)
+
+
+    def observe_rate_limits(self, headers) -> None:
+        """Feed provider rate limit headers to the rate limiter."""
+        if self.rate_limiter is not None:
+            self.rate_limiter.observe_headers(headers)
+
+
+    @staticmethod
+    def to_messages(system_prompt: str, user_prompt: str) -> List[ChatMessage]:
+        """Build the chat messages for a single system + user prompt pair."""
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
 
     
     @abstractmethod
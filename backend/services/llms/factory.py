@@ -2,8 +2,12 @@ from services.llms.providers.anthropic import AnthropicAPILLM
 from services.llms.providers.openai import OpenAIAPILLM
 from services.llms.local.lm_studio import LMStudioLLM
 from services.llms.providers.hugging_face import HuggingFaceAPILLM
-from typing import Callable, Dict
-from crud.llms import get_api_key_by_alias, get_remote_llm_by_alias, get_local_llm_by_alias
+from typing import Callable, Dict, Optional, Union
+from services.llms.registry import llm_client_registry
+from services.llms.rate_limit import rate_limiter_registry
+from crud.llms import get_remote_llm_by_alias, get_local_llm_by_alias
+from core.encryption import fernet_decrypt
+from models.llms import LLMRemote, LLMLocal
 from sqlalchemy.orm import Session
 
 try:
@@ -20,32 +24,49 @@ REMOTE_PROVIDERS: Dict[str, Callable[[str], object]] = {
     "huggingface": lambda key: HuggingFaceAPILLM(api_key=key),
 }
 
-LOCAL_PROVIDERS: Dict[str, Callable[[str], object]] = {
-    "lm-studio": lambda path: LMStudioLLM(),
+LOCAL_PROVIDERS: Dict[str, Callable[[str, dict], object]] = {
+    "lm-studio": lambda path, parameters: LMStudioLLM(),
 }
 
 if LLAMA_CPP_AVAILABLE:
-    LOCAL_PROVIDERS["llama-cpp"] = lambda path: LlamaCppLLM(path)
+    LOCAL_PROVIDERS["llama-cpp"] = lambda path, parameters: LlamaCppLLM(path, parameters)
 
 
-def get_llm_client_by_alias(alias: str, db: Session, is_remote: bool):
+def get_llm_client_by_alias(alias: str, db: Session, is_remote: bool, llm: Optional[Union[LLMRemote, LLMLocal]] = None):
+    """
+    Get a warm LLM client for an alias from the process-wide registry.
+    The DB lookup, key decryption and client construction only run on a registry miss.
+    Clients of the same alias share its rate limiter.
+    Callers that already fetched the alias's row (e.g. in a batch) pass it as `llm` to skip the lookup.
+    """
+    def create():
+        client = create_llm_client_by_alias(alias, db=db, is_remote=is_remote, llm=llm)
+        client.rate_limiter = rate_limiter_registry.get(alias, is_remote)
+        return client
+
+    return llm_client_registry.get_or_create(alias, is_remote, create)
+
+
+def create_llm_client_by_alias(alias: str, db: Session, is_remote: bool, llm: Optional[Union[LLMRemote, LLMLocal]] = None):
 
     try:
         if is_remote:
-            llm = get_remote_llm_by_alias(db, alias=alias)
-            api_key = get_api_key_by_alias(db, alias=alias)
+            if llm is None:
+                llm = get_remote_llm_by_alias(db, alias=alias)
+            api_key = fernet_decrypt(llm.api_key)
             if llm.provider not in REMOTE_PROVIDERS:
                 raise ValueError(f"Unknown Remote LLM provider: {llm.provider}")
 
             return REMOTE_PROVIDERS[llm.provider](api_key)
 
         else:
-            llm = get_local_llm_by_alias(db, alias=alias)
+            if llm is None:
+                llm = get_local_llm_by_alias(db, alias=alias)
 
             if llm.provider not in LOCAL_PROVIDERS:
                 raise ValueError(f"Unknown Local LLM provider: {llm.provider}")
 
-            return LOCAL_PROVIDERS[llm.provider](llm.path)
+            return LOCAL_PROVIDERS[llm.provider](llm.path, llm.parameters)
     except Exception as e:
         print(f"LLM client instantiation error: {e}")
         raise
@@ -1,5 +1,10 @@
-from services.llms.base import BaseLocalLLM
-from typing import Optional, AsyncGenerator
+from services.llms.base import BaseLocalLLM, ChatMessage
+from services.llms.local.streaming import iterate_in_executor
+from services.llms.local.model_cache import model_residency_manager, resolve_load_parameters
+from services.llms.local.scheduler import local_inference_scheduler
+from services.llms.local.prompt_cache import prompt_cache_manager
+from core.config import LLAMA_CPP_DEFAULT_SLOTS
+from typing import Optional, AsyncGenerator, List
 import os
 
 try:
@@ -12,7 +17,7 @@ except ImportError:
 
 class LlamaCppLLM(BaseLocalLLM):
     """LLaMA-CPP LLM."""
-    def __init__(self, path: Optional[str] = None):
+    def __init__(self, path: Optional[str] = None, parameters: Optional[dict] = None):
         super().__init__("llama-cpp", path)
         if not LLAMA_CPP_AVAILABLE:
             raise ImportError(
@@ -21,54 +26,91 @@ class LlamaCppLLM(BaseLocalLLM):
                 "or see README for build instructions."
             )
         self.client = None
+        # n_ctx / n_threads / n_batch / use_mmap / use_mlock from the LLMLocal.parameters column
+        self.load_parameters = resolve_load_parameters(parameters)
+        # Parallel contexts per model; requests beyond that queue in the scheduler
+        self.slots = int((parameters or {}).get("n_parallel") or LLAMA_CPP_DEFAULT_SLOTS)
     
 
-    def _load_model(self, model_path: str):
-        self.client = Llama(
-            model_path=f"{self.path}/{model_path}",
-            n_ctx=1024,
-            n_threads=4,
-            verbose=False,
-        )
-        return
+    def _model_key(self, model_path: str) -> tuple:
+        return model_residency_manager.make_key(f"{self.path}/{model_path}", self.load_parameters)
 
-    def get_completion(
+
+    def _load_model(self, model_path: str, slot: int = 0) -> Llama:
+        """Get the slot's model context from the residency manager, loading it from disk only on a miss."""
+        return model_residency_manager.get(f"{self.path}/{model_path}", self.load_parameters, slot=slot)
+
+
+    def _prepare_prompt(self, client: Llama, model_key: tuple, prompt: str) -> list[int]:
+        """
+        Tokenize the prompt and restore the best cached KV state for it, so only the
+        tokens after the longest known prefix (e.g. the chat history) are evaluated.
+        """
+        tokens = client.tokenize(prompt.encode("utf-8"), special=True)
+        prompt_cache_manager.prepare(model_key, client, tokens)
+        return tokens
+
+
+    @staticmethod
+    def _format_prompt(messages: List[ChatMessage]) -> str:
+        """
+        Render the conversation turn by turn. Earlier turns render to the same text on every
+        request, so the prompt cache can reuse them as a prefix.
+        """
+        turns = "".join(f"<|{m['role']}|>\n{m['content']}\n" for m in messages)
+        return f"{turns}<|assistant|>\n"
+
+
+    def get_chat_completion(
         self,
-        system_prompt: str,
-        user_prompt: str,
+        messages: List[ChatMessage],
         model: str,
         temperature: float = 0.1,
         max_tokens: int = 1024,
         **kwargs,
     ) -> str:
-        prompt = f"<|system|>\n{system_prompt}\n<|user|>\n{user_prompt}\n<|assistant|>\n"
-        self._load_model(model)
-        output = self.client(
-            prompt,
-            temperature=temperature,
-            stream=False
-        )
+        prompt = self._format_prompt(messages)
+        model_key = self._model_key(model)
+        with local_inference_scheduler.slot_sync(model_key, self.slots) as slot:
+            client = self._load_model(model, slot)
+            output = client(
+                self._prepare_prompt(client, model_key, prompt),
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=False
+            )
+            prompt_cache_manager.save(model_key, client)
         return output["choices"][0]["text"]
 
 
-    async def stream_completion(
+    async def stream_chat_completion(
         self,
-        system_prompt: str,
-        user_prompt: str,
+        messages: List[ChatMessage],
         model: str,
         temperature: float = 0.1,
         max_tokens: int = 1024,
         **kwargs,
     ) -> AsyncGenerator[str, None]:
-        prompt = f"<|system|>\n{system_prompt}\n<|user|>\n{user_prompt}\n<|assistant|>\n"
-        self._load_model(model)
-        stream = self.client(
-            prompt,
-            temperature=temperature,
-            stream=True,
-        )
-        for chunk in stream:
-            yield chunk["choices"][0]["text"]
+        prompt = self._format_prompt(messages)
+
+        model_key = self._model_key(model)
+
+        # Hold a slot until the worker has stopped decoding, even if the client disconnects.
+        async with local_inference_scheduler.slot(model_key, self.slots) as slot:
+
+            def generate():
+                # Runs in the local inference executor: loading and decoding both block.
+                client = self._load_model(model, slot)
+                yield from client(
+                    self._prepare_prompt(client, model_key, prompt),
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=True,
+                )
+                prompt_cache_manager.save(model_key, client)
+
+            async for chunk in iterate_in_executor(generate):
+                yield chunk["choices"][0]["text"]
 
 
     def list_models(self) -> list[str]:
@@ -124,6 +166,26 @@ class LlamaCppLLM(BaseLocalLLM):
                 "min": 1,
                 "max": 32,
             },
+            "n_batch": {
+                "type": "int",
+                "default": 512,
+                "min": 1,
+                "max": 4096,
+            },
+            "use_mmap": {
+                "type": "bool",
+                "default": True,
+            },
+            "use_mlock": {
+                "type": "bool",
+                "default": False,
+            },
+            "n_parallel": {
+                "type": "int",
+                "default": 1,
+                "min": 1,
+                "max": 8,
+            },
             "verbose": {
                 "type": "bool",
                 "default": False,
@@ -1,6 +1,8 @@
-from services.llms.base import BaseLocalLLM
-from typing import Optional, AsyncGenerator
+from services.llms.base import BaseLocalLLM, ChatMessage
+from services.llms.rate_limit import RateLimitError, parse_retry_after, rate_limited, rate_limited_stream
+from typing import Optional, AsyncGenerator, List
 import requests
+import httpx
 import json
 
 
@@ -13,6 +15,7 @@ class LMStudioLLM(BaseLocalLLM):
         self.port = port or 1234
         self.base_url = f"http://{self.host}:{self.port}/v1"
         self.client = None
+        self.async_client = None
     
     def _test_connection(self) -> bool:
         """Test if LM Studio server is running."""
@@ -27,11 +30,17 @@ class LMStudioLLM(BaseLocalLLM):
         if not self.client:
             self.client = requests.Session()
         return self.client
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Create a pooled httpx client for streaming calls."""
+        if not self.async_client:
+            self.async_client = httpx.AsyncClient(base_url=self.base_url, timeout=30)
+        return self.async_client
     
-    def get_completion(
+    @rate_limited
+    def get_chat_completion(
         self,
-        system_prompt: str,
-        user_prompt: str,
+        messages: List[ChatMessage],
         model: str = "local-model",
         temperature: float = 0.1,
         max_tokens: int = 1024,
@@ -40,11 +49,6 @@ class LMStudioLLM(BaseLocalLLM):
         """Get a non-streaming completion from LM Studio."""
         session = self._get_session()
         
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
-        
         payload = {
             "model": model,
             "messages": messages,
@@ -59,28 +63,26 @@ class LMStudioLLM(BaseLocalLLM):
                 json=payload,
                 timeout=30
             )
+            self.observe_rate_limits(response.headers)
+            if response.status_code == 429:
+                raise RateLimitError("LM Studio rate limit", parse_retry_after(response.headers), response.headers)
             response.raise_for_status()
             result = response.json()
             return result["choices"][0]["message"]["content"]
         except requests.exceptions.RequestException as e:
             raise Exception(f"Failed to get completion from LM Studio: {e}")
     
-    async def stream_completion(
+    @rate_limited_stream
+    async def stream_chat_completion(
         self,
-        system_prompt: str,
-        user_prompt: str,
+        messages: List[ChatMessage],
         model: str = "local-model",
         temperature: float = 0.1,
         max_tokens: int = 1024,
         **kwargs,
     ) -> AsyncGenerator[str, None]:
         """Stream a completion from LM Studio."""
-        session = self._get_session()
-        
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
+        client = self._get_async_client()
         
         payload = {
             "model": model,
@@ -91,17 +93,13 @@ class LMStudioLLM(BaseLocalLLM):
         }
         
         try:
-            response = session.post(
-                f"{self.base_url}/chat/completions",
-                json=payload,
-                stream=True,
-                timeout=30
-            )
-            response.raise_for_status()
-            
-            for line in response.iter_lines():
-                if line:
-                    line_str = line.decode('utf-8')
+            async with client.stream("POST", "/chat/completions", json=payload) as response:
+                self.observe_rate_limits(response.headers)
+                if response.status_code == 429:
+                    raise RateLimitError("LM Studio rate limit", parse_retry_after(response.headers), response.headers)
+                response.raise_for_status()
+
+                async for line_str in response.aiter_lines():
                     if line_str.startswith('data: '):
                         data_str = line_str[6:]
                         if data_str.strip() == '[DONE]':
@@ -114,7 +112,7 @@ class LMStudioLLM(BaseLocalLLM):
                                     yield delta['content']
                         except json.JSONDecodeError:
                             continue
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             raise Exception(f"Failed to stream completion from LM Studio: {e}")
     
     def list_models(self) -> list[str]:
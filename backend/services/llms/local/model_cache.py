@@ -0,0 +1,217 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+from core.config import LLAMA_CPP_MAX_RESIDENT_MODELS, LLAMA_CPP_MEMORY_BUDGET_MB
+
+try:
+    from llama_cpp import Llama
+    LLAMA_CPP_AVAILABLE = True
+except ImportError:
+    LLAMA_CPP_AVAILABLE = False
+    Llama = None
+
+
+# Load parameters read from the LLMLocal.parameters column, with the values
+# LlamaCppLLM used to hard-code as defaults.
+DEFAULT_LOAD_PARAMETERS: Dict[str, Any] = {
+    "n_ctx": 1024,
+    "n_threads": 4,
+    "n_batch": 512,
+    "use_mmap": True,
+    "use_mlock": False,
+}
+
+
+def resolve_load_parameters(parameters: Optional[dict]) -> Dict[str, Any]:
+    """Merge the stored LLM parameters over the defaults, keeping only model load options."""
+    resolved = dict(DEFAULT_LOAD_PARAMETERS)
+    for name, value in (parameters or {}).items():
+        if name in DEFAULT_LOAD_PARAMETERS and value is not None:
+            resolved[name] = value
+    return resolved
+
+
+class _ResidentModel:
+    def __init__(self, model: Any, model_path: str, load_time: float, resident_bytes: int, shared: bool):
+        self.model = model
+        self.model_path = model_path
+        self.load_time = load_time
+        self.resident_bytes = resident_bytes
+        self.shared = shared  # weights are mmap'ed, so every context of the file shares one copy
+        self.hits = 0
+        self.last_used = time.time()
+
+
+class ModelResidencyManager:
+    """
+    Keeps loaded llama.cpp models resident between requests.
+
+    Models are keyed by file path, load parameters and scheduler slot (each slot is its own
+    llama.cpp context, see scheduler.py) and evicted in LRU order once
+    either the model count or the memory budget is exceeded. Evicted models are only
+    dereferenced, so a request still decoding with one finishes normally.
+
+    Memory is estimated from the GGUF file size. With `use_mmap` (the default) the weights are
+    mapped from the page cache and shared by every context of that file, so they count once
+    per file however many slots are loaded; without it each context holds its own copy.
+
+    Attributes:
+        max_models (int): Maximum number of resident models.
+        memory_budget_bytes (int): Memory budget for resident models, 0 for no limit.
+    """
+    def __init__(
+        self,
+        max_models: int = LLAMA_CPP_MAX_RESIDENT_MODELS,
+        memory_budget_bytes: int = LLAMA_CPP_MEMORY_BUDGET_MB * 1024 * 1024,
+        loader: Optional[Callable[..., Any]] = None,
+    ):
+        self.max_models = max_models
+        self.memory_budget_bytes = memory_budget_bytes
+        self._loader = loader
+        self._models: "OrderedDict[Hashable, _ResidentModel]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[Hashable, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+    @staticmethod
+    def make_key(model_path: str, load_parameters: Dict[str, Any]) -> Tuple:
+        return (os.path.abspath(model_path), tuple(sorted(load_parameters.items())))
+
+
+    def get(self, model_path: str, load_parameters: Dict[str, Any], slot: int = 0) -> Any:
+        """
+        Return the resident model for a path and load parameters, loading it on a miss.
+        Blocking: call it from a worker thread, not the event loop.
+
+        Args:
+            model_path (str): Path to the GGUF file.
+            load_parameters (Dict[str, Any]): llama.cpp load options (n_ctx, n_threads, n_batch, use_mmap, use_mlock).
+            slot (int): Scheduler slot the context is used by.
+
+        Returns:
+            Llama: The loaded model.
+        """
+        key = self.make_key(model_path, load_parameters) + (slot,)
+        with self._lock:
+            if self._touch(key):
+                return self._models[key].model
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # One loader per key; concurrent requests for the same model wait for it.
+        with load_lock:
+            with self._lock:
+                if self._touch(key):
+                    return self._models[key].model
+                self.misses += 1
+
+            start = time.perf_counter()
+            model = self._load(model_path, load_parameters)
+            load_time = time.perf_counter() - start
+
+            resident = _ResidentModel(
+                model, model_path, load_time, self._estimate_size(model_path), bool(load_parameters.get("use_mmap", True))
+            )
+            with self._lock:
+                self._models[key] = resident
+                self._evict(keep=key)
+            return model
+
+
+    def _touch(self, key: Hashable) -> bool:
+        resident = self._models.get(key)
+        if resident is None:
+            return False
+        self._models.move_to_end(key)
+        resident.hits += 1
+        resident.last_used = time.time()
+        self.hits += 1
+        return True
+
+
+    def _load(self, model_path: str, load_parameters: Dict[str, Any]) -> Any:
+        if self._loader is not None:
+            return self._loader(model_path=model_path, **load_parameters)
+        if not LLAMA_CPP_AVAILABLE:
+            raise ImportError(
+                "llama-cpp-python is not installed. "
+                "Install it with: uv pip install llama-cpp-python "
+                "or see README for build instructions."
+            )
+        return Llama(model_path=model_path, verbose=False, **load_parameters)
+
+
+    @staticmethod
+    def _estimate_size(model_path: str) -> int:
+        try:
+            return os.path.getsize(model_path)
+        except OSError:
+            return 0
+
+
+    def _evict(self, keep: Hashable) -> None:
+        def over_budget() -> bool:
+            if len(self._models) > self.max_models:
+                return True
+            return bool(self.memory_budget_bytes) and self.resident_bytes() > self.memory_budget_bytes
+
+        while over_budget() and len(self._models) > 1:
+            key = next(iter(self._models))
+            if key == keep:
+                break
+            self._models.pop(key)
+            self._load_locks.pop(key, None)
+            self.evictions += 1
+
+
+    def resident_bytes(self) -> int:
+        shared: Dict[str, int] = {}
+        private = 0
+        for resident in self._models.values():
+            if resident.shared:
+                shared[os.path.abspath(resident.model_path)] = resident.resident_bytes
+            else:
+                private += resident.resident_bytes
+        return private + sum(shared.values())
+
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+            self._load_locks.clear()
+
+
+    def stats(self) -> dict:
+        """Return hit rate, load times and resident sizes."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "resident_models": len(self._models),
+                "max_models": self.max_models,
+                "resident_bytes": self.resident_bytes(),
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "models": [
+                    {
+                        "model_path": resident.model_path,
+                        "load_parameters": dict(key[1]),
+                        "slot": key[2],
+                        "load_time_s": round(resident.load_time, 3),
+                        "resident_bytes": resident.resident_bytes,
+                        "shared_weights": resident.shared,
+                        "hits": resident.hits,
+                        "last_used": resident.last_used,
+                    }
+                    for key, resident in self._models.items()
+                ],
+            }
+
+
+model_residency_manager = ModelResidencyManager()
@@ -0,0 +1,172 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+from core.config import LLAMA_CPP_PROMPT_CACHE_MB
+
+
+def common_prefix_length(a: Sequence[int], b: Sequence[int]) -> int:
+    """Length of the shared token prefix of two sequences."""
+    n = min(len(a), len(b))
+    for i in range(n):
+        if a[i] != b[i]:
+            return i
+    return n
+
+
+class PromptStateCache:
+    """
+    Prefix-matched cache of llama.cpp KV states for one model.
+
+    States are keyed by the token sequence they hold. A new prompt restores the cached
+    state sharing the longest token prefix with it, so llama.cpp only evaluates the
+    tokens after that prefix: a new chat turn costs its own tokens, not the whole history.
+
+    Attributes:
+        capacity_bytes (int): Maximum size of the cached states; least recently used go first.
+    """
+    def __init__(self, capacity_bytes: int):
+        self.capacity_bytes = capacity_bytes
+        self._states: "OrderedDict[Tuple[int, ...], Any]" = OrderedDict()
+        self._sizes: Dict[Tuple[int, ...], int] = {}
+        self._lock = threading.Lock()
+
+
+    def longest_prefix(self, tokens: Sequence[int]) -> Tuple[Optional[Tuple[int, ...]], int]:
+        """Return the key of the cached state sharing the longest prefix with `tokens`, and that length."""
+        best_key, best_length = None, 0
+        with self._lock:
+            for key in self._states:
+                length = common_prefix_length(key, tokens)
+                if length > best_length:
+                    best_key, best_length = key, length
+        return best_key, best_length
+
+
+    def get(self, key: Tuple[int, ...]) -> Optional[Any]:
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None:
+                self._states.move_to_end(key)
+            return state
+
+
+    def put(self, tokens: Sequence[int], state: Any) -> None:
+        key = tuple(tokens)
+        size = int(getattr(state, "llama_state_size", 0))
+        if not key or size > self.capacity_bytes:
+            return
+        with self._lock:
+            self._states[key] = state
+            self._sizes[key] = size
+            self._states.move_to_end(key)
+            while self.size_bytes() > self.capacity_bytes:
+                evicted, _ = self._states.popitem(last=False)
+                self._sizes.pop(evicted, None)
+
+
+    def size_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+
+class PromptCacheManager:
+    """
+    Per-model prompt state caches plus tokens-reused / tokens-evaluated accounting.
+
+    Attributes:
+        capacity_bytes (int): State cache capacity for each model.
+    """
+    def __init__(self, capacity_bytes: int = LLAMA_CPP_PROMPT_CACHE_MB * 1024 * 1024):
+        self.capacity_bytes = capacity_bytes
+        self._caches: Dict[Hashable, PromptStateCache] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.tokens_reused = 0
+        self.tokens_evaluated = 0
+        self.state_restores = 0
+        self.last_request: Optional[dict] = None
+
+
+    def cache_for(self, model_key: Hashable) -> PromptStateCache:
+        with self._lock:
+            cache = self._caches.get(model_key)
+            if cache is None:
+                cache = self._caches[model_key] = PromptStateCache(self.capacity_bytes)
+            return cache
+
+
+    def prepare(self, model_key: Hashable, client: Any, tokens: List[int]) -> dict:
+        """
+        Put the context in the best state for `tokens` before generation.
+
+        The context already holds the tokens of its previous request; if a cached state
+        shares a longer prefix with the prompt, it is restored instead. llama.cpp then
+        skips the shared prefix on its own when generating.
+
+        Args:
+            model_key (Hashable): Model key (path and load parameters).
+            client (Llama): The slot's llama.cpp context.
+            tokens (List[int]): Prompt tokens.
+
+        Returns:
+            dict: Per-request metrics (prompt_tokens, tokens_reused, tokens_evaluated, source).
+        """
+        in_context = common_prefix_length(client.input_ids[:client.n_tokens].tolist(), tokens)
+        cache = self.cache_for(model_key)
+        cached_key, cached = cache.longest_prefix(tokens)
+
+        source = "context" if in_context else "none"
+        reused = in_context
+        if cached > in_context:
+            state = cache.get(cached_key)
+            if state is not None:
+                client.load_state(state)
+                source = "cache"
+                reused = cached
+
+        # llama.cpp always re-evaluates at least the last prompt token to get logits
+        reused = min(reused, max(len(tokens) - 1, 0))
+        metrics = {
+            "prompt_tokens": len(tokens),
+            "tokens_reused": reused,
+            "tokens_evaluated": len(tokens) - reused,
+            "source": source,
+        }
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += len(tokens)
+            self.tokens_reused += reused
+            self.tokens_evaluated += len(tokens) - reused
+            self.state_restores += source == "cache"
+            self.last_request = metrics
+        return metrics
+
+
+    def save(self, model_key: Hashable, client: Any) -> None:
+        """Cache the context's state, keyed by the tokens it now holds."""
+        tokens = client.input_ids[:client.n_tokens].tolist()
+        if tokens:
+            self.cache_for(model_key).put(tokens, client.save_state())
+
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "prompt_tokens": self.prompt_tokens,
+                "tokens_reused": self.tokens_reused,
+                "tokens_evaluated": self.tokens_evaluated,
+                "reuse_ratio": self.tokens_reused / self.prompt_tokens if self.prompt_tokens else 0.0,
+                "state_restores": self.state_restores,
+                "capacity_bytes_per_model": self.capacity_bytes,
+                "cached_states": sum(len(cache) for cache in self._caches.values()),
+                "cached_bytes": sum(cache.size_bytes() for cache in self._caches.values()),
+                "last_request": self.last_request,
+            }
+
+
+prompt_cache_manager = PromptCacheManager()
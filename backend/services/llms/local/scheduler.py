@@ -0,0 +1,266 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, Deque, Dict, Hashable, List, Optional, Set, Tuple
+from core.config import LOCAL_SCHEDULER_MAX_QUEUE_DEPTH, LOCAL_SCHEDULER_QUEUE_TIMEOUT_S
+
+
+class SchedulerOverloadedError(RuntimeError):
+    """Raised when a local model's queue is full or a request waited too long for a slot."""
+
+
+class _Waiter:
+    def __init__(self, wake: Callable[[int], None]):
+        self.wake = wake
+        self.enqueued_at = time.perf_counter()
+
+
+class _ModelQueue:
+    """FIFO queue of requests for one loaded model and its slots (contexts)."""
+    def __init__(self, slots: int):
+        self.slots = slots
+        self.free: Deque[int] = deque(range(slots))
+        self.in_use: Set[int] = set()
+        self.waiters: Deque[_Waiter] = deque()
+        self.active = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.rejected = 0
+        self.max_queue_depth = 0
+        self.waits = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_wait(self, waited: float) -> None:
+        self.waits += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+
+    def resize(self, slots: int) -> None:
+        """Change the slot count; slots past a smaller count retire once they are released."""
+        if slots > self.slots:
+            self.free.extend(slot for slot in range(self.slots, slots) if slot not in self.in_use)
+        else:
+            self.free = deque(slot for slot in self.free if slot < slots)
+        self.slots = slots
+
+    def take(self) -> int:
+        slot = self.free.popleft()
+        self.in_use.add(slot)
+        self.active += 1
+        return slot
+
+
+class LocalInferenceScheduler:
+    """
+    Queues local inference requests per loaded model.
+
+    Each model gets `slots` parallel contexts; a request holds one slot for the whole
+    completion, so a llama.cpp context is never used by two requests at once. Waiters are
+    served in FIFO order, the queue is bounded, and a waiter that is cancelled (e.g. the SSE
+    client disconnected) leaves the queue without taking a slot; one cancelled right after
+    being picked hands its slot back and counts as cancelled, not completed. The slot count
+    follows the `slots` of the latest request, so a changed `n_parallel` applies without
+    reloading: new slots go to the waiters first, removed ones retire when released.
+
+    Slots can be acquired from the event loop (`slot`) or from worker threads (`slot_sync`).
+
+    Attributes:
+        max_queue_depth (int): Maximum waiting requests per model before new ones are rejected.
+        queue_timeout (float): Maximum seconds a request waits for a slot.
+    """
+    def __init__(
+        self,
+        max_queue_depth: int = LOCAL_SCHEDULER_MAX_QUEUE_DEPTH,
+        queue_timeout: float = LOCAL_SCHEDULER_QUEUE_TIMEOUT_S,
+    ):
+        self.max_queue_depth = max_queue_depth
+        self.queue_timeout = queue_timeout
+        self._queues: Dict[Hashable, _ModelQueue] = {}
+        self._lock = threading.Lock()
+
+
+    def _get_queue(self, key: Hashable, slots: int) -> _ModelQueue:
+        slots = max(1, slots)
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = _ModelQueue(slots)
+        elif queue.slots != slots:
+            queue.resize(slots)
+        return queue
+
+
+    def _dispatch(self, queue: _ModelQueue) -> List[Tuple[_Waiter, int]]:
+        """Hand free slots to the longest waiting requests. Must hold the lock; wake them once it is released."""
+        handoffs = []
+        while queue.free and queue.waiters:
+            waiter = queue.waiters.popleft()
+            queue.record_wait(time.perf_counter() - waiter.enqueued_at)
+            handoffs.append((waiter, queue.take()))
+        return handoffs
+
+
+    def _enter(self, key: Hashable, slots: int, waiter: _Waiter) -> Tuple[_ModelQueue, Optional[int]]:
+        """Take a free slot or enqueue the waiter, after serving the waiters a grown slot count lets in."""
+        with self._lock:
+            queue = self._get_queue(key, slots)
+            handoffs = self._dispatch(queue)
+            slot = self._try_acquire(queue, waiter)
+        for queued, queued_slot in handoffs:
+            queued.wake(queued_slot)
+        return queue, slot
+
+
+    def _try_acquire(self, queue: _ModelQueue, waiter: _Waiter) -> Optional[int]:
+        """Take a free slot or enqueue the waiter. Must hold the lock."""
+        if queue.free and not queue.waiters:
+            queue.record_wait(0.0)
+            return queue.take()
+        if len(queue.waiters) >= self.max_queue_depth:
+            queue.rejected += 1
+            raise SchedulerOverloadedError(
+                f"Local model queue is full ({len(queue.waiters)} requests waiting)"
+            )
+        queue.waiters.append(waiter)
+        queue.max_queue_depth = max(queue.max_queue_depth, len(queue.waiters))
+        return None
+
+
+    def _abandon(self, queue: _ModelQueue, waiter: _Waiter, timed_out: bool) -> bool:
+        """Remove a waiter that gave up. Returns False if a slot was already handed to it."""
+        with self._lock:
+            if waiter not in queue.waiters:
+                return False
+            queue.waiters.remove(waiter)
+            if timed_out:
+                queue.rejected += 1
+            else:
+                queue.cancelled += 1
+            return True
+
+
+    async def acquire(self, key: Hashable, slots: int = 1) -> int:
+        """
+        Wait for a free slot on the model's queue.
+
+        Args:
+            key (Hashable): Model key (path and load parameters).
+            slots (int): Number of parallel slots for the model; a new count resizes its queue.
+
+        Returns:
+            int: The slot index; hand it back with `release`.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def resolve(slot: int) -> None:
+            if future.done():
+                # The waiter gave up after being picked: pass the slot on.
+                self._release(key, slot, completed=False)
+            else:
+                future.set_result(slot)
+
+        waiter = _Waiter(lambda slot: loop.call_soon_threadsafe(resolve, slot))
+        queue, slot = self._enter(key, slots, waiter)
+        if slot is not None:
+            return slot
+
+        try:
+            return await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._abandon(queue, waiter, timed_out=True)
+            raise SchedulerOverloadedError(f"Timed out after {self.queue_timeout}s waiting for a local model slot")
+        except asyncio.CancelledError:
+            self._abandon(queue, waiter, timed_out=False)
+            raise
+
+
+    def acquire_sync(self, key: Hashable, slots: int = 1) -> int:
+        """Blocking variant of `acquire` for worker threads."""
+        event = threading.Event()
+        assigned = []
+
+        def wake(slot: int) -> None:
+            assigned.append(slot)
+            event.set()
+
+        waiter = _Waiter(wake)
+        queue, slot = self._enter(key, slots, waiter)
+        if slot is not None:
+            return slot
+
+        if not event.wait(self.queue_timeout):
+            if self._abandon(queue, waiter, timed_out=True):
+                raise SchedulerOverloadedError(f"Timed out after {self.queue_timeout}s waiting for a local model slot")
+            # The slot was handed over right as the timeout fired.
+            event.wait()
+        return assigned[0]
+
+
+    def release(self, key: Hashable, slot: int) -> None:
+        """Hand a slot back after a completion, passing it straight to the next waiter if there is one."""
+        self._release(key, slot, completed=True)
+
+
+    def _release(self, key: Hashable, slot: int, completed: bool) -> None:
+        with self._lock:
+            queue = self._queues[key]
+            queue.active -= 1
+            queue.in_use.discard(slot)
+            if completed:
+                queue.completed += 1
+            else:
+                queue.cancelled += 1
+            if slot >= queue.slots:
+                return  # retired by a smaller slot count
+            queue.free.append(slot)
+            handoffs = self._dispatch(queue)
+        for waiter, next_slot in handoffs:
+            waiter.wake(next_slot)
+
+
+    @asynccontextmanager
+    async def slot(self, key: Hashable, slots: int = 1):
+        slot = await self.acquire(key, slots)
+        try:
+            yield slot
+        finally:
+            self.release(key, slot)
+
+
+    @contextmanager
+    def slot_sync(self, key: Hashable, slots: int = 1):
+        slot = self.acquire_sync(key, slots)
+        try:
+            yield slot
+        finally:
+            self.release(key, slot)
+
+
+    def stats(self) -> dict:
+        """Return queue depth, active slots and wait-time metrics per model."""
+        with self._lock:
+            models = []
+            for key, queue in self._queues.items():
+                models.append({
+                    "model": str(key[0]) if isinstance(key, tuple) else str(key),
+                    "slots": queue.slots,
+                    "active": queue.active,
+                    "queue_depth": len(queue.waiters),
+                    "max_queue_depth": queue.max_queue_depth,
+                    "completed": queue.completed,
+                    "cancelled": queue.cancelled,
+                    "rejected": queue.rejected,
+                    "avg_wait_s": round(queue.total_wait / queue.waits, 4) if queue.waits else 0.0,
+                    "max_wait_s": round(queue.max_wait, 4),
+                })
+            return {
+                "max_queue_depth": self.max_queue_depth,
+                "queue_timeout_s": self.queue_timeout,
+                "models": models,
+            }
+
+
+local_inference_scheduler = LocalInferenceScheduler()
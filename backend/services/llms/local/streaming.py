@@ -0,0 +1,96 @@
+import asyncio
+import concurrent.futures
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncGenerator, Callable, Iterable, Optional
+from core.config import LOCAL_INFERENCE_MAX_WORKERS, LOCAL_STREAM_BUFFER_SIZE
+
+
+# Bounded pool for blocking local inference, shared by every local provider so a burst
+# of streaming chats can't spawn an unbounded number of threads.
+local_inference_executor = ThreadPoolExecutor(
+    max_workers=LOCAL_INFERENCE_MAX_WORKERS,
+    thread_name_prefix="local-llm",
+)
+
+_DONE = object()
+
+
+class _StreamError:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+async def iterate_in_executor(
+    make_iterator: Callable[[], Iterable],
+    executor: ThreadPoolExecutor = local_inference_executor,
+    max_buffer: int = LOCAL_STREAM_BUFFER_SIZE,
+    stop_event: Optional[threading.Event] = None,
+) -> AsyncGenerator[object, None]:
+    """
+    Run a blocking iterator in a worker thread and yield its items without blocking the event loop.
+
+    Items are handed back over a bounded asyncio.Queue, so a slow consumer applies backpressure
+    to the worker. Closing the generator early (e.g. the SSE client went away) sets the stop
+    event; the worker abandons the iterator at the next item and the generator only finishes
+    closing once the worker has returned, so callers can safely reuse whatever it was using.
+
+    Args:
+        make_iterator (Callable[[], Iterable]): Builds the blocking iterator; called in the worker thread.
+        executor (ThreadPoolExecutor): Executor running the worker.
+        max_buffer (int): Maximum number of items buffered between the worker and the consumer.
+        stop_event (Optional[threading.Event]): Event used to stop the worker, created if not given.
+
+    Yields:
+        object: Items produced by the iterator.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffer)
+    stop = stop_event or threading.Event()
+
+    def put(item) -> None:
+        try:
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        except RuntimeError:  # event loop already closed
+            stop.set()
+            return
+        while True:
+            try:
+                future.result(timeout=0.1)
+                return
+            except concurrent.futures.TimeoutError:
+                if stop.is_set():
+                    future.cancel()
+                    return
+
+    def worker() -> None:
+        iterator = None
+        try:
+            iterator = iter(make_iterator())
+            for item in iterator:
+                if stop.is_set():
+                    break
+                put(item)
+        except BaseException as e:
+            put(_StreamError(e))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+            put(_DONE)
+
+    worker_future = loop.run_in_executor(executor, worker)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _StreamError):
+                raise item.exc
+            yield item
+    finally:
+        stop.set()
+        try:
+            await asyncio.shield(worker_future)
+        except Exception:
+            pass
@@ -1,8 +1,9 @@
-from services.llms.base import BaseAPILLM
+from services.llms.base import BaseAPILLM, ChatMessage
+from services.llms.rate_limit import RateLimitError, parse_retry_after, rate_limited, rate_limited_stream
 from anthropic import AuthenticationError as AnthropicAuthError
-from anthropic import Anthropic, APIError
+from anthropic import Anthropic, AsyncAnthropic, APIError, APIStatusError, NOT_GIVEN
 from anthropic.types import Message
-from typing import Optional, AsyncGenerator
+from typing import Optional, AsyncGenerator, List, Tuple
 
 
 class AnthropicAPILLM(BaseAPILLM):
@@ -11,13 +12,44 @@ class AnthropicAPILLM(BaseAPILLM):
         super().__init__("anthropic", api_key)
         self.template = self.env.get_template("llms/api/anthropic.jinja")
         if api_key is not None:
-            self.client = Anthropic(api_key=self.api_key)
+            # 429/529s are retried by the alias's rate limiter, which also adapts its limits to them.
+            self.client = Anthropic(api_key=self.api_key, max_retries=0)
+            self.async_client = AsyncAnthropic(api_key=self.api_key, max_retries=0)
 
 
-    def get_completion(
+    @staticmethod
+    def _to_anthropic_messages(messages: List[ChatMessage]) -> Tuple[list, list]:
+        """
+        Split chat messages into Anthropic's system blocks and user/assistant turns.
+
+        Consecutive messages with the same role are merged, as the API requires alternating turns.
+        The system prompt and the latest turn are marked with cache_control, so each request
+        caches the conversation so far and the next turn reads the stable prefix from cache.
+        """
+        system = [
+            {"type": "text", "text": m["content"]}
+            for m in messages if m["role"] == "system" and m["content"]
+        ]
+        turns = []
+        for m in messages:
+            if m["role"] == "system":
+                continue
+            if turns and turns[-1]["role"] == m["role"]:
+                turns[-1]["content"][0]["text"] += f"\n\n{m['content']}"
+            else:
+                turns.append({"role": m["role"], "content": [{"type": "text", "text": m["content"]}]})
+
+        if system:
+            system[-1]["cache_control"] = {"type": "ephemeral"}
+        if turns:
+            turns[-1]["content"][-1]["cache_control"] = {"type": "ephemeral"}
+        return system, turns
+
+
+    @rate_limited
+    def get_chat_completion(
         self,
-        system_prompt: str,
-        user_prompt: str,
+        messages: List[ChatMessage],
         model: str = "claude-3-5-sonnet-20240620",
         temperature: float = 0.7,
         max_tokens: int = 8000,
@@ -26,8 +58,7 @@ class AnthropicAPILLM(BaseAPILLM):
         Get a non-streaming completion from the Anthropic model.
 
         Args:
-            system_prompt (str): The system-level prompt (instructions for the model).
-            user_prompt (str): The user message prompt.
+            messages (List[ChatMessage]): The conversation; system messages become the system prompt.
             model (str): The model name.
             temperature (float): Sampling temperature.
             max_tokens (int): Maximum tokens to generate.
@@ -35,23 +66,29 @@ class AnthropicAPILLM(BaseAPILLM):
         Returns:
             str: The generated text from the model.
         """
+        system, turns = self._to_anthropic_messages(messages)
         try:
-            response: Message = self.client.messages.create(
+            raw = self.client.messages.with_raw_response.create(
                 model=model,
-                system=system_prompt,
-                messages=[{"role": "user", "content": user_prompt}],
+                system=system or NOT_GIVEN,
+                messages=turns,
                 max_tokens=max_tokens,
                 temperature=temperature,
             )
+            self.observe_rate_limits(raw.headers)
+            response: Message = raw.parse()
             return response.content[0].text
+        except APIStatusError as e:
+            self._raise_if_rate_limited(e)
+            raise RuntimeError(f"Anthropic API error: {e}")
         except APIError as e:
             raise RuntimeError(f"Anthropic API error: {e}")
 
 
-    async def stream_completion(
+    @rate_limited_stream
+    async def stream_chat_completion(
         self,
-        system_prompt: str,
-        user_prompt: str,
+        messages: List[ChatMessage],
         model: str = "claude-3-5-sonnet-20240620",
         temperature: float = 0.7,
         max_tokens: int = 8000,
@@ -60,8 +97,7 @@ class AnthropicAPILLM(BaseAPILLM):
         Stream completion from the Anthropic model, yielding tokens as they arrive.
 
         Args:
-            system_prompt (str): The system-level prompt.
-            user_prompt (str): The user message prompt.
+            messages (List[ChatMessage]): The conversation; system messages become the system prompt.
             model (str): The model name.
             temperature (float): Sampling temperature.
             max_tokens (int): Maximum tokens to generate.
@@ -69,23 +105,34 @@ class AnthropicAPILLM(BaseAPILLM):
         Yields:
             str: Partial response tokens as they arrive.
         """
+        system, turns = self._to_anthropic_messages(messages)
         try:
-            
-            with self.client.messages.stream(
+            async with self.async_client.messages.stream(
                 model=model,
-                system=system_prompt,
-                messages=[{"role": "user", "content": user_prompt}],
+                system=system or NOT_GIVEN,
+                messages=turns,
                 max_tokens=max_tokens,
                 temperature=temperature,
             ) as stream:
-                for event in stream:
+                self.observe_rate_limits(stream.response.headers)
+                async for event in stream:
                     if event.type == "content_block_delta":
                         yield event.delta.text
 
+        except APIStatusError as e:
+            self._raise_if_rate_limited(e)
+            raise RuntimeError(f"Anthropic streaming API error: {e}")
         except APIError as e:
             raise RuntimeError(f"Anthropic streaming API error: {e}")
 
 
+    @staticmethod
+    def _raise_if_rate_limited(error: APIStatusError) -> None:
+        # 429: rate limited, 529: overloaded
+        if error.status_code in (429, 529):
+            raise RateLimitError(f"Anthropic rate limit: {error}", parse_retry_after(error.response.headers), error.response.headers)
+
+
     @staticmethod
     def validate_key(api_key: str) -> bool:
         """
@@ -1,6 +1,8 @@
-from services.llms.base import BaseAPILLM
-from huggingface_hub import InferenceClient
-from typing import Optional, AsyncGenerator
+from services.llms.base import BaseAPILLM, ChatMessage
+from services.llms.rate_limit import RateLimitError, parse_retry_after, rate_limited, rate_limited_stream
+from huggingface_hub import InferenceClient, AsyncInferenceClient
+from huggingface_hub.errors import HfHubHTTPError
+from typing import Optional, AsyncGenerator, List
 import requests
 
 
@@ -11,12 +13,13 @@ class HuggingFaceAPILLM(BaseAPILLM):
         self.template = self.env.get_template("llms/api/hugging_face.jinja")
         if api_key is not None:
             self.client = InferenceClient(api_key=self.api_key)
+            self.async_client = AsyncInferenceClient(api_key=self.api_key)
 
 
-    def get_completion(
+    @rate_limited
+    def get_chat_completion(
         self,
-        system_prompt: str,
-        user_prompt: str,
+        messages: List[ChatMessage],
         model: str = "mistralai/Mistral-7B-Instruct-v0.3",
         temperature: float = 0.7,
         max_tokens: int = 2048,) -> str:
@@ -24,25 +27,26 @@ class HuggingFaceAPILLM(BaseAPILLM):
         Get a non-streaming completion from Hugging Face Inference API.
         """
 
-        response = self.client.chat_completion(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            model=model,
-            max_tokens=max_tokens,
-            temperature=temperature,
-            top_p=1.0,
-            stream=False,
-        )
+        try:
+            response = self.client.chat_completion(
+                messages=messages,
+                model=model,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                top_p=1.0,
+                stream=False,
+            )
+        except HfHubHTTPError as e:
+            self._raise_if_rate_limited(e)
+            raise
 
         return response.choices[0].message.content
 
 
-    async def stream_completion(
+    @rate_limited_stream
+    async def stream_chat_completion(
         self,
-        system_prompt: str,
-        user_prompt: str,
+        messages: List[ChatMessage],
         model: str = "mistralai/Mistral-7B-Instruct-v0.3",
         temperature: float = 0.7,
         max_tokens: int = 2048,
@@ -50,24 +54,32 @@ class HuggingFaceAPILLM(BaseAPILLM):
         """
         Stream chat completions from Hugging Face API as an async generator.
         """
-        stream = self.client.chat_completion(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            model=model,
-            max_tokens=max_tokens,
-            temperature=temperature,
-            top_p=1.0,
-            stream=True,
-        )
-
-        for chunk in stream:
+        try:
+            stream = await self.async_client.chat_completion(
+                messages=messages,
+                model=model,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                top_p=1.0,
+                stream=True,
+            )
+        except HfHubHTTPError as e:
+            self._raise_if_rate_limited(e)
+            raise
+
+        async for chunk in stream:
             if chunk.choices and chunk.choices[0].delta:
                 delta = chunk.choices[0].delta
                 if delta.content:
                     yield delta.content
     
+    @staticmethod
+    def _raise_if_rate_limited(error: HfHubHTTPError) -> None:
+        response = error.response
+        if response is not None and response.status_code in (429, 503):
+            raise RateLimitError(f"Hugging Face rate limit: {error}", parse_retry_after(response.headers), response.headers)
+
+
     @staticmethod
     def validate_key(api_key: str) -> bool:
         """
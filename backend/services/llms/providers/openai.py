@@ -1,6 +1,8 @@
-from services.llms.base import BaseAPILLM
-from openai import OpenAI, OpenAIError, APIError, ChatCompletion
-from typing import Optional, AsyncGenerator
+from services.llms.base import BaseAPILLM, ChatMessage
+from services.llms.rate_limit import RateLimitError, parse_retry_after, rate_limited, rate_limited_stream
+from openai import OpenAI, AsyncOpenAI, OpenAIError, APIError, ChatCompletion
+from openai import RateLimitError as OpenAIRateLimitError
+from typing import Optional, AsyncGenerator, List
 
 
 class OpenAIAPILLM(BaseAPILLM):
@@ -10,23 +12,25 @@ class OpenAIAPILLM(BaseAPILLM):
         super().__init__(name="openai", api_key=api_key)
         self.template = self.env.get_template("llms/api/openai.jinja")
         if api_key is not None:
-            self.client = OpenAI(api_key=self.api_key)
+            # 429s are retried by the alias's rate limiter, which also adapts its limits to them.
+            self.client = OpenAI(api_key=self.api_key, max_retries=0)
+            self.async_client = AsyncOpenAI(api_key=self.api_key, max_retries=0)
 
 
-    def get_completion(
+    @rate_limited
+    def get_chat_completion(
         self,
-        system_prompt: str,
-        user_prompt: str,
+        messages: List[ChatMessage],
         model: str = "gpt-4o",
         temperature: float = 0.7,
         max_tokens: int = 2048,
     ) -> str:
         """
         Get a non-streaming completion from OpenAI.
+        Messages are sent unchanged, so the stable conversation prefix hits OpenAI's automatic prompt caching.
 
         Args:
-            system_prompt (str): Instructions for the assistant.
-            user_prompt (str): The user message.
+            messages (List[ChatMessage]): The conversation, system message first.
             model (str): OpenAI model name.
             temperature (float): Sampling temperature.
             max_tokens (int): Max tokens to generate.
@@ -35,24 +39,25 @@ class OpenAIAPILLM(BaseAPILLM):
             str: The model-generated response.
         """
         try:
-            response: ChatCompletion = self.client.chat.completions.create(
+            raw = self.client.chat.completions.with_raw_response.create(
                 model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
+                messages=messages,
                 temperature=temperature,
                 max_tokens=max_tokens,
             )
+            self.observe_rate_limits(raw.headers)
+            response: ChatCompletion = raw.parse()
             return response.choices[0].message.content.strip()
+        except OpenAIRateLimitError as e:
+            raise RateLimitError(f"OpenAI rate limit: {e}", parse_retry_after(e.response.headers), e.response.headers)
         except APIError as e:
             raise RuntimeError(f"OpenAI API error: {e}")
 
 
-    async def stream_completion(
+    @rate_limited_stream
+    async def stream_chat_completion(
         self,
-        system_prompt: str,
-        user_prompt: str,
+        messages: List[ChatMessage],
         model: str = "gpt-4o",
         temperature: float = 0.7,
         max_tokens: int = 2048,
@@ -61,8 +66,7 @@ class OpenAIAPILLM(BaseAPILLM):
         Stream a completion from OpenAI, yielding parts of the message as they arrive.
 
         Args:
-            system_prompt (str): Instructions for the assistant.
-            user_prompt (str): The user message.
+            messages (List[ChatMessage]): The conversation, system message first.
             model (str): OpenAI model name.
             temperature (float): Sampling temperature.
             max_tokens (int): Max tokens to generate.
@@ -71,20 +75,21 @@ class OpenAIAPILLM(BaseAPILLM):
             str: Partial responses (tokens or phrases).
         """
         try:
-            stream = self.client.chat.completions.create(
+            raw = await self.async_client.chat.completions.with_raw_response.create(
                 model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
+                messages=messages,
                 temperature=temperature,
                 max_tokens=max_tokens,
                 stream=True,
             )
+            self.observe_rate_limits(raw.headers)
+            stream = raw.parse()
 
             async for chunk in stream:
                 if chunk.choices and chunk.choices[0].delta.content:
                     yield chunk.choices[0].delta.content
+        except OpenAIRateLimitError as e:
+            raise RateLimitError(f"OpenAI rate limit: {e}", parse_retry_after(e.response.headers), e.response.headers)
         except APIError as e:
             raise RuntimeError(f"OpenAI streaming API error: {e}")
 
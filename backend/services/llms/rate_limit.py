@@ -0,0 +1,509 @@
+import asyncio
+import functools
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import aclosing
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Deque, Dict, Mapping, Optional, Tuple
+from core.config import (
+    RATE_LIMIT_DEFAULT_RPM,
+    RATE_LIMIT_DEFAULT_TPM,
+    RATE_LIMIT_INITIAL_CONCURRENCY,
+    RATE_LIMIT_MIN_CONCURRENCY,
+    RATE_LIMIT_MAX_CONCURRENCY,
+    RATE_LIMIT_MAX_RETRIES,
+    RATE_LIMIT_BACKOFF_BASE_S,
+    RATE_LIMIT_BACKOFF_MAX_S,
+)
+
+
+class RateLimitError(RuntimeError):
+    """
+    Raised by providers when the upstream API rejects a call for rate or capacity reasons (429, 529).
+
+    Attributes:
+        retry_after (Optional[float]): Seconds the provider asked to wait, if it said.
+        headers (Mapping[str, str]): Response headers, used to update the limiter.
+    """
+    def __init__(self, message: str, retry_after: Optional[float] = None, headers: Optional[Mapping[str, str]] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.headers = headers or {}
+
+
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Read Retry-After (seconds or HTTP date) or retry-after-ms from response headers."""
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def _parse_reset(value: Optional[str]) -> Optional[float]:
+    """Seconds until a limit resets: OpenAI durations ('6m0s', '20ms') or Anthropic RFC 3339 timestamps."""
+    if not value:
+        return None
+    if "T" in value:
+        try:
+            reset_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            return max((reset_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+        except ValueError:
+            return None
+    parts = _DURATION.findall(value)
+    if parts:
+        return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _int_header(headers: Mapping[str, str], name: str) -> Optional[int]:
+    value = headers.get(name)
+    try:
+        return int(float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+# (limit, remaining, reset) header names per bucket, OpenAI-style then Anthropic-style.
+_HEADER_NAMES = {
+    "requests": [
+        ("x-ratelimit-limit-requests", "x-ratelimit-remaining-requests", "x-ratelimit-reset-requests"),
+        ("anthropic-ratelimit-requests-limit", "anthropic-ratelimit-requests-remaining", "anthropic-ratelimit-requests-reset"),
+    ],
+    "tokens": [
+        ("x-ratelimit-limit-tokens", "x-ratelimit-remaining-tokens", "x-ratelimit-reset-tokens"),
+        ("anthropic-ratelimit-tokens-limit", "anthropic-ratelimit-tokens-remaining", "anthropic-ratelimit-tokens-reset"),
+    ],
+}
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `per_minute / 60` per second.
+
+    Callers reserve what they need up front and wait out any deficit, so concurrent callers
+    queue fairly without polling. A rate of 0 means the limit is unknown: nothing waits.
+    """
+    def __init__(self, per_minute: float = 0):
+        self.per_minute = per_minute
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.per_minute:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.per_minute / 60)
+        self._updated = now
+
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` tokens and return how many seconds the caller must wait before using them."""
+        with self._lock:
+            if not self.per_minute:
+                return 0.0
+            self._refill()
+            amount = min(amount, self.capacity)
+            self.tokens -= amount
+            return max(-self.tokens, 0.0) * 60 / self.per_minute
+
+
+    def update(self, limit: Optional[int], remaining: Optional[int], reset_s: Optional[float]) -> None:
+        """Align the bucket with the limit and remaining budget reported by the provider."""
+        with self._lock:
+            self._refill()
+            if limit:
+                self.per_minute = self.capacity = float(limit)
+            if remaining is None or not self.per_minute:
+                return
+            if remaining <= 0 and reset_s:
+                # Out of budget until the window resets.
+                self.tokens = min(self.tokens, -reset_s * self.per_minute / 60)
+            else:
+                self.tokens = min(self.tokens, float(remaining))
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD cap on in-flight calls.
+
+    Every successful call raises the limit by 1/limit (about +1 per round of calls); a
+    throttled call halves it, once per round: only calls started after the last decrease
+    can trigger another, so a burst of 429s from one overload doesn't collapse the limit.
+    """
+    def __init__(self, initial: int, minimum: int, maximum: int):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._waiters: Deque[Callable[[], None]] = deque()
+        self._lock = threading.Lock()
+
+
+    def _try_acquire(self, wake: Callable[[], None]) -> bool:
+        """Take a permit or enqueue `wake`. Must hold the lock."""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return True
+        self._waiters.append(wake)
+        return False
+
+
+    async def acquire(self) -> float:
+        """Wait for a permit; returns its start time, to pass to `release`."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def resolve() -> None:
+            if future.done():
+                # The waiter was cancelled after being picked: pass the permit on.
+                self._release_permit()
+            else:
+                future.set_result(None)
+
+        wake = lambda: loop.call_soon_threadsafe(resolve)
+        with self._lock:
+            acquired = self._try_acquire(wake)
+        if not acquired:
+            try:
+                await future
+            except asyncio.CancelledError:
+                with self._lock:
+                    if wake in self._waiters:
+                        self._waiters.remove(wake)
+                raise
+        return time.monotonic()
+
+
+    def acquire_sync(self) -> float:
+        """Blocking variant of `acquire` for worker threads."""
+        event = threading.Event()
+        with self._lock:
+            acquired = self._try_acquire(event.set)
+        if not acquired:
+            event.wait()
+        return time.monotonic()
+
+
+    def release(self, started: float, outcome: str) -> None:
+        """
+        Return a permit and adapt the limit.
+
+        Args:
+            started (float): Value returned by `acquire`.
+            outcome (str): 'success', 'throttled', or anything else to leave the limit unchanged.
+        """
+        with self._lock:
+            if outcome == "success":
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            elif outcome == "throttled" and started >= self._last_decrease:
+                self.limit = max(self.minimum, self.limit / 2)
+                self._last_decrease = time.monotonic()
+        self._release_permit()
+
+
+    def _release_permit(self) -> None:
+        to_wake = []
+        with self._lock:
+            self.in_flight -= 1
+            while self._waiters and self.in_flight < int(self.limit):
+                self.in_flight += 1
+                to_wake.append(self._waiters.popleft())
+        for wake in to_wake:
+            wake()
+
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+
+def estimate_tokens(messages: list, max_tokens: Optional[int]) -> int:
+    """Rough token cost of a call for the tokens/min bucket: ~4 characters per prompt token plus the completion budget."""
+    prompt = sum(len(str(m.get("content", ""))) for m in messages) // 4
+    return prompt + (max_tokens or 0)
+
+
+class ProviderRateLimiter:
+    """
+    Client-side rate limiting for one LLM alias.
+
+    Calls first take their share of the requests/min and tokens/min buckets, then a permit
+    from the adaptive concurrency limiter. A RateLimitError from the provider halves the
+    concurrency cap and the call is retried after a jittered exponential backoff, or after
+    the provider's Retry-After when it sent one. Buckets start from the configured limits
+    (0 = unknown) and follow the x-ratelimit-* / anthropic-ratelimit-* headers providers return.
+
+    Attributes:
+        name (str): The alias the limiter belongs to.
+        max_retries (int): Retries after a RateLimitError before giving up.
+    """
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float = RATE_LIMIT_DEFAULT_RPM,
+        tokens_per_minute: float = RATE_LIMIT_DEFAULT_TPM,
+        initial_concurrency: int = RATE_LIMIT_INITIAL_CONCURRENCY,
+        min_concurrency: int = RATE_LIMIT_MIN_CONCURRENCY,
+        max_concurrency: int = RATE_LIMIT_MAX_CONCURRENCY,
+        max_retries: int = RATE_LIMIT_MAX_RETRIES,
+        backoff_base: float = RATE_LIMIT_BACKOFF_BASE_S,
+        backoff_max: float = RATE_LIMIT_BACKOFF_MAX_S,
+    ):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.concurrency = AdaptiveConcurrencyLimiter(initial_concurrency, min_concurrency, max_concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.succeeded = 0
+        self.throttled = 0
+        self.retries = 0
+        self.gave_up = 0
+        self.queue_time = 0.0
+        self.max_queue_time = 0.0
+        self.backoff_time = 0.0
+
+
+    def backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        """Delay before retry `attempt`: Retry-After plus a little jitter, else full-jitter exponential backoff."""
+        if retry_after is not None:
+            return retry_after + random.uniform(0, self.backoff_base)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+
+    def observe_headers(self, headers: Optional[Mapping[str, str]]) -> None:
+        """Update the buckets from provider rate limit headers."""
+        if not headers:
+            return
+        for bucket, names in (("requests", _HEADER_NAMES["requests"]), ("tokens", _HEADER_NAMES["tokens"])):
+            for limit_name, remaining_name, reset_name in names:
+                limit = _int_header(headers, limit_name)
+                remaining = _int_header(headers, remaining_name)
+                if limit is None and remaining is None:
+                    continue
+                getattr(self, bucket).update(limit, remaining, _parse_reset(headers.get(reset_name)))
+                break
+
+
+    def _record_queue(self, waited: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self.queue_time += waited
+            self.max_queue_time = max(self.max_queue_time, waited)
+
+
+    def _record_throttle(self, error: RateLimitError, delay: Optional[float]) -> None:
+        self.observe_headers(error.headers)
+        with self._lock:
+            self.throttled += 1
+            if delay is None:
+                self.gave_up += 1
+            else:
+                self.retries += 1
+                self.backoff_time += delay
+
+
+    def _record_success(self) -> None:
+        with self._lock:
+            self.succeeded += 1
+
+
+    async def _admit(self, tokens: int) -> float:
+        start = time.perf_counter()
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        if wait:
+            await asyncio.sleep(wait)
+        started = await self.concurrency.acquire()
+        self._record_queue(time.perf_counter() - start)
+        return started
+
+
+    def _admit_sync(self, tokens: int) -> float:
+        start = time.perf_counter()
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        if wait:
+            time.sleep(wait)
+        started = self.concurrency.acquire_sync()
+        self._record_queue(time.perf_counter() - start)
+        return started
+
+
+    def call(self, fn: Callable[[], Any], tokens: int = 0) -> Any:
+        """
+        Run a blocking provider call under the limits, retrying it on RateLimitError.
+
+        Args:
+            fn (Callable[[], Any]): The provider call.
+            tokens (int): Estimated tokens the call uses.
+
+        Returns:
+            Any: What `fn` returns.
+        """
+        for attempt in range(self.max_retries + 1):
+            started = self._admit_sync(tokens)
+            outcome = "error"
+            try:
+                result = fn()
+                outcome = "success"
+                self._record_success()
+                return result
+            except RateLimitError as e:
+                outcome = "throttled"
+                delay = self.backoff(attempt, e.retry_after) if attempt < self.max_retries else None
+                self._record_throttle(e, delay)
+                if delay is None:
+                    raise
+            finally:
+                self.concurrency.release(started, outcome)
+            time.sleep(delay)
+
+
+    async def stream(self, make_stream: Callable[[], AsyncIterator[Any]], tokens: int = 0) -> AsyncGenerator[Any, None]:
+        """
+        Run a streaming provider call under the limits.
+
+        A RateLimitError is retried only if it happens before the first chunk; once output
+        has been yielded, retrying would repeat it, so the error is raised instead.
+
+        Args:
+            make_stream (Callable[[], AsyncIterator[Any]]): Starts the provider stream.
+            tokens (int): Estimated tokens the call uses.
+
+        Yields:
+            Any: The provider stream's chunks.
+        """
+        for attempt in range(self.max_retries + 1):
+            started = await self._admit(tokens)
+            outcome = "cancelled"
+            yielded = False
+            try:
+                upstream = make_stream()
+                async with aclosing(upstream):
+                    async for chunk in upstream:
+                        yielded = True
+                        yield chunk
+                outcome = "success"
+                self._record_success()
+                return
+            except RateLimitError as e:
+                outcome = "throttled"
+                retry = attempt < self.max_retries and not yielded
+                delay = self.backoff(attempt, e.retry_after) if retry else None
+                self._record_throttle(e, delay)
+                if delay is None:
+                    raise
+            except Exception:
+                outcome = "error"
+                raise
+            finally:
+                self.concurrency.release(started, outcome)
+            await asyncio.sleep(delay)
+
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "alias": self.name,
+                "calls": self.calls,
+                "succeeded": self.succeeded,
+                "throttled": self.throttled,
+                "retries": self.retries,
+                "gave_up": self.gave_up,
+                "avg_queue_time_s": round(self.queue_time / self.calls, 4) if self.calls else 0.0,
+                "max_queue_time_s": round(self.max_queue_time, 4),
+                "backoff_time_s": round(self.backoff_time, 3),
+                "concurrency_limit": round(self.concurrency.limit, 2),
+                "in_flight": self.concurrency.in_flight,
+                "queued": self.concurrency.queued,
+                "requests_per_minute": self.requests.per_minute,
+                "tokens_per_minute": self.tokens.per_minute,
+            }
+
+
+class RateLimiterRegistry:
+    """One ProviderRateLimiter per alias, shared by every client built for it."""
+    def __init__(self):
+        self._limiters: Dict[Tuple[bool, str], ProviderRateLimiter] = {}
+        self._lock = threading.Lock()
+
+
+    def get(self, alias: str, is_remote: bool) -> ProviderRateLimiter:
+        with self._lock:
+            key = (is_remote, alias)
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = self._limiters[key] = ProviderRateLimiter(alias)
+            return limiter
+
+
+    def invalidate(self, alias: str) -> None:
+        """Drop an alias's limiters (remote and local), e.g. when its key or provider changed and the learned limits no longer apply."""
+        with self._lock:
+            for key in [(True, alias), (False, alias)]:
+                self._limiters.pop(key, None)
+
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"limiters": [limiter.stats() for limiter in self._limiters.values()]}
+
+
+rate_limiter_registry = RateLimiterRegistry()
+
+
+def rate_limited(method: Callable) -> Callable:
+    """Apply the client's rate limiter (if any) to a blocking get_chat_completion."""
+    @functools.wraps(method)
+    def wrapper(self, messages, *args, **kwargs):
+        if self.rate_limiter is None:
+            return method(self, messages, *args, **kwargs)
+        tokens = estimate_tokens(messages, kwargs.get("max_tokens"))
+        return self.rate_limiter.call(lambda: method(self, messages, *args, **kwargs), tokens)
+    return wrapper
+
+
+def rate_limited_stream(method: Callable) -> Callable:
+    """Apply the client's rate limiter (if any) to a streaming stream_chat_completion."""
+    @functools.wraps(method)
+    async def wrapper(self, messages, *args, **kwargs):
+        if self.rate_limiter is None:
+            stream = method(self, messages, *args, **kwargs)
+        else:
+            tokens = estimate_tokens(messages, kwargs.get("max_tokens"))
+            stream = self.rate_limiter.stream(lambda: method(self, messages, *args, **kwargs), tokens)
+        async with aclosing(stream):
+            async for chunk in stream:
+                yield chunk
+    return wrapper
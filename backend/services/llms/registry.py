@@ -0,0 +1,112 @@
+from collections import OrderedDict
+from threading import RLock
+from typing import Callable, Dict, Tuple
+from core.config import LLM_CLIENT_CACHE_SIZE
+
+
+class LLMClientRegistry:
+    """
+    Process-wide registry of warm LLM clients.
+
+    Clients are keyed by (is_remote, alias) and kept in LRU order, so repeated lookups
+    reuse the SDK client (and its HTTP connection pool) instead of re-reading the DB,
+    decrypting the API key and rebuilding the client on every call.
+
+    Attributes:
+        max_size (int): Maximum number of clients kept alive before the least recently used is evicted.
+        hits (int): Lookups served from the registry.
+        misses (int): Lookups that had to build a new client.
+        evictions (int): Clients dropped because the registry was full.
+        invalidations (int): Clients dropped because their alias was updated or deleted.
+    """
+    def __init__(self, max_size: int = LLM_CLIENT_CACHE_SIZE):
+        self.max_size = max_size
+        self._clients: "OrderedDict[Tuple[bool, str], object]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+
+    def get_or_create(self, alias: str, is_remote: bool, factory: Callable[[], object]) -> object:
+        """
+        Return the cached client for an alias, building it with `factory` on a miss.
+
+        Args:
+            alias (str): The LLM alias.
+            is_remote (bool): Whether the alias refers to a remote (API) or local LLM.
+            factory (Callable[[], object]): Builds the client when it is not cached.
+
+        Returns:
+            object: The LLM client.
+        """
+        key = (is_remote, alias)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                self.hits += 1
+                return client
+            self.misses += 1
+            generation = self._generations.get(alias, 0)
+
+        client = factory()
+
+        with self._lock:
+            # The alias was updated or deleted while the client was being built: hand the
+            # client to this caller but don't keep it, it may carry stale credentials.
+            if self._generations.get(alias, 0) != generation:
+                return client
+            existing = self._clients.get(key)
+            if existing is not None:
+                self._clients.move_to_end(key)
+                return existing
+            self._clients[key] = client
+            while len(self._clients) > self.max_size:
+                self._clients.popitem(last=False)
+                self.evictions += 1
+        return client
+
+
+    def invalidate(self, alias: str) -> None:
+        """Drop the cached clients (remote and local) for an alias."""
+        with self._lock:
+            self._generations[alias] = self._generations.get(alias, 0) + 1
+            for key in [(True, alias), (False, alias)]:
+                if self._clients.pop(key, None) is not None:
+                    self.invalidations += 1
+
+
+    def generation(self, alias: str) -> int:
+        """Number of times an alias was invalidated; caches derived from an alias key on it to notice updates."""
+        with self._lock:
+            return self._generations.get(alias, 0)
+
+
+    def clear(self) -> None:
+        """Drop every cached client."""
+        with self._lock:
+            for alias in {alias for _, alias in self._clients}:
+                self._generations[alias] = self._generations.get(alias, 0) + 1
+            self.invalidations += len(self._clients)
+            self._clients.clear()
+
+
+    def stats(self) -> dict:
+        """Return registry size and hit/miss/eviction counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._clients),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+llm_client_registry = LLMClientRegistry()
@@ -2,15 +2,40 @@ from typing import List, Dict, Optional, AsyncGenerator
 import uuid
 import time
 import asyncio
+from contextlib import aclosing
 from schemas.sandbox.chatbot import Message
+from services.llms.base import ChatMessage
 from services.llms.factory import get_llm_client_by_alias
+from services.sandbox.chatbot.response_cache import response_cache, build_cache_key
+from services.sandbox.chatbot.semantic_cache import semantic_cache
+from services.sandbox.chatbot.single_flight import single_flight
+from core.config import SEMANTIC_CACHE_ENABLED, SINGLE_FLIGHT_ENABLED
 from db.session import get_db
 from sqlalchemy.orm import Session
 
+
+DEFAULT_SYSTEM_PROMPT = "You are a helpful assistant."
+
 class LLMService:
     def __init__(self):
         self.llm_factory = get_llm_client_by_alias
         self.db: Session = next(get_db())
+        self.semantic_cache = semantic_cache
+        self.semantic_cache_enabled = SEMANTIC_CACHE_ENABLED
+        self.single_flight = single_flight
+        self.single_flight_enabled = SINGLE_FLIGHT_ENABLED
+
+    @staticmethod
+    def to_chat_messages(messages: List[Message]) -> List[ChatMessage]:
+        """
+        Convert the request history to provider chat messages, keeping each turn separate
+        so providers can reuse the unchanged prefix of the conversation between turns.
+        The default system prompt is only added when the conversation has none.
+        """
+        chat_messages = [{"role": m.role, "content": m.content} for m in messages]
+        if not any(m["role"] == "system" for m in chat_messages):
+            chat_messages.insert(0, {"role": "system", "content": DEFAULT_SYSTEM_PROMPT})
+        return chat_messages
 
     async def generate_chat_completion(
         self,
@@ -24,87 +49,158 @@ class LLMService:
         frequency_penalty: Optional[float] = 0.0,
         presence_penalty: Optional[float] = 0.0,
         stream: Optional[bool] = False,
+        cache: bool = False,
+        semantic_cache: bool = True,
     ) -> AsyncGenerator[Dict, None]:
         """
         Unified chat interface across multiple LLM backends.
+
+        With `cache`, completions are looked up in and stored to the response cache, keyed by
+        alias, model, messages and sampling parameters; a hit never reaches the provider.
+        When the semantic cache is enabled, a question similar enough to one already answered
+        for the same alias, model, system prompt and earlier turns gets that answer; `semantic_cache=False`
+        bypasses it for this request. Identical requests already in flight share one
+        provider call (see SingleFlight).
         """
+        completion_id = f"chatcmpl-{uuid.uuid4()}"
+        created = int(time.time())
+        
+        chat_messages = self.to_chat_messages(messages)
+        prompt_tokens = sum(len(m["content"].split()) for m in chat_messages)
+
+        request_key = build_cache_key(llm_alias, llm_type, model, chat_messages, {
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "top_p": top_p,
+            "frequency_penalty": frequency_penalty,
+            "presence_penalty": presence_penalty,
+        })
+        cache_key, cached = None, None
+        if cache:
+            cache_key = request_key
+            cached = await response_cache.aget(cache_key)
+
+        semantic_scope, question = None, None
+        if self.semantic_cache_enabled and chat_messages[-1]["role"] == "user":
+            if semantic_cache:
+                system_prompt = "\n".join(m["content"] for m in chat_messages if m["role"] == "system")
+                history = [m for m in chat_messages[:-1] if m["role"] != "system"]
+                semantic_scope = self.semantic_cache.make_scope(llm_alias, llm_type, model, system_prompt, history)
+                question = chat_messages[-1]["content"]
+                if cached is None:
+                    hit = await self.semantic_cache.alookup(semantic_scope, question)
+                    cached = hit[0] if hit is not None else None
+            else:
+                self.semantic_cache.record_bypass()
+
+        if cached is not None:
+            if stream:
+                for token in cached:
+                    yield self._chunk(completion_id, created, model, llm_type, {"content": token}, None)
+                yield self._chunk(completion_id, created, model, llm_type, {}, "stop")
+            else:
+                yield self._completion(completion_id, created, model, llm_type, "".join(cached), prompt_tokens, cached=True)
+            return
+
         # Use llm_alias if provided, otherwise fall back to model-based selection
         is_remote = llm_type.lower() == 'remote'
         llm = self.llm_factory(alias=llm_alias, db=self.db, is_remote=is_remote) # if llm_alias else None
         if not llm:
             raise ValueError(f"Could not initialize LLM with alias: {llm_alias}")
-            
-        completion_id = f"chatcmpl-{uuid.uuid4()}"
-        created = int(time.time())
-        
-        system_prompt = "You are a helpful assistant."
-        user_prompt = "\n".join([f"{m.role}: {m.content}" for m in messages])
+
+        async def upstream() -> AsyncGenerator[str, None]:
+            if stream:
+                tokens = llm.stream_chat_completion(
+                    chat_messages,
+                    model=model,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                )
+            else:
+                tokens = self._complete_in_thread(
+                    llm,
+                    chat_messages,
+                    model=model,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                )
+            chunks = []
+            async with aclosing(tokens):
+                async for token in tokens:
+                    chunks.append(token)
+                    yield token
+            # Only complete responses are cached: a cancelled call never gets here.
+            await self._store(cache_key, semantic_scope, question, chunks)
+
+        if self.single_flight_enabled:
+            # Identical requests in flight share this call (and its cache store).
+            tokens = self.single_flight.stream(request_key, upstream)
+        else:
+            tokens = upstream()
 
         if stream:
-            async for token in llm.stream_completion(
-                system_prompt=system_prompt,
-                user_prompt=user_prompt,
-                model=model,
-                temperature=temperature,
-                max_tokens=max_tokens,
-            ):
-                yield {
-                    "id": completion_id,
-                    "object": "chat.completion.chunk",
-                    "created": created,
-                    "model": model,
-                    "llm_type": llm_type,
-                    "choices": [
-                        {
-                            "delta": {"content": token},
-                            "index": 0,
-                            "finish_reason": None,
-                        }
-                    ],
-                }
-            yield {
-                "id": completion_id,
-                "object": "chat.completion.chunk",
-                "created": created,
-                "model": model,
-                "llm_type": llm_type,
-                "choices": [
-                    {
-                        "delta": {},
-                        "index": 0,
-                        "finish_reason": "stop",
-                    }
-                ],
-            }
+            async with aclosing(tokens):
+                async for token in tokens:
+                    yield self._chunk(completion_id, created, model, llm_type, {"content": token}, None)
+            yield self._chunk(completion_id, created, model, llm_type, {}, "stop")
 
         else:
-            text: str = llm.get_completion(
-                system_prompt=system_prompt,
-                user_prompt=user_prompt,
-                model=model,
-                temperature=temperature,
-                max_tokens=max_tokens,
-            )
+            async with aclosing(tokens):
+                text = "".join([token async for token in tokens])
+            yield self._completion(completion_id, created, model, llm_type, text, prompt_tokens)
 
-            yield {
-                "id": completion_id,
-                "object": "chat.completion",
-                "created": created,
-                "model": model,
-                "llm_type": llm_type,
-                "usage": {
-                    "prompt_tokens": len(user_prompt.split()),
-                    "completion_tokens": len(text.split()),
-                    "total_tokens": len(user_prompt.split()) + len(text.split()),
-                },
-                "choices": [
-                    {
-                        "message": {"role": "assistant", "content": text},
-                        "finish_reason": "stop",
-                        "index": 0,
-                    }
-                ],
-            }
+    @staticmethod
+    async def _complete_in_thread(llm, messages: List[ChatMessage], **kwargs) -> AsyncGenerator[str, None]:
+        # Provider SDK calls are blocking: keep them off the event loop.
+        yield await asyncio.to_thread(llm.get_chat_completion, messages, **kwargs)
+
+    async def _store(self, cache_key: Optional[str], semantic_scope: Optional[str], question: Optional[str], chunks: List[str]) -> None:
+        if cache_key is not None:
+            await response_cache.aput(cache_key, chunks)
+        if semantic_scope is not None:
+            await self.semantic_cache.astore(semantic_scope, question, chunks)
+
+    @staticmethod
+    def _chunk(completion_id: str, created: int, model: str, llm_type: str, delta: Dict, finish_reason: Optional[str]) -> Dict:
+        return {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "llm_type": llm_type,
+            "choices": [
+                {
+                    "delta": delta,
+                    "index": 0,
+                    "finish_reason": finish_reason,
+                }
+            ],
+        }
+
+    @staticmethod
+    def _completion(completion_id: str, created: int, model: str, llm_type: str, text: str, prompt_tokens: int, cached: bool = False) -> Dict:
+        response = {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "llm_type": llm_type,
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(text.split()),
+                "total_tokens": prompt_tokens + len(text.split()),
+            },
+            "choices": [
+                {
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop",
+                    "index": 0,
+                }
+            ],
+        }
+        if cached:
+            response["cached"] = True
+        return response
 
 
 
@@ -0,0 +1,301 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from core.config import (
+    root_dir,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_MAX_MEMORY_MB,
+    RESPONSE_CACHE_PATH,
+    RESPONSE_CACHE_TTL_S,
+    RESPONSE_CACHE_MAX_DISK_MB,
+)
+
+
+def _normalize_content(content: str) -> str:
+    return "\n".join(line.rstrip() for line in content.replace("\r\n", "\n").strip().split("\n"))
+
+
+def build_cache_key(
+    llm_alias: Optional[str],
+    llm_type: str,
+    model: str,
+    messages: List[Dict[str, str]],
+    params: Dict[str, Any],
+) -> str:
+    """
+    Hash a completion request into a cache key.
+
+    Message content is normalized (line endings, surrounding and trailing whitespace) so
+    requests that only differ in formatting share an entry; sampling parameters are part of
+    the key, so the same prompt at another temperature is a different entry.
+
+    Args:
+        llm_alias (Optional[str]): The LLM alias.
+        llm_type (str): 'remote' or 'local'.
+        model (str): The model name.
+        messages (List[Dict[str, str]]): Chat messages sent to the provider.
+        params (Dict[str, Any]): Sampling parameters (temperature, max_tokens, ...).
+
+    Returns:
+        str: Hex sha256 of the normalized request.
+    """
+    payload = {
+        "alias": llm_alias,
+        "type": llm_type.lower(),
+        "model": model,
+        "messages": [[m["role"], _normalize_content(m["content"])] for m in messages],
+        "params": {name: value for name, value in sorted(params.items()) if value is not None},
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier cache of chatbot completions: an in-memory LRU in front of a SQLite file.
+
+    Entries hold the streamed chunks of a completion, so a cached response can be replayed
+    as SSE chunks as well as returned whole. Both tiers expire entries after `ttl_s` and drop
+    their least recently used entries when full: the memory tier past `max_entries` or
+    `max_memory_bytes` of chunk text, the disk tier past `max_disk_bytes`. A response larger
+    than the whole memory budget is not kept in memory.
+
+    Attributes:
+        max_entries (int): Maximum entries kept in memory.
+        max_memory_bytes (int): Size cap of the memory tier.
+        db_path (Optional[Path]): SQLite file of the disk tier, None to keep the cache in memory only.
+        ttl_s (float): Seconds an entry stays valid.
+        max_disk_bytes (int): Size cap of the disk tier.
+    """
+    def __init__(
+        self,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        db_path: Optional[str] = RESPONSE_CACHE_PATH,
+        ttl_s: float = RESPONSE_CACHE_TTL_S,
+        max_disk_bytes: int = RESPONSE_CACHE_MAX_DISK_MB * 1024 * 1024,
+        max_memory_bytes: int = RESPONSE_CACHE_MAX_MEMORY_MB * 1024 * 1024,
+    ):
+        self.max_entries = max_entries
+        self.max_memory_bytes = max_memory_bytes
+        self.db_path = (root_dir / db_path).resolve() if db_path else None
+        self.ttl_s = ttl_s
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, Tuple[float, List[str], int]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.expired = 0
+
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the disk tier on first use. Must hold the db lock."""
+        if self._conn is None:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, chunks TEXT NOT NULL, size INTEGER NOT NULL, "
+                "expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+            self._conn = conn
+        return self._conn
+
+
+    def _get_memory(self, key: str) -> Optional[List[str]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            expires_at, chunks, size = entry
+            if expires_at <= time.time():
+                del self._memory[key]
+                self._memory_bytes -= size
+                self.expired += 1
+                return None
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            self.bytes_saved += size
+            return chunks
+
+
+    def _put_memory(self, key: str, chunks: List[str], size: int, expires_at: float) -> None:
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= previous[2]
+            if size > self.max_memory_bytes:
+                return
+            self._memory[key] = (expires_at, chunks, size)
+            self._memory_bytes += size
+            while len(self._memory) > self.max_entries or self._memory_bytes > self.max_memory_bytes:
+                _, (_, _, evicted_size) = self._memory.popitem(last=False)
+                self._memory_bytes -= evicted_size
+
+
+    def _get_disk(self, key: str) -> Optional[Tuple[List[str], int, float]]:
+        now = time.time()
+        with self._db_lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT chunks, size, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[2] <= now:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                conn.commit()
+                with self._lock:
+                    self.expired += 1
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            conn.commit()
+        return json.loads(row[0]), row[1], row[2]
+
+
+    def _put_disk(self, key: str, chunks: List[str], size: int, expires_at: float) -> None:
+        now = time.time()
+        with self._db_lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, chunks, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(chunks, ensure_ascii=False), size, expires_at, now),
+            )
+            conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_disk_bytes:
+                # Drop least recently used entries until the tier is back under its cap.
+                freed = 0
+                for old_key, old_size in conn.execute(
+                    "SELECT key, size FROM responses ORDER BY last_access"
+                ).fetchall():
+                    if total - freed <= self.max_disk_bytes:
+                        break
+                    conn.execute("DELETE FROM responses WHERE key = ?", (old_key,))
+                    freed += old_size
+            conn.commit()
+
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """
+        Look up a cached completion. Blocking on a disk lookup: use `aget` from the event loop.
+
+        Args:
+            key (str): Key from `build_cache_key`.
+
+        Returns:
+            Optional[List[str]]: The completion's chunks, or None on a miss.
+        """
+        chunks = self._get_memory(key)
+        if chunks is not None:
+            return chunks
+        if self.db_path is None:
+            self._record_miss()
+            return None
+        return self._get_after_memory_miss(key)
+
+
+    def put(self, key: str, chunks: List[str]) -> None:
+        """
+        Store a completion in both tiers.
+
+        Args:
+            key (str): Key from `build_cache_key`.
+            chunks (List[str]): The completion's chunks, in order.
+        """
+        size = sum(len(chunk.encode("utf-8")) for chunk in chunks)
+        expires_at = time.time() + self.ttl_s
+        self._put_memory(key, chunks, size, expires_at)
+        if self.db_path is not None:
+            self._put_disk(key, chunks, size, expires_at)
+
+
+    async def aget(self, key: str) -> Optional[List[str]]:
+        """`get` that serves memory hits inline and runs disk lookups in a worker thread."""
+        chunks = self._get_memory(key)
+        if chunks is not None:
+            return chunks
+        if self.db_path is None:
+            self._record_miss()
+            return None
+        return await asyncio.to_thread(self._get_after_memory_miss, key)
+
+
+    async def aput(self, key: str, chunks: List[str]) -> None:
+        """`put` with the disk write run in a worker thread."""
+        await asyncio.to_thread(self.put, key, chunks)
+
+
+    def _get_after_memory_miss(self, key: str) -> Optional[List[str]]:
+        found = self._get_disk(key)
+        if found is None:
+            self._record_miss()
+            return None
+        chunks, size, expires_at = found
+        self._put_memory(key, chunks, size, expires_at)
+        with self._lock:
+            self.disk_hits += 1
+            self.bytes_saved += size
+        return chunks
+
+
+    def _record_miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if self.db_path is not None:
+            with self._db_lock:
+                conn = self._connect()
+                conn.execute("DELETE FROM responses")
+                conn.commit()
+
+
+    def stats(self) -> dict:
+        """Return hit ratio, bytes saved and the size of both tiers."""
+        disk_entries, disk_bytes = 0, 0
+        if self.db_path is not None and self._conn is not None:
+            with self._db_lock:
+                disk_entries, disk_bytes = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+                ).fetchone()
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "bytes_saved": self.bytes_saved,
+                "expired": self.expired,
+                "memory_entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "memory_bytes": self._memory_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                "disk_entries": disk_entries,
+                "disk_bytes": disk_bytes,
+                "max_disk_bytes": self.max_disk_bytes if self.db_path is not None else 0,
+                "ttl_s": self.ttl_s,
+            }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,375 @@
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from core.config import (
+    SEMANTIC_CACHE_EMBEDDER,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_MAX_ENTRIES,
+    SEMANTIC_CACHE_TTL_S,
+    SEMANTIC_CACHE_ANN_THRESHOLD,
+)
+
+try:
+    import hnswlib
+    HNSWLIB_AVAILABLE = True
+except ImportError:
+    HNSWLIB_AVAILABLE = False
+    hnswlib = None
+
+try:
+    from sentence_transformers import SentenceTransformer
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+    SentenceTransformer = None
+
+
+class BaseEmbedder(ABC):
+    """
+    Turns text into unit-length vectors for the semantic cache.
+
+    Attributes:
+        dim (int): Vector dimension.
+    """
+    dim: int
+
+    @abstractmethod
+    def embed(self, text: str) -> np.ndarray:
+        """Embed `text` as a float32 vector of norm 1."""
+        ...
+
+
+class HashingEmbedder(BaseEmbedder):
+    """
+    Deterministic, offline embedder: hashed word and character n-gram counts.
+
+    It only captures lexical similarity, which is what near-identical questions share
+    (casing, punctuation, a word added or swapped), and needs no model download.
+    """
+    def __init__(self, dim: int = 512, ngram: int = 3):
+        self.dim = dim
+        self.ngram = ngram
+
+
+    def _features(self, text: str) -> List[str]:
+        words = re.findall(r"\w+", text.lower())
+        features = [f"w:{word}" for word in words]
+        for word in words:
+            padded = f"<{word}>"
+            features.extend(f"c:{padded[i:i + self.ngram]}" for i in range(max(len(padded) - self.ngram + 1, 1)))
+        return features
+
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(text):
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dim] += 1.0 if value >> 63 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class SentenceTransformerEmbedder(BaseEmbedder):
+    """Embedder backed by a local sentence-transformers model."""
+    def __init__(self, model_name: str):
+        if not SENTENCE_TRANSFORMERS_AVAILABLE:
+            raise ImportError(
+                "sentence-transformers is not installed. "
+                "Install it with: uv pip install sentence-transformers"
+            )
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.model.encode(text, normalize_embeddings=True).astype(np.float32)
+
+
+def create_embedder(spec: str = SEMANTIC_CACHE_EMBEDDER) -> BaseEmbedder:
+    """Build the embedder named by SEMANTIC_CACHE_EMBEDDER: 'hashing' or 'sentence-transformers:<model>'."""
+    if spec.startswith("sentence-transformers:"):
+        return SentenceTransformerEmbedder(spec.split(":", 1)[1])
+    return HashingEmbedder()
+
+
+class SemanticIndex:
+    """
+    Vectors of one cache scope, searched by inner product.
+
+    Small indexes are searched by brute force with NumPy. Once an index reaches
+    `ann_threshold` vectors and hnswlib is installed, an HNSW graph is built and used
+    for searches from then on; rows freed by eviction are reused as HNSW labels.
+    """
+    def __init__(self, dim: int, ann_threshold: int = SEMANTIC_CACHE_ANN_THRESHOLD):
+        self.dim = dim
+        self.ann_threshold = ann_threshold
+        self._vectors = np.zeros((16, dim), dtype=np.float32)
+        self._live = np.zeros(16, dtype=bool)
+        self._free: List[int] = []
+        self._rows = 0
+        self._ann = None
+
+
+    def __len__(self) -> int:
+        return self._rows - len(self._free)
+
+
+    @property
+    def kind(self) -> str:
+        return "hnsw" if self._ann is not None else "brute-force"
+
+
+    def add(self, vector: np.ndarray) -> int:
+        """Add a vector and return its row."""
+        if self._free:
+            row = self._free.pop()
+        else:
+            row = self._rows
+            self._rows += 1
+            if row >= len(self._vectors):
+                self._vectors = np.resize(self._vectors, (len(self._vectors) * 2, self.dim))
+                self._live = np.resize(self._live, len(self._live) * 2)
+                self._live[row:] = False
+        self._vectors[row] = vector
+        self._live[row] = True
+
+        if self._ann is not None:
+            if row >= self._ann.get_max_elements():
+                self._ann.resize_index(len(self._vectors))
+            self._ann.add_items(vector[np.newaxis], np.array([row]))
+        elif HNSWLIB_AVAILABLE and len(self) >= self.ann_threshold:
+            self._build_ann()
+        return row
+
+
+    def _build_ann(self) -> None:
+        rows = np.flatnonzero(self._live[:self._rows])
+        ann = hnswlib.Index(space="ip", dim=self.dim)
+        ann.init_index(max_elements=len(self._vectors), ef_construction=200, M=16)
+        ann.set_ef(64)
+        ann.add_items(self._vectors[rows], rows)
+        self._ann = ann
+
+
+    def remove(self, row: int) -> None:
+        self._live[row] = False
+        self._free.append(row)
+        if self._ann is not None:
+            self._ann.mark_deleted(row)
+
+
+    def search(self, vector: np.ndarray) -> Tuple[Optional[int], float]:
+        """Return the row most similar to `vector` and its cosine similarity."""
+        if not len(self):
+            return None, 0.0
+        if self._ann is not None:
+            labels, distances = self._ann.knn_query(vector[np.newaxis], k=1)
+            return int(labels[0][0]), 1.0 - float(distances[0][0])
+        scores = self._vectors[:self._rows] @ vector
+        scores[~self._live[:self._rows]] = -np.inf
+        row = int(np.argmax(scores))
+        return row, float(scores[row])
+
+
+class _Entry:
+    __slots__ = ("scope", "row", "text", "chunks", "expires_at", "hits")
+
+    def __init__(self, scope: str, row: int, text: str, chunks: List[str], expires_at: float):
+        self.scope = scope
+        self.row = row
+        self.text = text
+        self.chunks = chunks
+        self.expires_at = expires_at
+        self.hits = 0
+
+
+class SemanticCache:
+    """
+    Answers cached by meaning of the final user message rather than exact text.
+
+    Each scope (alias, model and system prompt, see `make_scope`) has its own index, so an
+    answer is only reused for the same model and instructions. A lookup returns the cached
+    answer of the most similar stored question when the similarity reaches `threshold`.
+    Entries expire after their TTL and the least recently used are evicted past `max_entries`.
+
+    Attributes:
+        embedder (BaseEmbedder): Embeds the questions.
+        threshold (float): Minimum cosine similarity for a hit.
+        max_entries (int): Maximum entries across all scopes.
+        ttl_s (float): Default seconds an entry stays valid.
+    """
+    def __init__(
+        self,
+        embedder: Optional[BaseEmbedder] = None,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        ttl_s: float = SEMANTIC_CACHE_TTL_S,
+        ann_threshold: int = SEMANTIC_CACHE_ANN_THRESHOLD,
+    ):
+        self._embedder = embedder
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.ann_threshold = ann_threshold
+        self._indexes: Dict[str, SemanticIndex] = {}
+        self._entries: "OrderedDict[Tuple[str, int], _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+        self.expired = 0
+        self.similarity_total = 0.0
+
+
+    @property
+    def embedder(self) -> BaseEmbedder:
+        # Built on first use: a sentence-transformers model is slow to load.
+        if self._embedder is None:
+            self._embedder = create_embedder()
+        return self._embedder
+
+
+    @staticmethod
+    def make_scope(
+        llm_alias: Optional[str],
+        llm_type: str,
+        model: str,
+        system_prompt: str,
+        history: Sequence[Dict[str, str]] = (),
+    ) -> str:
+        """
+        Scope key: answers are only shared between requests to the same alias, model and system
+        prompt, and with the same conversation before the final user message. Only that message
+        is compared by similarity, so without the history a follow-up like "explain that in more
+        detail" would match another conversation's follow-up.
+        """
+        turns = json.dumps([[m["role"], m["content"]] for m in history], ensure_ascii=False)
+        raw = "\x00".join([llm_type.lower(), llm_alias or "", model or "", system_prompt, turns])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+    def lookup(self, scope: str, text: str) -> Optional[Tuple[List[str], float]]:
+        """
+        Find a cached answer for a question similar to `text`. Blocking: use `alookup` from the event loop.
+
+        Args:
+            scope (str): Key from `make_scope`.
+            text (str): The final user message.
+
+        Returns:
+            Optional[Tuple[List[str], float]]: The cached answer's chunks and the similarity, or None on a miss.
+        """
+        vector = self.embedder.embed(text)
+        with self._lock:
+            index = self._indexes.get(scope)
+            row, score = index.search(vector) if index is not None else (None, 0.0)
+            entry = self._entries.get((scope, row)) if row is not None else None
+            if entry is not None and entry.expires_at <= time.time():
+                self._drop(entry)
+                self.expired += 1
+                entry = None
+            if entry is None or score < self.threshold:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((scope, row))
+            entry.hits += 1
+            self.hits += 1
+            self.similarity_total += score
+            return entry.chunks, score
+
+
+    def store(self, scope: str, text: str, chunks: List[str], ttl_s: Optional[float] = None) -> None:
+        """
+        Cache an answer for the question `text`.
+
+        Args:
+            scope (str): Key from `make_scope`.
+            text (str): The final user message.
+            chunks (List[str]): The answer's chunks, in order.
+            ttl_s (Optional[float]): Seconds the entry stays valid, defaults to `ttl_s`.
+        """
+        vector = self.embedder.embed(text)
+        expires_at = time.time() + (self.ttl_s if ttl_s is None else ttl_s)
+        with self._lock:
+            index = self._indexes.get(scope)
+            if index is None:
+                index = self._indexes[scope] = SemanticIndex(self.embedder.dim, self.ann_threshold)
+            row = index.add(vector)
+            self._entries[(scope, row)] = _Entry(scope, row, text, chunks, expires_at)
+            self._evict()
+
+
+    def _drop(self, entry: _Entry) -> None:
+        """Remove an entry from its index. Must hold the lock."""
+        self._entries.pop((entry.scope, entry.row), None)
+        index = self._indexes[entry.scope]
+        index.remove(entry.row)
+        if not len(index):
+            del self._indexes[entry.scope]
+
+
+    def _evict(self) -> None:
+        """Drop expired entries, then least recently used ones past `max_entries`. Must hold the lock."""
+        now = time.time()
+        for entry in [entry for entry in self._entries.values() if entry.expires_at <= now]:
+            self._drop(entry)
+            self.expired += 1
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries.values())))
+            self.evictions += 1
+
+
+    async def alookup(self, scope: str, text: str) -> Optional[Tuple[List[str], float]]:
+        """`lookup` run in a worker thread: embedding and search can take a while."""
+        return await asyncio.to_thread(self.lookup, scope, text)
+
+
+    async def astore(self, scope: str, text: str, chunks: List[str], ttl_s: Optional[float] = None) -> None:
+        """`store` run in a worker thread."""
+        await asyncio.to_thread(self.store, scope, text, chunks, ttl_s)
+
+
+    def record_bypass(self) -> None:
+        with self._lock:
+            self.bypassed += 1
+
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+            self._entries.clear()
+
+
+    def stats(self) -> dict:
+        """Return hit ratio, average hit similarity and index sizes."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "avg_hit_similarity": self.similarity_total / self.hits if self.hits else 0.0,
+                "threshold": self.threshold,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "evictions": self.evictions,
+                "expired": self.expired,
+                "ttl_s": self.ttl_s,
+                "scopes": [
+                    {"entries": len(index), "index": index.kind}
+                    for index in self._indexes.values()
+                ],
+            }
+
+
+semantic_cache = SemanticCache()
@@ -0,0 +1,125 @@
+import asyncio
+from contextlib import aclosing
+from typing import AsyncGenerator, AsyncIterator, Callable, Dict, List, Optional
+
+
+class _Flight:
+    """One upstream call and the chunks it has produced so far."""
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._updated = asyncio.Event()
+
+    def notify(self) -> None:
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    async def wait(self) -> None:
+        await self._updated.wait()
+
+
+class SingleFlight:
+    """
+    Deduplicates identical in-flight completions.
+
+    The first request for a key starts the upstream stream in a task; identical requests
+    arriving while it runs subscribe to it instead of calling the provider again. A late
+    subscriber first gets a replay of the chunks already produced, then follows live.
+    The upstream call is cancelled once its last subscriber goes away.
+
+    Runs on the event loop: not thread-safe.
+    """
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.started = 0
+        self.coalesced = 0
+        self.replayed_chunks = 0
+        self.cancelled = 0
+        self.failed = 0
+
+
+    async def stream(self, key: str, make_stream: Callable[[], AsyncIterator[str]]) -> AsyncGenerator[str, None]:
+        """
+        Yield the chunks of the upstream call for `key`, starting it if none is in flight.
+
+        Args:
+            key (str): Request key, e.g. from `build_cache_key`.
+            make_stream (Callable[[], AsyncIterator[str]]): Starts the upstream stream; only called by the first request.
+
+        Yields:
+            str: The upstream chunks, from the first one.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight()
+            flight.task = asyncio.create_task(self._run(key, flight, make_stream))
+            self.started += 1
+        else:
+            self.coalesced += 1
+            self.replayed_chunks += len(flight.chunks)
+        flight.subscribers += 1
+
+        sent = 0
+        try:
+            while True:
+                if sent < len(flight.chunks):
+                    sent += 1
+                    yield flight.chunks[sent - 1]
+                elif flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                else:
+                    await flight.wait()
+        finally:
+            flight.subscribers -= 1
+            if not flight.subscribers and not flight.done:
+                # Nobody is listening any more: stop paying for the upstream call.
+                self._forget(key, flight)
+                flight.task.cancel()
+                self.cancelled += 1
+
+
+    async def _run(self, key: str, flight: _Flight, make_stream: Callable[[], AsyncIterator[str]]) -> None:
+        try:
+            upstream = make_stream()
+            async with aclosing(upstream):
+                async for chunk in upstream:
+                    flight.chunks.append(chunk)
+                    flight.notify()
+        except asyncio.CancelledError:
+            flight.error = RuntimeError("The shared upstream completion was cancelled")
+            raise
+        except Exception as e:
+            flight.error = e
+            self.failed += 1
+        finally:
+            flight.done = True
+            flight.notify()
+            self._forget(key, flight)
+
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+
+    def stats(self) -> dict:
+        """Return the number of upstream calls started and requests coalesced onto them."""
+        requests = self.started + self.coalesced
+        return {
+            "in_flight": len(self._flights),
+            "subscribers": sum(flight.subscribers for flight in self._flights.values()),
+            "upstream_calls": self.started,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": self.coalesced / requests if requests else 0.0,
+            "replayed_chunks": self.replayed_chunks,
+            "cancelled": self.cancelled,
+            "failed": self.failed,
+        }
+
+
+single_flight = SingleFlight()
@@ -6,8 +6,8 @@ class APICallTool(BaseAPICallTool):
     def __init__(self, tool: ToolCreate):
         super().__init__(tool)
     
-    def to_code(self) -> str:
-        return self.render_template("tools/api_call/api_call.jinja",
+    def to_code(self, include_runtime: bool = True) -> str:
+        return self.render_tool_code("tools/api_call/api_call.jinja", include_runtime=include_runtime,
             name=self.tool.name.lower().replace(" ", "_"),
             base_url=self.tool.config.get("base_url", ""),
             endpoint=self.tool.config.get("endpoint", ""),
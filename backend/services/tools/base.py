@@ -1,22 +1,36 @@
 from abc import ABC, abstractmethod
 from schemas.tools import ToolCreate
-import os
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from typing import List, Optional
+from core.config import root_dir
+from core.config import HTTP_RUNTIME_POOL_SIZE, HTTP_RUNTIME_TIMEOUT_S, HTTP_RUNTIME_MAX_RETRIES, HTTP_RUNTIME_TOKEN_REFRESH_MARGIN_S
+from core.config import RAG_QUERY_CACHE_SIZE, RAG_QUERY_CACHE_TTL_S, RAG_WARM_UP, INGEST_EMBEDDING_MODEL, INGEST_CHUNK_SIZE, INGEST_CHUNK_OVERLAP
+from core.templates import template_registry
 from utils.naming_utils import sanitize_to_func_name
 
 
+HTTP_RUNTIME = "tools/runtime/http.jinja"
+RAG_RUNTIME = "tools/runtime/rag.jinja"
+
+
+def render_runtime(template_path: str) -> str:
+    """Render a runtime template (templates/tools/runtime/) with the configured defaults."""
+    return template_registry.render(
+        template_path,
+        pool_size=HTTP_RUNTIME_POOL_SIZE,
+        timeout_s=HTTP_RUNTIME_TIMEOUT_S,
+        max_retries=HTTP_RUNTIME_MAX_RETRIES,
+        token_refresh_margin_s=HTTP_RUNTIME_TOKEN_REFRESH_MARGIN_S,
+    )
+
+
 class BaseTool(ABC):
+    # Shared runtime templates the generated code calls into. `to_code()` inlines them so the
+    # tool's code runs on its own; flow codegen emits each runtime once per module instead.
+    runtimes: List[str] = []
+
     def __init__(self, tool: ToolCreate):
         self.tool = tool
-
-        # Setup Jinja2 once for all subclasses
-        templates_path = os.path.abspath(
-            os.path.join(os.path.dirname(__file__), "../../templates")
-        )
-        self.env = Environment(
-            loader=FileSystemLoader(templates_path),
-            autoescape=select_autoescape()
-        )
+        self.env = template_registry.env  # shared, templates are compiled once per process
 
     
     @abstractmethod
@@ -33,8 +47,20 @@ class BaseTool(ABC):
 
     def render_template(self, template_path: str, **kwargs) -> str:
         """Optional Helper Function: Render a template with the given kwargs"""
-        template = self.env.get_template(template_path)
-        return template.render(**kwargs)
+        return template_registry.render(template_path, **kwargs)
+
+
+    def render_tool_code(self, template_path: str, include_runtime: bool = True, **kwargs) -> str:
+        """Render the tool's code, preceded by its runtimes unless `include_runtime` is False."""
+        code = self.render_template(template_path, **kwargs)
+        if include_runtime and self.runtimes:
+            return f"{self.runtime_code()}\n\n{code}"
+        return code
+
+
+    def runtime_code(self) -> str:
+        """The code of the runtimes this tool's generated code depends on."""
+        return "\n\n".join(render_runtime(runtime) for runtime in self.runtimes)
 
 
     @abstractmethod
@@ -44,7 +70,7 @@ class BaseTool(ABC):
 
 
     @abstractmethod
-    def get_agent_fn(self, agent_label: str, agent_description: str, system_prompt: str, user_prompt: str, tool_name: str, agent_input: str, agent_output: str) -> str:
+    def get_agent_fn(self, agent_label: str, agent_description: str, system_prompt: str, user_prompt: str, tool_name: str, agent_input: str, agent_output: str, is_async: bool = False) -> str:
         """Returns the agent function for the tool."""
         ...
 
@@ -56,6 +82,8 @@ class BaseTool(ABC):
 
 
 class BaseRAGTool(BaseTool):
+    runtimes = [RAG_RUNTIME]
+
     def __init__(self, tool: ToolCreate):
         super().__init__(tool)
 
@@ -67,8 +95,40 @@ class BaseRAGTool(BaseTool):
             """, 
             "user_prompt": "{context}\n\nQuestion:\n{query}"}
 
-    def get_agent_fn(self, agent_label: str, agent_description: str, system_prompt: str, user_prompt: str, tool_name: str, agent_input: str, agent_output: str) -> str:
-        return self.render_template("tools/rag/agent_fn.jinja", agent_label=agent_label, agent_description=agent_description, system_prompt=system_prompt, user_prompt=user_prompt, tool_name=tool_name, agent_input=agent_input, agent_output=agent_output)
+    def search_config(self) -> dict:
+        """Search and client settings shared by the vector store templates."""
+        return {
+            "top_k": self.tool.config.get("retriever_top_k", 3),
+            "similarity_threshold": self.tool.config.get("similarity_threshold"),
+            "hnsw_ef": self.tool.config.get("hnsw_ef"),
+            "query_cache_size": self.tool.config.get("query_cache_size", RAG_QUERY_CACHE_SIZE),
+            "query_cache_ttl_s": self.tool.config.get("query_cache_ttl_s", RAG_QUERY_CACHE_TTL_S),
+            "warm_up": self.tool.config.get("warm_up", RAG_WARM_UP),
+            "embedding_model": self.embedding_model(),
+        }
+
+    def embedding_model(self) -> str:
+        """Local embedding model used both to ingest documents and to embed queries in the generated code."""
+        return self.tool.config.get("embedding_model", INGEST_EMBEDDING_MODEL)
+
+    def vector_store_path(self) -> Optional[str]:
+        """Absolute local store path, resolved against the project root like ingestion does, so generated code finds it from any cwd."""
+        path = self.tool.config.get("vector_store_path")
+        return str(root_dir / path) if path else None
+
+    def chunking_config(self) -> dict:
+        return {
+            "chunk_size": self.tool.config.get("chunk_size", INGEST_CHUNK_SIZE),
+            "chunk_overlap": self.tool.config.get("chunk_overlap", INGEST_CHUNK_OVERLAP),
+        }
+
+    @abstractmethod
+    def vector_writer(self):
+        """Client that upserts and deletes chunks in the tool's collection, used by document ingestion."""
+        ...
+
+    def get_agent_fn(self, agent_label: str, agent_description: str, system_prompt: str, user_prompt: str, tool_name: str, agent_input: str, agent_output: str, is_async: bool = False) -> str:
+        return self.render_template("tools/rag/agent_fn.jinja", agent_label=agent_label, agent_description=agent_description, system_prompt=system_prompt, user_prompt=user_prompt, tool_name=tool_name, agent_input=agent_input, agent_output=agent_output, is_async=is_async)
 
 
 class BaseWebSearchTool(BaseTool):
@@ -79,10 +139,10 @@ class BaseWebSearchTool(BaseTool):
         return {"system_prompt": """You are an assistant that summarizes and explains search results from the web. Only use the information below to answer the user. Be helpful, clear, and avoid guessing. Search Results:""",
             "user_prompt": "{context}\n\nUser's question:\n{query}"}
 
-    def get_agent_fn(self, agent_label: str, agent_description: str, system_prompt: str, user_prompt: str, tool_name: str, agent_input: str, agent_output: str) -> str:
+    def get_agent_fn(self, agent_label: str, agent_description: str, system_prompt: str, user_prompt: str, tool_name: str, agent_input: str, agent_output: str, is_async: bool = False) -> str:
         print(f"DEBUG: Rendering template for {tool_name} with user_prompt={user_prompt}")
         try:
-            result = self.render_template("tools/web_search/agent_fn.jinja", agent_label=self.sanitize_to_func_name(agent_label), agent_description=agent_description, system_prompt=system_prompt, user_prompt=user_prompt, tool_name=self.sanitize_to_func_name(tool_name), agent_input=agent_input, agent_output=agent_output)
+            result = self.render_template("tools/web_search/agent_fn.jinja", agent_label=self.sanitize_to_func_name(agent_label), agent_description=agent_description, system_prompt=system_prompt, user_prompt=user_prompt, tool_name=self.sanitize_to_func_name(tool_name), agent_input=agent_input, agent_output=agent_output, is_async=is_async)
             print(f"DEBUG: Template render successful")
             return result
         except Exception as e:
@@ -91,6 +151,8 @@ class BaseWebSearchTool(BaseTool):
 
 
 class BaseAPICallTool(BaseTool):
+    runtimes = [HTTP_RUNTIME]
+
     def __init__(self, tool: ToolCreate):
         super().__init__(tool)
     
@@ -101,12 +163,14 @@ class BaseAPICallTool(BaseTool):
             """,
             "user_prompt": "{context}\n\nUser's question:\n{query}"}
 
-    def get_agent_fn(self, agent_label: str, agent_description: str, system_prompt: str, user_prompt: str, tool_name: str, agent_input: str, agent_output: str) -> str:
-        return self.render_template("tools/api_call/agent_fn.jinja", agent_label=self.sanitize_to_func_name(agent_label), agent_description=agent_description, system_prompt=system_prompt, user_prompt=user_prompt, tool_name=self.sanitize_to_func_name(tool_name), agent_input=agent_input, agent_output=agent_output)
+    def get_agent_fn(self, agent_label: str, agent_description: str, system_prompt: str, user_prompt: str, tool_name: str, agent_input: str, agent_output: str, is_async: bool = False) -> str:
+        return self.render_template("tools/api_call/agent_fn.jinja", agent_label=self.sanitize_to_func_name(agent_label), agent_description=agent_description, system_prompt=system_prompt, user_prompt=user_prompt, tool_name=self.sanitize_to_func_name(tool_name), agent_input=agent_input, agent_output=agent_output, is_async=is_async)
 
 
 class BaseEnterpriseTool(BaseTool):
     """Base class for enterprise integration tools (SAP, Databricks, Workday, Salesforce)."""
+    runtimes = [HTTP_RUNTIME]
+
     def __init__(self, tool: ToolCreate):
         super().__init__(tool)
     
@@ -117,6 +181,6 @@ class BaseEnterpriseTool(BaseTool):
             """,
             "user_prompt": "{context}\n\nUser's question:\n{query}"}
 
-    def get_agent_fn(self, agent_label: str, agent_description: str, system_prompt: str, user_prompt: str, tool_name: str, agent_input: str, agent_output: str) -> str:
+    def get_agent_fn(self, agent_label: str, agent_description: str, system_prompt: str, user_prompt: str, tool_name: str, agent_input: str, agent_output: str, is_async: bool = False) -> str:
         # Default implementation - subclasses can override with tool-specific templates
-        return self.render_template("tools/api_call/agent_fn.jinja", agent_label=self.sanitize_to_func_name(agent_label), agent_description=agent_description, system_prompt=system_prompt, user_prompt=user_prompt, tool_name=self.sanitize_to_func_name(tool_name), agent_input=agent_input, agent_output=agent_output)
\ No newline at end of file
+        return self.render_template("tools/api_call/agent_fn.jinja", agent_label=self.sanitize_to_func_name(agent_label), agent_description=agent_description, system_prompt=system_prompt, user_prompt=user_prompt, tool_name=self.sanitize_to_func_name(tool_name), agent_input=agent_input, agent_output=agent_output, is_async=is_async)
\ No newline at end of file
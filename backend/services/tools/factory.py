@@ -9,8 +9,9 @@ from services.tools.workday.workday import WorkdayTool
 from services.tools.salesforce.salesforce import SalesforceTool
 from schemas.tools import ToolCreate
 from models.tools import ToolType
-from crud.tools import get_tool_by_name as get_tool_by_name_db
+from crud.tools import get_tool_by_name as get_tool_by_name_db, get_tools_by_names as get_tools_by_names_db
 from sqlalchemy.orm import Session
+from typing import Dict, Iterable
 
 
 def get_tool(tool: ToolCreate) -> BaseTool:
@@ -20,7 +21,7 @@ def get_tool(tool: ToolCreate) -> BaseTool:
         elif tool.config.get("library", "").lower() == "qdrant":
             return QdrantRAGTool(tool)
         else:
-            raise ValueError(f"Unsupported RAG library: {tool.library}")
+            raise ValueError(f"Unsupported RAG library: {tool.config.get('library')}")
     elif tool.type == ToolType.WEB_SEARCH:
         if tool.config.get("library", "").lower() == "duckduckgo":
             return DuckDuckGoWebSearchTool(tool)
@@ -45,4 +46,7 @@ def get_tool_by_name(db: Session, name: str) -> BaseTool:
         return None
     return get_tool(tool)
 
-    
\ No newline at end of file
+
+def get_tools_by_names(db: Session, names: Iterable[str]) -> Dict[str, BaseTool]:
+    """Tool objects for several names from a single query; unknown names are left out."""
+    return {tool.name: get_tool(tool) for tool in get_tools_by_names_db(db, names)}
@@ -1,6 +1,45 @@
+from typing import List
 from services.tools.base import BaseRAGTool
 from schemas.tools import ToolCreate
 
+try:
+    import chromadb
+    CHROMADB_AVAILABLE = True
+except ImportError:
+    CHROMADB_AVAILABLE = False
+    chromadb = None
+
+
+class ChromaWriter:
+    """Writes embedded chunks to a Chroma collection, in the layout `langchain_chroma.Chroma` reads."""
+    def __init__(self, collection_name: str, vector_store_url: str = None, vector_store_path: str = None):
+        if not CHROMADB_AVAILABLE:
+            raise ImportError(
+                "chromadb is not installed. "
+                "Install it with: uv pip install chromadb"
+            )
+        if vector_store_url:
+            client = chromadb.HttpClient(host=vector_store_url)
+        else:
+            client = chromadb.PersistentClient(path=vector_store_path)
+        self.client = client
+        self.collection_name = collection_name
+        self.collection = client.get_or_create_collection(collection_name)
+
+
+    def upsert(self, ids: List[str], texts: List[str], embeddings: List[List[float]], metadatas: List[dict]) -> None:
+        self.collection.upsert(ids=ids, documents=texts, embeddings=embeddings, metadatas=metadatas)
+
+
+    def delete(self, ids: List[str]) -> None:
+        self.collection.delete(ids=ids)
+
+
+    def reset(self) -> None:
+        """Drop every chunk in the collection, e.g. before re-embedding it with a different model."""
+        self.client.delete_collection(self.collection_name)
+        self.collection = self.client.get_or_create_collection(self.collection_name)
+
 
 class ChromaRAGTool(BaseRAGTool):
 
@@ -8,18 +47,25 @@ class ChromaRAGTool(BaseRAGTool):
         super().__init__(tool)
 
 
-    def to_code(self) -> str:
-        return self.render_template("tools/rag/chroma.jinja",
+    def to_code(self, include_runtime: bool = True) -> str:
+        return self.render_tool_code("tools/rag/chroma.jinja", include_runtime=include_runtime,
             name=self.tool.name.lower().replace(" ", "_"),
-            vector_store_path=self.tool.config.get("vector_store_path"),
+            vector_store_path=self.vector_store_path(),
             vector_store_url=self.tool.config.get("vector_store_url"),
             index_name=self.tool.config.get("index_name", "default"),
-            top_k=self.tool.config.get("retriever_top_k", 3),
-            similarity_threshold=self.tool.config.get("similarity_threshold"),
             llm_followup_prompt=self.tool.config.get(
                 "llm_followup_prompt",
                 "Answer the following question using the context: {context}\nQuestion: {question}"
-            )
+            ),
+            **self.search_config(),
+        )
+
+
+    def vector_writer(self) -> ChromaWriter:
+        return ChromaWriter(
+            self.tool.config.get("index_name", "default"),
+            vector_store_url=self.tool.config.get("vector_store_url"),
+            vector_store_path=self.vector_store_path(),
         )
 
 
@@ -0,0 +1,673 @@
+import asyncio
+import hashlib
+import io
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from sqlalchemy.orm import Session
+from core.config import root_dir, INGEST_EMBEDDING_MODEL, INGEST_EMBED_BATCH_SIZE, INGEST_QUEUE_SIZE, INGEST_PROGRESS_INTERVAL_S
+from crud.ingestion import (
+    delete_ingested_documents,
+    get_ingested_documents,
+    get_ingestion_job_by_id,
+    get_ingestion_jobs,
+    record_ingested_documents,
+    update_ingestion_job,
+)
+from crud.tools import get_tool_by_id
+from db.session import SessionLocal
+from models.ingestion import IngestionMode, IngestionStatus
+from services.tools.base import BaseRAGTool
+from services.tools.factory import get_tool
+
+try:
+    from langchain_huggingface import HuggingFaceEmbeddings
+    HUGGINGFACE_EMBEDDINGS_AVAILABLE = True
+except ImportError:
+    HUGGINGFACE_EMBEDDINGS_AVAILABLE = False
+    HuggingFaceEmbeddings = None
+
+try:
+    from pypdf import PdfReader
+    PYPDF_AVAILABLE = True
+except ImportError:
+    PYPDF_AVAILABLE = False
+    PdfReader = None
+
+
+TEXT_EXTENSIONS = {".txt", ".md", ".markdown", ".rst", ".csv", ".tsv", ".json", ".jsonl", ".yaml", ".yml", ".xml", ".log", ".py"}
+HTML_EXTENSIONS = {".html", ".htm"}
+PDF_EXTENSIONS = {".pdf"}
+CHUNK_ID_NAMESPACE = uuid.UUID("3f1c8a52-6f0e-4c89-9a53-2a4be2a1d7c0")
+MAX_REPORTED_ERRORS = 20
+
+_DONE = object()  # end of a stage's input
+
+
+class _HTMLText(HTMLParser):
+    """Collects the visible text of an HTML document."""
+    def __init__(self):
+        super().__init__()
+        self.parts: List[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self._skip += 1
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style") and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data):
+        if not self._skip and data.strip():
+            self.parts.append(data.strip())
+
+
+def is_supported(path: Path) -> bool:
+    suffix = path.suffix.lower()
+    return suffix in TEXT_EXTENSIONS or suffix in HTML_EXTENSIONS or (suffix in PDF_EXTENSIONS and PYPDF_AVAILABLE)
+
+
+def list_input_files(path: Path) -> List[Path]:
+    """The supported files under `path` (or `path` itself), in a stable order."""
+    if path.is_file():
+        return [path]
+    return sorted(file for file in path.rglob("*") if file.is_file() and is_supported(file))
+
+
+def parse_document(path: Path, data: bytes) -> str:
+    """Extract the text of a file from its bytes."""
+    suffix = path.suffix.lower()
+    if suffix in PDF_EXTENSIONS:
+        if not PYPDF_AVAILABLE:
+            raise ImportError(
+                "pypdf is not installed. "
+                "Install it with: uv pip install pypdf"
+            )
+        return "\n\n".join(page.extract_text() or "" for page in PdfReader(io.BytesIO(data)).pages)
+    text = data.decode("utf-8", errors="replace")
+    if suffix in HTML_EXTENSIONS:
+        parser = _HTMLText()
+        parser.feed(text)
+        return "\n".join(parser.parts)
+    return text
+
+
+def manifest_path(path: Path) -> str:
+    """How a file is recorded in the manifest: relative to the project root when inside it."""
+    resolved = path.resolve()
+    return str(resolved.relative_to(root_dir)) if resolved.is_relative_to(root_dir) else str(resolved)
+
+
+def content_key(content_hash: str, chunk_size: Optional[int], chunk_overlap: Optional[int]) -> str:
+    """Identifies a file's chunks: the same content chunked differently gets different chunks."""
+    return f"{chunk_size}/{chunk_overlap}:{content_hash}"
+
+
+def chunk_id(key: str, index: int) -> str:
+    """Chunk ids are derived from the content key, so re-writing a document after a crash overwrites rather than duplicates."""
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{key}:{index}"))
+
+
+_embedders: Dict[str, object] = {}
+_embedders_lock = threading.Lock()
+
+
+def get_embedder(model_name: str):
+    """
+    Load a local sentence-transformers model once per process.
+
+    Args:
+        model_name (str): Hugging Face model name (downloaded once, then read from the local cache;
+            set HF_HUB_OFFLINE=1 to never go online) or a path to a model directory.
+    """
+    if not HUGGINGFACE_EMBEDDINGS_AVAILABLE:
+        raise ImportError(
+            "langchain-huggingface is not installed. "
+            "Install it with: uv pip install langchain-huggingface sentence-transformers"
+        )
+    with _embedders_lock:
+        if model_name not in _embedders:
+            _embedders[model_name] = HuggingFaceEmbeddings(model_name=model_name, encode_kwargs={"normalize_embeddings": True})
+        return _embedders[model_name]
+
+
+class IngestionPipeline:
+    """
+    Ingests files into one RAG collection through four stages, each in its own thread:
+    parse → chunk → embed → write.
+
+    Stages are connected by bounded queues, so a slow stage (usually embedding) holds the
+    others back instead of letting parsed documents pile up in memory. Chunks of consecutive
+    documents are embedded and written in batches of `embed_batch_size`.
+
+    A file is recorded in the manifest (`ingested_documents`) once all its chunks are written.
+    Files whose size and mtime, or content hash, match their manifest entry are skipped, which is
+    also how an interrupted job resumes; files whose content is already in the collection under
+    another path are recorded against the existing chunks without being embedded again. When a
+    changed file's new chunks are written, its old chunks are deleted unless another file still
+    has that content, and with `prune_root` the files gone from under it are dropped the same way.
+
+    Manifest entries also record the embedding model and chunking they were built with. Files
+    chunked differently count as changed. Vectors from another embedding model can't share
+    the collection (the dimensions may differ, and queries are embedded with the tool's current
+    model), so a model change rebuilds it: the collection is reset and every file of the
+    manifest still on disk is ingested again along with `paths`.
+
+    Attributes:
+        counters (dict): Live progress: processed, skipped and failed files, and written chunks.
+    """
+    def __init__(
+        self,
+        tool_id: int,
+        collection: str,
+        embedder,
+        writer,
+        chunk_size: int,
+        chunk_overlap: int,
+        embedding_model: str = INGEST_EMBEDDING_MODEL,
+        job_id: Optional[int] = None,
+        embed_batch_size: int = INGEST_EMBED_BATCH_SIZE,
+        queue_size: int = INGEST_QUEUE_SIZE,
+        resumed_counters: Optional[dict] = None,
+    ):
+        self.tool_id = tool_id
+        self.collection = collection
+        self.embedder = embedder
+        self.writer = writer
+        self.splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        self.settings = {"embedding_model": embedding_model, "chunk_size": chunk_size, "chunk_overlap": chunk_overlap}
+        self.rebuilt = False
+        self.job_id = job_id
+        self.embed_batch_size = embed_batch_size
+        self.queue_size = queue_size
+        self.counters = {"processed_files": 0, "skipped_files": 0, "failed_files": 0, "removed_files": 0, "total_chunks": 0}
+        if resumed_counters:  # failed files are retried, so only the others carry over
+            self.counters.update({key: resumed_counters[key] for key in ("processed_files", "skipped_files", "removed_files", "total_chunks")})
+        self._resumed = dict(self.counters)
+        self.errors: List[dict] = []
+        self.busy_seconds = {"parse": 0.0, "chunk": 0.0, "embed": 0.0, "write": 0.0}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._failure: Optional[BaseException] = None
+        self._known: Dict[str, dict] = {}  # path -> manifest entry
+        self._paths: Dict[str, Set[str]] = {}  # content key -> paths with (or about to get) that content
+        self._completed: Dict[str, List[str]] = {}  # content key -> chunk ids, for content already written
+        self._in_flight: Dict[str, List[dict]] = {}  # content key -> duplicates waiting for its chunk ids
+        self._seen: Set[str] = set()  # paths listed in this run
+
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+
+    def stop(self) -> None:
+        """Ask every stage to stop; documents not fully written are picked up by the next run."""
+        self._stop.set()
+
+
+    def run(self, paths: List[Path], session_factory: Callable[[], Session] = SessionLocal, prune_root: Optional[Path] = None) -> dict:
+        """
+        Ingest `paths` and return the run's stats. Raises the first error of a stage, other than per-file parse errors.
+
+        Args:
+            paths (List[Path]): Files to ingest.
+            session_factory (Callable[[], Session]): Opens the session used for the manifest.
+            prune_root (Optional[Path]): Directory `paths` were listed from; manifest entries under it
+                that are not in `paths` are deleted with their chunks once every file is written.
+        """
+        started = time.perf_counter()
+        db = session_factory()
+        try:
+            for document in get_ingested_documents(db, self.tool_id, self.collection):
+                # plain dicts: the stages must not touch ORM rows, which expire on every commit of the write stage
+                self._known[document.path] = {
+                    "path": document.path,
+                    "size": document.size,
+                    "mtime": document.mtime,
+                    "content_hash": document.content_hash,
+                    "chunk_ids": document.chunk_ids,
+                    "job_id": document.job_id,
+                    "embedding_model": document.embedding_model,
+                    "chunk_size": document.chunk_size,
+                    "chunk_overlap": document.chunk_overlap,
+                }
+            if any(entry["embedding_model"] != self.settings["embedding_model"] for entry in self._known.values()):
+                paths = self._rebuild(paths, db)
+            for entry in self._known.values():
+                key = self._content_key(entry)
+                self._paths.setdefault(key, set()).add(entry["path"])
+                self._completed[key] = entry["chunk_ids"]
+
+            parsed, chunked, embedded = (queue.Queue(maxsize=self.queue_size) for _ in range(3))
+            stages = [
+                # the parse stage also sends duplicates straight to the write stage, so it ends both queues
+                threading.Thread(target=self._stage, args=("parse", lambda: self._parse(paths, parsed, embedded), [parsed, embedded]), daemon=True),
+                threading.Thread(target=self._stage, args=("chunk", lambda: self._chunk(parsed, chunked), [chunked]), daemon=True),
+                threading.Thread(target=self._stage, args=("embed", lambda: self._embed(chunked, embedded), [embedded]), daemon=True),
+            ]
+            for stage in stages:
+                stage.start()
+            self._stage("write", lambda: self._write(embedded, db, producers=2), [])
+            for stage in stages:
+                stage.join()
+            if prune_root is not None and self._failure is None and not self._stop.is_set():
+                self._prune(manifest_path(prune_root), db)
+        finally:
+            db.close()
+        if self._failure is not None:
+            raise self._failure
+        return self.stats(time.perf_counter() - started)
+
+
+    def stats(self, seconds: float) -> dict:
+        """Counters, plus throughput over this run (`seconds`) excluding what previous runs of the job did."""
+        with self._lock:
+            processed = self.counters["processed_files"] - self._resumed["processed_files"]
+            chunks = self.counters["total_chunks"] - self._resumed["total_chunks"]
+            return {
+                **self.counters,
+                "seconds": seconds,
+                "docs_per_s": processed / seconds if seconds else 0.0,
+                "chunks_per_s": chunks / seconds if seconds else 0.0,
+                "busy_seconds": dict(self.busy_seconds),
+                "rebuilt": self.rebuilt,
+                "errors": list(self.errors),
+            }
+
+
+    def _stage(self, name: str, work: Callable[[], None], outboxes: List[queue.Queue]) -> None:
+        try:
+            work()
+        except BaseException as e:
+            print(f"Ingestion stage '{name}' failed: {e}")
+            if self._failure is None:
+                self._failure = e
+            self._stop.set()
+        finally:
+            for outbox in outboxes:
+                self._put(outbox, _DONE, always=True)
+
+
+    def _put(self, outbox: queue.Queue, item, always: bool = False) -> None:
+        """Blocking put that gives up once the pipeline is stopping, so no stage waits on a dead consumer."""
+        while always or not self._stop.is_set():
+            try:
+                outbox.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if always and self._stop.is_set():
+                    return
+
+
+    def _get(self, inbox: queue.Queue):
+        while not self._stop.is_set():
+            try:
+                return inbox.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+
+    def _timed(self, name: str, started: float) -> None:
+        with self._lock:
+            self.busy_seconds[name] += time.perf_counter() - started
+
+
+    def _count(self, **increments) -> None:
+        with self._lock:
+            for key, value in increments.items():
+                self.counters[key] += value
+
+
+    def _content_key(self, entry: dict) -> str:
+        return content_key(entry["content_hash"], entry["chunk_size"], entry["chunk_overlap"])
+
+
+    def _is_current(self, entry: dict) -> bool:
+        """Whether a manifest entry's chunks were built with this pipeline's embedding model and chunking."""
+        return all(entry[key] == value for key, value in self.settings.items())
+
+
+    def _rebuild(self, paths: List[Path], db: Session) -> List[Path]:
+        """Reset the collection for a new embedding model; returns `paths` plus the manifest's files still on disk."""
+        print(f"Embedding model of '{self.collection}' changed to {self.settings['embedding_model']}: rebuilding the collection")
+        listed = {manifest_path(path) for path in paths}
+        previous = [root_dir / path for path in self._known if path not in listed]
+        self.writer.reset()
+        delete_ingested_documents(db, self.tool_id, self.collection, list(self._known))
+        self._known.clear()
+        self.rebuilt = True
+        return list(paths) + [path for path in previous if path.is_file()]
+
+
+    def _skip(self, previous: dict) -> None:
+        if self.job_id is None or previous["job_id"] != self.job_id:  # not already counted by this job before it was interrupted
+            self._count(skipped_files=1)
+
+
+    def _parse(self, paths: List[Path], outbox: queue.Queue, write_queue: queue.Queue) -> None:
+        for path in paths:
+            if self._stop.is_set():
+                return
+            started = time.perf_counter()
+            try:
+                stat = path.stat()
+                relative = manifest_path(path)
+                self._seen.add(relative)
+                with self._lock:
+                    previous = self._known.get(relative)
+                if previous is not None and not self._is_current(previous):
+                    previous = None  # chunked differently: re-chunk it like a changed file
+                if previous is not None and previous["size"] == stat.st_size and previous["mtime"] == stat.st_mtime:
+                    self._skip(previous)  # unchanged, without reading it
+                    continue
+                data = path.read_bytes()
+                document = {
+                    "path": relative,
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime,
+                    "content_hash": hashlib.sha256(data).hexdigest(),
+                    "chunk_size": self.settings["chunk_size"],
+                    "chunk_overlap": self.settings["chunk_overlap"],
+                }
+                if previous is not None and previous["content_hash"] == document["content_hash"]:
+                    self._skip(previous)  # touched but not changed: only its mtime is updated
+                    self._put(write_queue, ("record", {**document, "chunk_ids": previous["chunk_ids"]}))
+                    continue
+                text = parse_document(path, data)
+            except Exception as e:
+                self._fail_file(path, e)
+                continue
+            finally:
+                self._timed("parse", started)
+
+            with self._lock:
+                key = self._content_key(document)
+                self._paths.setdefault(key, set()).add(document["path"])  # keeps the content's chunks from being deleted
+                if key in self._completed:
+                    duplicate = {**document, "chunk_ids": self._completed[key]}
+                elif key in self._in_flight:
+                    self._in_flight[key].append(document)
+                    continue
+                else:
+                    self._in_flight[key] = []
+                    duplicate = None
+            if duplicate is not None:
+                self._count(skipped_files=1)
+                self._put(write_queue, ("record", duplicate))
+            else:
+                self._put(outbox, (document, text))
+
+
+    def _chunk(self, inbox: queue.Queue, outbox: queue.Queue) -> None:
+        while (item := self._get(inbox)) is not _DONE:
+            document, text = item
+            started = time.perf_counter()
+            content_hash = document["content_hash"]
+            key = self._content_key(document)
+            chunks = [
+                (chunk_id(key, index), piece, {"source": document["path"], "chunk": index, "content_hash": content_hash})
+                for index, piece in enumerate(self.splitter.split_text(text))
+            ]
+            self._timed("chunk", started)
+            self._put(outbox, (document, chunks))
+
+
+    def _embed(self, inbox: queue.Queue, outbox: queue.Queue) -> None:
+        chunks: List[Tuple[str, str, dict]] = []
+        documents: List[Tuple[dict, int]] = []  # document and the number of buffered chunks up to its last one
+
+        def flush(count: int) -> None:
+            batch = chunks[:count]
+            del chunks[:count]
+            started = time.perf_counter()
+            vectors = self.embedder.embed_documents([text for _, text, _ in batch]) if batch else []
+            self._timed("embed", started)
+            done = [document for document, end in documents if end <= count]
+            documents[:] = [(document, end - count) for document, end in documents if end > count]
+            self._put(outbox, ("chunks", batch, vectors, done))
+
+        while (item := self._get(inbox)) is not _DONE:
+            document, document_chunks = item
+            document["chunk_ids"] = [id for id, _, _ in document_chunks]
+            chunks.extend(document_chunks)
+            documents.append((document, len(chunks)))
+            while len(chunks) >= self.embed_batch_size:
+                flush(self.embed_batch_size)
+            if not chunks and documents:
+                flush(0)  # documents without text
+        if not self._stop.is_set() and documents:
+            flush(len(chunks))
+
+
+    def _write(self, inbox: queue.Queue, db: Session, producers: int) -> None:
+        # Both the parse stage (duplicates) and the embed stage write here; the queue ends when both have.
+        while producers:
+            item = self._get(inbox)
+            if item is _DONE:
+                if self._stop.is_set():
+                    return
+                producers -= 1
+                continue
+            started = time.perf_counter()
+            if item[0] == "record":
+                self._record(db, [self._manifest_entry(item[1])])
+                self._timed("write", started)
+                continue
+
+            _, batch, vectors, done = item
+            if batch:
+                ids, texts, metadatas = (list(column) for column in zip(*batch))
+                self.writer.upsert(ids, texts, vectors, metadatas)
+            entries = []
+            with self._lock:
+                for document in done:
+                    key = self._content_key(document)
+                    self._completed[key] = document["chunk_ids"]
+                    entries.append(self._manifest_entry(document))
+                    for duplicate in self._in_flight.pop(key, []):
+                        entries.append(self._manifest_entry({**duplicate, "chunk_ids": document["chunk_ids"]}))
+            if entries:
+                self._record(db, entries)
+            self._count(
+                processed_files=len(done),
+                skipped_files=len(entries) - len(done),
+                total_chunks=sum(len(document["chunk_ids"]) for document in done),  # counted once their document is complete
+            )
+            self._timed("write", started)
+
+
+    def _record(self, db: Session, entries: List[dict]) -> None:
+        """Save manifest entries, then delete the chunks of content no file has any more."""
+        with self._lock:
+            stale = []
+            for entry in entries:
+                previous = self._known.get(entry["path"])
+                self._known[entry["path"]] = entry
+                if previous is not None and self._content_key(previous) != self._content_key(entry):
+                    stale += self._release(previous)
+        record_ingested_documents(db, self.tool_id, self.collection, entries)
+        if stale:
+            self.writer.delete(stale)
+
+
+    def _release(self, entry: dict) -> List[str]:
+        """Drop `entry`'s claim on its content; returns the content's chunk ids if nothing else has it. Call with the lock held."""
+        key = self._content_key(entry)
+        paths = self._paths.get(key, set())
+        paths.discard(entry["path"])
+        if paths:
+            return []
+        self._paths.pop(key, None)
+        self._completed.pop(key, None)
+        return list(entry["chunk_ids"])
+
+
+    def _prune(self, root: str, db: Session) -> None:
+        """Delete the manifest entries, and chunks, of files under `root` that were not listed in this run."""
+        started = time.perf_counter()
+        with self._lock:
+            removed = [path for path in self._known if (path == root or path.startswith(root + os.sep)) and path not in self._seen]
+            stale = []
+            for path in removed:
+                stale += self._release(self._known.pop(path))
+        if removed:
+            delete_ingested_documents(db, self.tool_id, self.collection, removed)
+        if stale:
+            self.writer.delete(stale)
+        self._count(removed_files=len(removed))
+        self._timed("write", started)
+
+
+    def _manifest_entry(self, document: dict) -> dict:
+        return {
+            "path": document["path"],
+            "size": document["size"],
+            "mtime": document["mtime"],
+            "content_hash": document["content_hash"],
+            "chunk_ids": document["chunk_ids"],
+            "job_id": self.job_id,
+            **self.settings,
+        }
+
+
+    def _fail_file(self, path: Path, error: Exception) -> None:
+        with self._lock:
+            self.counters["failed_files"] += 1
+            if len(self.errors) < MAX_REPORTED_ERRORS:
+                self.errors.append({"path": str(path), "error": str(error)})
+
+
+def build_pipeline(tool_row, job_id: Optional[int] = None, resumed_counters: Optional[dict] = None) -> IngestionPipeline:
+    """The pipeline writing to a RAG tool's collection with its configured embedding model and chunking."""
+    tool = get_tool(tool_row)
+    if not isinstance(tool, BaseRAGTool):
+        raise RuntimeError(f"Tool '{tool_row.name}' is not a RAG tool")
+    return IngestionPipeline(
+        tool_id=tool_row.id,
+        collection=tool_row.config.get("index_name", "default"),
+        embedder=get_embedder(tool.embedding_model()),
+        writer=tool.vector_writer(),
+        embedding_model=tool.embedding_model(),
+        job_id=job_id,
+        resumed_counters=resumed_counters,
+        **tool.chunking_config(),
+    )
+
+
+class IngestionRunner:
+    """
+    Runs ingestion jobs in the background: one asyncio task per job, driving an
+    `IngestionPipeline` in worker threads and saving its progress every `progress_interval_s`.
+
+    A job that stops for any reason can be started again: files it already wrote are in
+    the manifest and are not embedded twice. Reindex jobs also delete the files gone from
+    their input directory, once everything else is written.
+    """
+    def __init__(self, progress_interval_s: float = INGEST_PROGRESS_INTERVAL_S, pipeline_factory: Callable[..., IngestionPipeline] = build_pipeline):
+        self.progress_interval_s = progress_interval_s
+        self.pipeline_factory = pipeline_factory
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._pipelines: Dict[int, IngestionPipeline] = {}
+        self._started: Dict[int, float] = {}
+
+
+    def start(self, job_id: int) -> None:
+        """Start (or resume) a job unless it is already running in this process."""
+        if not self.is_running(job_id):
+            self._tasks[job_id] = asyncio.create_task(self._run(job_id))
+
+
+    def is_running(self, job_id: int) -> bool:
+        return job_id in self._tasks and not self._tasks[job_id].done()
+
+
+    async def cancel(self, job_id: int) -> bool:
+        """Stop a running job and wait for its stages to wind down."""
+        if not self.is_running(job_id):
+            return False
+        pipeline = self._pipelines.get(job_id)
+        if pipeline is not None:
+            pipeline.stop()
+        else:
+            self._tasks[job_id].cancel()
+        try:
+            await self._tasks[job_id]
+        except asyncio.CancelledError:
+            pass
+        return True
+
+
+    def resume_interrupted(self) -> List[int]:
+        """Restart the jobs that were running when the process stopped."""
+        db = SessionLocal()
+        try:
+            job_ids = [job.id for job in get_ingestion_jobs(db, status=IngestionStatus.RUNNING)]
+        finally:
+            db.close()
+        for job_id in job_ids:
+            self.start(job_id)
+        return job_ids
+
+
+    def live_stats(self, job_id: int) -> Optional[dict]:
+        """Throughput of a running job so far, or None if it isn't running in this process."""
+        pipeline = self._pipelines.get(job_id)
+        return pipeline.stats(time.perf_counter() - self._started[job_id]) if pipeline is not None else None
+
+
+    async def _run(self, job_id: int) -> None:
+        db = SessionLocal()
+        job = get_ingestion_job_by_id(db, job_id)
+        resumed_seconds = job.run_seconds
+        started = time.perf_counter()
+        pipeline = None
+
+        def save_progress(status: Optional[IngestionStatus] = None, **fields) -> None:
+            progress = dict(pipeline.counters) if pipeline is not None else {}
+            update_ingestion_job(db, job, status, run_seconds=resumed_seconds + time.perf_counter() - started, **progress, **fields)
+
+        try:
+            tool_row = get_tool_by_id(db, job.tool_id)
+            if tool_row is None:
+                raise RuntimeError(f"Tool {job.tool_id} no longer exists")
+            paths = await asyncio.to_thread(list_input_files, root_dir / job.input_path)  # rglob + a stat per file
+            update_ingestion_job(db, job, IngestionStatus.RUNNING, total_files=len(paths), error=None, finished_at=None)
+
+            counters = {key: getattr(job, key) for key in ("processed_files", "skipped_files", "removed_files", "total_chunks")}
+            pipeline = await asyncio.to_thread(self.pipeline_factory, tool_row, job_id, counters)  # loads the embedding model
+            self._pipelines[job_id] = pipeline
+            self._started[job_id] = started
+            prune_root = root_dir / job.input_path if job.mode == IngestionMode.REINDEX else None
+            run = asyncio.ensure_future(asyncio.to_thread(pipeline.run, paths, SessionLocal, prune_root))
+            while not run.done():
+                await asyncio.wait({run}, timeout=self.progress_interval_s)
+                save_progress()
+            stats = run.result()
+            status = IngestionStatus.CANCELLED if pipeline.stopped else IngestionStatus.COMPLETED
+            save_progress(status, stats=stats, finished_at=datetime.now(timezone.utc))
+        except asyncio.CancelledError:
+            save_progress(IngestionStatus.CANCELLED, finished_at=datetime.now(timezone.utc))
+            raise
+        except Exception as e:
+            print(f"Ingestion job {job_id} failed: {e}")
+            stats = pipeline.stats(time.perf_counter() - started) if pipeline is not None else None
+            save_progress(IngestionStatus.FAILED, error=str(e), stats=stats, finished_at=datetime.now(timezone.utc))
+        finally:
+            db.close()
+            self._tasks.pop(job_id, None)
+            self._pipelines.pop(job_id, None)
+            self._started.pop(job_id, None)
+
+
+ingestion_runner = IngestionRunner()
@@ -1,24 +1,81 @@
+from typing import List
 from services.tools.base import BaseRAGTool
 from schemas.tools import ToolCreate
 
+try:
+    from qdrant_client import QdrantClient, models
+    QDRANT_AVAILABLE = True
+except ImportError:
+    QDRANT_AVAILABLE = False
+    QdrantClient = None
+    models = None
+
+
+class QdrantWriter:
+    """Writes embedded chunks to a Qdrant collection, with the payload layout LangChain's `Qdrant` store reads."""
+    def __init__(self, collection_name: str, vector_store_url: str = None, vector_store_path: str = None):
+        if not QDRANT_AVAILABLE:
+            raise ImportError(
+                "qdrant-client is not installed. "
+                "Install it with: uv pip install qdrant-client"
+            )
+        if vector_store_url:
+            self.client = QdrantClient(url=vector_store_url)
+        else:
+            self.client = QdrantClient(path=vector_store_path)
+        self.collection_name = collection_name
+        self._ready = self.client.collection_exists(collection_name)
+
+
+    def upsert(self, ids: List[str], texts: List[str], embeddings: List[List[float]], metadatas: List[dict]) -> None:
+        if not self._ready:
+            self.client.create_collection(
+                self.collection_name,
+                vectors_config=models.VectorParams(size=len(embeddings[0]), distance=models.Distance.COSINE),
+            )
+            self._ready = True
+        self.client.upsert(self.collection_name, points=[
+            models.PointStruct(id=id, vector=vector, payload={"page_content": text, "metadata": metadata})
+            for id, text, vector, metadata in zip(ids, texts, embeddings, metadatas)
+        ])
+
+
+    def delete(self, ids: List[str]) -> None:
+        if self._ready:
+            self.client.delete(self.collection_name, points_selector=models.PointIdsList(points=ids))
+
+
+    def reset(self) -> None:
+        """Drop the collection; the next upsert recreates it with the new embedding size."""
+        if self._ready:
+            self.client.delete_collection(self.collection_name)
+            self._ready = False
+
 
 class QdrantRAGTool(BaseRAGTool):
 
     def __init__(self, tool: ToolCreate):
         super().__init__(tool)
 
-    def to_code(self) -> str:
-        return self.render_template("tools/rag/qdrant.jinja",
+    def to_code(self, include_runtime: bool = True) -> str:
+        return self.render_tool_code("tools/rag/qdrant.jinja", include_runtime=include_runtime,
             name=self.tool.name.lower().replace(" ", "_"),
-            vector_store_path=self.tool.config.get("vector_store_path"),
+            vector_store_path=self.vector_store_path(),
             vector_store_url=self.tool.config.get("vector_store_url"),
             index_name=self.tool.config.get("index_name", "default"),
-            top_k=self.tool.config.get("retriever_top_k", 3),
-            similarity_threshold=self.tool.config.get("similarity_threshold"),
             llm_followup_prompt=self.tool.config.get(
                 "llm_followup_prompt",
                 "Answer the following question using the context: {context}\nQuestion: {question}"
-            )
+            ),
+            **self.search_config(),
+        )
+
+    def vector_writer(self) -> QdrantWriter:
+        # Qdrant tools may query a local and a remote store; ingestion writes to the remote one when both are set
+        return QdrantWriter(
+            self.tool.config.get("index_name", "default"),
+            vector_store_url=self.tool.config.get("vector_store_url"),
+            vector_store_path=self.vector_store_path(),
         )
 
     def to_node(self) -> dict:
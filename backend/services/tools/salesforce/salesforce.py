@@ -6,8 +6,8 @@ class SalesforceTool(BaseEnterpriseTool):
     def __init__(self, tool: ToolCreate):
         super().__init__(tool)
     
-    def to_code(self) -> str:
-        return self.render_template("tools/salesforce/salesforce.jinja",
+    def to_code(self, include_runtime: bool = True) -> str:
+        return self.render_tool_code("tools/salesforce/salesforce.jinja", include_runtime=include_runtime,
             name=self.tool.name.lower().replace(" ", "_"),
             instance_url=self.tool.config.get("instance_url", ""),
             environment=self.tool.config.get("environment", "production"),
@@ -36,7 +36,7 @@ class SalesforceTool(BaseEnterpriseTool):
             "default_object": self.tool.config.get("default_object", ""),
         }
 
-    def get_agent_fn(self, agent_label: str, agent_description: str, system_prompt: str, user_prompt: str, tool_name: str, agent_input: str, agent_output: str) -> str:
+    def get_agent_fn(self, agent_label: str, agent_description: str, system_prompt: str, user_prompt: str, tool_name: str, agent_input: str, agent_output: str, is_async: bool = False) -> str:
         return self.render_template("tools/salesforce/agent_fn.jinja", 
             agent_label=self.sanitize_to_func_name(agent_label), 
             agent_description=agent_description, 
@@ -44,5 +44,6 @@ class SalesforceTool(BaseEnterpriseTool):
             user_prompt=user_prompt, 
             tool_name=self.sanitize_to_func_name(tool_name), 
             agent_input=agent_input, 
-            agent_output=agent_output
+            agent_output=agent_output,
+            is_async=is_async,
         )
@@ -6,8 +6,8 @@ class SAPTool(BaseEnterpriseTool):
     def __init__(self, tool: ToolCreate):
         super().__init__(tool)
     
-    def to_code(self) -> str:
-        return self.render_template("tools/sap/sap.jinja",
+    def to_code(self, include_runtime: bool = True) -> str:
+        return self.render_tool_code("tools/sap/sap.jinja", include_runtime=include_runtime,
             name=self.tool.name.lower().replace(" ", "_"),
             system_url=self.tool.config.get("system_url", ""),
             system_number=self.tool.config.get("system_number", ""),
@@ -34,7 +34,7 @@ class SAPTool(BaseEnterpriseTool):
             "api_version": self.tool.config.get("api_version", "v1"),
         }
 
-    def get_agent_fn(self, agent_label: str, agent_description: str, system_prompt: str, user_prompt: str, tool_name: str, agent_input: str, agent_output: str) -> str:
+    def get_agent_fn(self, agent_label: str, agent_description: str, system_prompt: str, user_prompt: str, tool_name: str, agent_input: str, agent_output: str, is_async: bool = False) -> str:
         return self.render_template("tools/sap/agent_fn.jinja", 
             agent_label=self.sanitize_to_func_name(agent_label), 
             agent_description=agent_description, 
@@ -42,5 +42,6 @@ class SAPTool(BaseEnterpriseTool):
             user_prompt=user_prompt, 
             tool_name=self.sanitize_to_func_name(tool_name), 
             agent_input=agent_input, 
-            agent_output=agent_output
+            agent_output=agent_output,
+            is_async=is_async,
         )
@@ -6,8 +6,8 @@ class WorkdayTool(BaseEnterpriseTool):
     def __init__(self, tool: ToolCreate):
         super().__init__(tool)
     
-    def to_code(self) -> str:
-        return self.render_template("tools/workday/workday.jinja",
+    def to_code(self, include_runtime: bool = True) -> str:
+        return self.render_tool_code("tools/workday/workday.jinja", include_runtime=include_runtime,
             name=self.tool.name.lower().replace(" ", "_"),
             tenant_url=self.tool.config.get("tenant_url", ""),
             tenant_name=self.tool.config.get("tenant_name", ""),
@@ -36,7 +36,7 @@ class WorkdayTool(BaseEnterpriseTool):
             "report_format": self.tool.config.get("report_format", "json"),
         }
 
-    def get_agent_fn(self, agent_label: str, agent_description: str, system_prompt: str, user_prompt: str, tool_name: str, agent_input: str, agent_output: str) -> str:
+    def get_agent_fn(self, agent_label: str, agent_description: str, system_prompt: str, user_prompt: str, tool_name: str, agent_input: str, agent_output: str, is_async: bool = False) -> str:
         return self.render_template("tools/workday/agent_fn.jinja", 
             agent_label=self.sanitize_to_func_name(agent_label), 
             agent_description=agent_description, 
@@ -44,5 +44,6 @@ class WorkdayTool(BaseEnterpriseTool):
             user_prompt=user_prompt, 
             tool_name=self.sanitize_to_func_name(tool_name), 
             agent_input=agent_input, 
-            agent_output=agent_output
+            agent_output=agent_output,
+            is_async=is_async,
         )
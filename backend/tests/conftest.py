@@ -0,0 +1,15 @@
+import os
+import tempfile
+from pathlib import Path
+from cryptography.fernet import Fernet
+
+# Point the app at a throwaway key and database before any backend module is imported:
+# core.encryption reads the key at import time and db.session builds the engine.
+_tmp_dir = Path(tempfile.mkdtemp(prefix="agent-builder-tests-"))
+_key_path = _tmp_dir / "fernet.key"
+_key_path.write_bytes(Fernet.generate_key())
+
+os.environ["FERNET_SECRET_KEY"] = str(_key_path)
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp_dir / 'test.db'}"
+os.environ["RESPONSE_CACHE_PATH"] = str(_tmp_dir / "response_cache.db")
+os.environ["FLOW_CHECKPOINT_PATH"] = str(_tmp_dir / "flow_checkpoints.db")
@@ -0,0 +1,93 @@
+import asyncio
+import json
+import time
+import pytest
+from core.config import root_dir
+from crud.batches import create_batch_job, get_batch_job_by_id
+from crud.flows import create_flow
+from db.base import Base
+from db.session import SessionLocal, engine
+from models.batches import BatchStatus
+from services.flows import batch, runner
+from services.flows.batch import BatchRunner
+from services.flows.graph_cache import CompiledFlowCache
+from tests.flows.test_runner import _graph, _node
+
+
+class SlowUpperLLM:
+    def get_chat_completion(self, messages, **kwargs) -> str:
+        import time
+        time.sleep(0.02)
+        if "boom" in messages[1]["content"]:
+            raise ValueError("provider error")
+        return messages[1]["content"].upper()
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(runner, "get_llm_client_by_alias", lambda alias, db, is_remote: SlowUpperLLM())
+    monkeypatch.setattr(runner, "compiled_flow_cache", CompiledFlowCache())
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    yield db
+    db.close()
+
+
+def test_batch_resumes_from_checkpoint_without_duplicates(db, tmp_path):
+    graph = _graph([_node("s", "start"), _node("a", llm=True, config={"userPrompt": "{query}"}), _node("e", "end")], [("s", "a"), ("a", "e")])
+    flow = create_flow(db, name="batch", description="", graph=graph, state={})
+    input_path = tmp_path / "rows.jsonl"
+    input_path.write_text("\n".join(json.dumps({"input": "boom" if i == 7 else f"q{i}"}) for i in range(40)))
+    job = create_batch_job(db, flow.id, str(input_path), str(tmp_path / "out.jsonl"), "input", concurrency=4)
+    batch_runner = BatchRunner(checkpoint_rows=5, checkpoint_interval_s=60)
+
+    async def run():
+        batch_runner.start(job.id)
+        await asyncio.sleep(0.15)
+        assert await batch_runner.cancel(job.id)
+        partial = SessionLocal()
+        cancelled = get_batch_job_by_id(partial, job.id)
+        assert cancelled.status == BatchStatus.CANCELLED and 0 < cancelled.completed_rows < 40
+        partial.close()
+
+        batch_runner.start(job.id)
+        await batch_runner._tasks[job.id]
+
+    asyncio.run(run())
+    db.refresh(job)
+    assert job.status == BatchStatus.COMPLETED
+    assert job.total_rows == 40 and job.completed_rows == 39 and job.failed_rows == 1
+    assert job.stats["errors"] == 1 and job.stats["p95_latency_ms"] >= job.stats["p50_latency_ms"] > 0
+
+    rows = [json.loads(line) for line in (root_dir / job.output_path).read_text().splitlines()]
+    assert sorted(row["row"] for row in rows) == list(range(40))
+    assert next(row for row in rows if row["row"] == 3)["output"] == "Q3"
+
+
+def test_checkpoints_do_not_block_the_event_loop(db, tmp_path, monkeypatch):
+    graph = _graph([_node("s", "start"), _node("a", llm=True, config={"userPrompt": "{query}"}), _node("e", "end")], [("s", "a"), ("a", "e")])
+    flow = create_flow(db, name="batch io", description="", graph=graph, state={})
+    input_path = tmp_path / "rows.jsonl"
+    input_path.write_text("\n".join(json.dumps({"input": f"q{i}"}) for i in range(10)))
+    job = create_batch_job(db, flow.id, str(input_path), str(tmp_path / "out.jsonl"), "input", concurrency=2)
+    slow_commit = batch.checkpoint_batch_rows
+
+    def slow_checkpoint(*args):
+        time.sleep(0.2)  # a slow disk
+        return slow_commit(*args)
+
+    monkeypatch.setattr(batch, "checkpoint_batch_rows", slow_checkpoint)
+    batch_runner = BatchRunner(checkpoint_rows=2, checkpoint_interval_s=60)
+
+    async def run() -> float:
+        batch_runner.start(job.id)
+        longest_gap, last = 0.0, time.perf_counter()
+        while batch_runner.is_running(job.id):
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            longest_gap, last = max(longest_gap, now - last), now
+        return longest_gap
+
+    assert asyncio.run(run()) < 0.15
+    db.refresh(job)
+    assert job.status == BatchStatus.COMPLETED and job.completed_rows == 10
@@ -0,0 +1,77 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from fastapi import HTTPException
+from api import flows as flows_api
+from services.flows import runner
+from services.flows.checkpoints import CheckpointStore, decode_payload, encode_payload
+from services.flows.graph_cache import CompiledFlowCache
+from tests.flows.test_runner import _graph, _node
+
+
+def test_large_payloads_are_compressed_and_round_trip():
+    state = {"messages": [{"role": "assistant", "content": "row " * 2000}], "next": None, "score": 0.5}
+    data, codec, raw_size = encode_payload(state)
+    assert "+" in codec and len(data) < raw_size / 10
+    assert decode_payload(data, codec) == state
+
+    small, small_codec, _ = encode_payload({"next": "a"})
+    assert "+" not in small_codec and decode_payload(small, small_codec) == {"next": "a"}
+
+
+class FlakyLLM:
+    """Fails the node whose prompt mentions `fail_on` until `healthy` is set."""
+    def __init__(self, fail_on: str):
+        self.fail_on = fail_on
+        self.healthy = False
+        self.calls = []
+
+    def get_chat_completion(self, messages, **kwargs) -> str:
+        prompt = messages[1]["content"]
+        self.calls.append(prompt)
+        if self.fail_on in prompt and not self.healthy:
+            raise TimeoutError("upstream timed out")
+        return f"{prompt} -> done"
+
+
+def test_failed_run_resumes_from_last_completed_node(monkeypatch, tmp_path):
+    llm = FlakyLLM(fail_on="second")
+    store = CheckpointStore(db_path=str(tmp_path / "checkpoints.db"))
+    monkeypatch.setattr(runner, "get_llm_client_by_alias", lambda alias, db, is_remote: llm)
+    monkeypatch.setattr(runner, "compiled_flow_cache", CompiledFlowCache())
+    monkeypatch.setattr(runner, "checkpoint_store", store)
+    graph = _graph(
+        [_node("s", "start"), _node("a", llm=True, config={"userPrompt": "first {query}"}),
+         _node("b", llm=True, config={"userPrompt": "second {query}"}), _node("e", "end")],
+        [("s", "a"), ("a", "b"), ("b", "e")],
+    )
+    flow = SimpleNamespace(id=7, graph=graph, state={})
+
+    with pytest.raises(runner.FlowRunError) as failure:
+        asyncio.run(runner.run_flow(flow, db=None, input_data={"messages": ["go"]}))
+    run = store.load_run(failure.value.run_id)
+    assert run["status"] == "failed" and list(run["nodes"]) == ["a"]
+
+    llm.healthy = True
+    result = asyncio.run(runner.run_flow(flow, db=None, run=run))
+    assert result["output"] == "second first go -> done -> done"
+    assert llm.calls.count("first go") == 1
+    assert result["timings"]["nodes"][0]["resumed"]
+    assert store.load_run(result["run_id"])["status"] == "completed"
+    assert store.stats()["checkpoints"] > 0
+
+
+def test_running_runs_are_only_resumed_once_stale(monkeypatch, tmp_path):
+    store = CheckpointStore(db_path=str(tmp_path / "checkpoints.db"))
+    store.create_run("live", 1, "v1", {"messages": []})
+    monkeypatch.setattr(flows_api, "checkpoint_store", store)
+    monkeypatch.setattr(flows_api, "get_flow_by_id", lambda db, id: None)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(flows_api.resume_flow_run("live", db=None))
+    assert error.value.status_code == 409
+
+    monkeypatch.setattr(flows_api, "FLOW_RUN_STALE_AFTER_S", 0)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(flows_api.resume_flow_run("live", db=None))
+    assert error.value.status_code == 404  # past the 409: it went on to look up the flow
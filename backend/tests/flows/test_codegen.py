@@ -0,0 +1,41 @@
+import ast
+from api import flows as flows_api
+from crud.tools import create_tool, get_tool_by_name
+from db.base import Base
+from db.session import SessionLocal, engine
+from models.tools import ToolType
+from schemas.flows import FlowCreate, FlowOut, FlowPayload
+from services.flows.codegen import CodeGenerator
+from tests.flows.test_runner import _graph, _node
+
+
+def test_async_target_emits_async_nodes():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    if get_tool_by_name(db, "codegen sap") is None:
+        create_tool(db, "codegen sap", "", ToolType.SAP, {"system_url": "https://sap.example.com"}, None, True)
+    config = {"systemPrompt": "Use the results", "userPrompt": "{context} {query}", "inputFormat": "state.messages[-1].content", "outputMode": '{"messages": [response]}'}
+    graph = _graph([_node("s", "start"), _node("a", tool="codegen sap", config=config), _node("e", "end")], [("s", "a"), ("a", "e")])
+
+    sync_code = CodeGenerator(db=db).generate(FlowPayload(name="orders", graph=graph))
+    async_code = CodeGenerator(db=db).generate(FlowPayload(name="orders", graph=graph, target="async"))
+    db.close()
+
+    ast.parse(async_code)
+    assert "response = llm.invoke(messages)" in sync_code and "await" not in sync_code
+    assert "async def node_a(state: State):" in async_code
+    assert "result = await run_tool(codegen_sap, query)" in async_code
+    assert "response = await ainvoke_llm(llm, messages)" in async_code
+    assert "asyncio.run(main())" in async_code and "llm.invoke(messages)" not in async_code
+
+
+def test_the_code_target_is_saved_with_the_flow():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    graph = _graph([_node("s", "start"), _node("e", "end")], [("s", "e")])
+
+    created = flows_api.add_flow(FlowCreate(name="async flow", graph={**graph, "target": "async"}), db)
+    assert FlowOut.model_validate(flows_api.get_flow(created.id, db)).graph.target == "async"
+    flows_api.update_flow(created.id, FlowCreate(name="async flow", graph=graph), db)
+    assert FlowOut.model_validate(flows_api.get_flow(created.id, db)).graph.target == "sync"
+    db.close()
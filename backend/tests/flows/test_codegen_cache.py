@@ -0,0 +1,92 @@
+import copy
+from crud.llms import create_remote_llm, update_remote_llm_by_alias, get_remote_llm_by_alias
+from crud.tools import create_tool, delete_tool_by_id, get_tool_by_name, update_tool_by_id
+from db.base import Base
+from db.session import SessionLocal, engine
+from models.tools import ToolType
+from schemas.flows import FlowPayload
+from services.flows import codegen as codegen_module
+from services.flows.codegen import CodeGenerator
+from services.flows.codegen_cache import codegen_cache
+from tests.flows.test_runner import _graph, _node
+
+
+def _payload(graph: dict) -> FlowPayload:
+    return FlowPayload(name="search", graph=graph)
+
+
+def test_generated_code_is_cached_until_a_referenced_tool_changes(monkeypatch):
+    codegen_cache.clear()
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    if get_tool_by_name(db, "codegen search") is None:
+        create_tool(db, "codegen search", "", ToolType.WEB_SEARCH, {"library": "duckduckgo", "max_results": 3}, None, True)
+    if get_remote_llm_by_alias(db, "codegen-gpt") is None:
+        create_remote_llm(db, "codegen-gpt", "openai", "sk-test")
+
+    config = {"systemPrompt": "Use the results", "userPrompt": "{context} {query}", "inputFormat": 'messages[-1]["content"]', "outputMode": "text"}
+    agent = _node("a", tool="codegen search", config=config)
+    agent["data"]["llm"] = {"alias": "codegen-gpt", "model": "gpt-4o", "type": "remote"}
+    graph = _graph([_node("s", "start"), agent, _node("e", "end")], [("s", "a"), ("a", "e")])
+
+    calls = []
+    original = codegen_module.get_tools_by_names
+    monkeypatch.setattr(codegen_module, "get_tools_by_names", lambda db, names: calls.extend(sorted(names)) or original(db, names))
+
+    hits = codegen_cache.stats()["outputs"]["hits"]
+    first = CodeGenerator(db=db).generate(_payload(graph))
+    assert "def codegen_search(" in first and calls == ["codegen search"]
+
+    moved = copy.deepcopy(graph)
+    moved["nodes"][1]["position"] = {"x": 300, "y": 120}
+    moved["nodes"][1]["selected"] = True
+    assert CodeGenerator(db=db).generate(_payload(moved)) == first
+    assert calls == ["codegen search"]
+
+    tool = get_tool_by_name(db, "codegen search")
+    update_tool_by_id(db, tool.id, tool.name, tool.description, tool.type, {"library": "duckduckgo", "max_results": 7}, None, True)
+    updated = CodeGenerator(db=db).generate(_payload(graph))
+    assert "max_results: int = 7" in updated and len(calls) == 2
+
+    update_remote_llm_by_alias(db, "codegen-gpt", "codegen-gpt", "sk-rotated")
+    assert CodeGenerator(db=db).generate(_payload(graph)) == updated
+    assert codegen_cache.stats()["outputs"]["hits"] == hits + 1
+    db.close()
+
+
+def test_renaming_or_deleting_a_tool_stamps_both_names():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    tool = create_tool(db, "rename me", "", ToolType.WEB_SEARCH, {"library": "duckduckgo"}, None, True)
+    old, new = codegen_cache.tool_generation("rename me"), codegen_cache.tool_generation("renamed")
+
+    update_tool_by_id(db, tool.id, "renamed", "", tool.type, tool.config, None, True)
+    assert codegen_cache.tool_generation("rename me") == old + 1 and codegen_cache.tool_generation("renamed") == new + 1
+    delete_tool_by_id(db, tool.id)
+    assert codegen_cache.tool_generation("renamed") == new + 2
+    db.close()
+
+
+def test_incremental_generation_diffs_against_the_previous_version():
+    codegen_cache.clear()
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    if get_tool_by_name(db, "codegen search") is None:
+        create_tool(db, "codegen search", "", ToolType.WEB_SEARCH, {"library": "duckduckgo", "max_results": 3}, None, True)
+
+    config = {"systemPrompt": "Use the results", "userPrompt": "{query}", "inputFormat": 'messages[-1]["content"]', "outputMode": "text"}
+    nodes = [_node("s", "start"), _node("a", tool="codegen search", config=config), _node("b", tool="codegen search", config=dict(config)), _node("e", "end")]
+    graph = _graph(nodes, [("s", "a"), ("a", "b"), ("b", "e")])
+
+    first = CodeGenerator(db=db).generate_incremental(_payload(graph))
+    assert first["diff"] is None and first["base_version"] is None
+
+    edited = copy.deepcopy(graph)
+    edited["nodes"][2]["data"]["node"]["systemPrompt"] = "Summarize the results"
+    second = CodeGenerator(db=db).generate_incremental(_payload(edited), first["version"])
+    assert second["base_version"] == first["version"] != second["version"]
+    assert second["changes"] == {"changed": ["node:b"], "added": [], "removed": []}
+    added = [line for line in second["diff"].splitlines() if line.startswith("+") and not line.startswith("+++")]
+    assert any("Summarize the results" in line for line in added)
+    assert second["code"] == CodeGenerator(db=db).generate(_payload(edited))
+    db.close()
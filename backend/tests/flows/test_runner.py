@@ -0,0 +1,166 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from crud.flows import create_flow, update_flow_by_id, delete_flow_by_id
+from crud.tools import create_tool, delete_tool_by_id, update_tool_by_id
+from db.base import Base
+from db.session import SessionLocal, engine
+from models.tools import ToolType
+from services.flows import runner
+from services.flows.graph_cache import CompiledFlowCache, compiled_flow_cache, flow_version
+
+
+class FakeTool:
+    def __init__(self, name: str):
+        self.name = name
+
+    def to_code(self) -> str:
+        return f"def {self.name}(query: str) -> List[str]:\n    return ['{self.name} says ' + str(query)]\n"
+
+    def get_default_agent_prompts(self) -> dict:
+        return {"system_prompt": "Context: {context}", "user_prompt": "{query}"}
+
+
+class EchoLLM:
+    def __init__(self):
+        self.calls = []
+
+    def get_chat_completion(self, messages, **kwargs) -> str:
+        self.calls.append(messages)
+        return messages[0]["content"]
+
+    async def stream_chat_completion(self, messages, **kwargs):
+        self.calls.append(messages)
+        for word in messages[0]["content"].split(" "):
+            yield word + " "
+
+
+def _node(id: str, type: str = "agent", tool: str = None, llm: bool = False, config: dict = None) -> dict:
+    data = {"label": f"Node {id}", "type": type, "node": config or {}}
+    if tool:
+        data["tool"] = {"name": tool}
+    if llm:
+        data["llm"] = {"alias": "echo", "model": "echo-1", "type": "remote"}
+    return {"id": id, "type": type, "position": {"x": 0, "y": 0}, "data": data}
+
+
+def _edge(source: str, target: str) -> dict:
+    return {"id": f"{source}-{target}", "type": "default", "source": source, "target": target,
+            "sourceHandle": None, "targetHandle": None, "style": None, "markerEnd": None}
+
+
+def _graph(nodes, edges) -> dict:
+    return {"nodes": nodes, "edges": [_edge(*edge) for edge in edges]}
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    llm = EchoLLM()
+    monkeypatch.setattr(runner, "get_tool_by_name", lambda db, name: FakeTool(name))
+    monkeypatch.setattr(runner, "get_llm_client_by_alias", lambda alias, db, is_remote: llm)
+    monkeypatch.setattr(runner, "compiled_flow_cache", CompiledFlowCache())
+    return llm
+
+
+def test_runs_tool_and_llm_nodes_in_order(llm):
+    graph = _graph(
+        [_node("s", "start"), _node("a", tool="search", llm=True), _node("b", llm=True, config={"systemPrompt": "Summarize: {query}"}), _node("e", "end")],
+        [("s", "a"), ("a", "b"), ("b", "e")],
+    )
+    flow = SimpleNamespace(id=1, graph=graph, state={})
+    result = asyncio.run(runner.run_flow(flow, db=None, input_data={"messages": [{"role": "user", "content": "weather"}]}))
+
+    assert result["output"] == "Summarize: Context: search says weather"
+    assert [timing["node_id"] for timing in result["timings"]["nodes"]] == ["a", "b"]
+    assert "tool_ms" in result["timings"]["nodes"][0] and "llm_ms" in result["timings"]["nodes"][1]
+    assert not result["timings"]["compiled_from_cache"]
+
+    again = asyncio.run(runner.run_flow(flow, db=None))
+    assert again["timings"]["compiled_from_cache"]
+
+
+def test_version_ignores_canvas_layout_and_cycles_are_rejected(llm):
+    graph = _graph([_node("s", "start"), _node("a", llm=True), _node("b", llm=True)], [("s", "a"), ("a", "b"), ("b", "a")])
+    moved = _graph([_node("s", "start"), _node("a", llm=True), _node("b", llm=True)], [("s", "a"), ("a", "b"), ("b", "a")])
+    moved["nodes"][1]["position"] = {"x": 120, "y": 40}
+    assert flow_version(graph) == flow_version(moved)
+
+    with pytest.raises(runner.FlowCompileError, match="cycle"):
+        runner.compile_flow(1, graph, {}, db=None)
+
+
+def test_state_edits_recompile_and_flow_updates_drop_cached_compilations(llm):
+    graph = _graph([_node("s", "start"), _node("a", llm=True), _node("e", "end")], [("s", "a"), ("a", "e")])
+    state = {"fields": [{"name": "tone", "initialValue": "formal"}]}
+    flow = SimpleNamespace(id=7, graph=graph, state=state)
+    compiled, _ = asyncio.run(runner.get_compiled_flow(flow, db=None))
+    assert compiled.initial_state == {"tone": "formal"}
+
+    flow.state = {"fields": [{"name": "tone", "initialValue": "casual"}]}
+    recompiled, timings = asyncio.run(runner.get_compiled_flow(flow, db=None))
+    assert not timings["compiled_from_cache"] and recompiled.version != compiled.version
+    assert recompiled.initial_state == {"tone": "casual"}
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    stored = create_flow(db, name="stateful", description="", graph=graph, state=state)
+    compiled_flow_cache.put(stored.id, "v1", compiled)
+    update_flow_by_id(db, stored.id, "stateful", "", graph, flow.state)
+    assert compiled_flow_cache.get(stored.id, "v1") is None
+    compiled_flow_cache.put(stored.id, "v2", compiled)
+    delete_flow_by_id(db, stored.id)
+    assert compiled_flow_cache.get(stored.id, "v2") is None
+    db.close()
+
+
+def test_renamed_tools_drop_flows_compiled_against_either_name():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    tool = create_tool(db, "compiled search", "", ToolType.WEB_SEARCH, {"library": "duckduckgo"}, None, True)
+    compiled_flow_cache.put(901, "v1", SimpleNamespace(tool_names={"compiled search"}))
+    compiled_flow_cache.put(902, "v1", SimpleNamespace(tool_names={"compiled search v2"}))
+
+    update_tool_by_id(db, tool.id, "compiled search v2", "", tool.type, tool.config, None, True)
+    assert compiled_flow_cache.get(901, "v1") is None and compiled_flow_cache.get(902, "v1") is None
+    compiled_flow_cache.put(903, "v1", SimpleNamespace(tool_names={"compiled search v2"}))
+    delete_tool_by_id(db, tool.id)
+    assert compiled_flow_cache.get(903, "v1") is None
+    db.close()
+
+
+class SlowTool(FakeTool):
+    def to_code(self) -> str:
+        return f"import time\n\ndef {self.name}(query: str) -> str:\n    time.sleep(0.3)\n    return '{self.name}'\n"
+
+
+def test_branches_run_concurrently_and_join_deterministically(llm, monkeypatch):
+    monkeypatch.setattr(runner, "get_tool_by_name", lambda db, name: SlowTool(name))
+    graph = _graph(
+        [_node("s", "start"), _node("rag", tool="rag"), _node("web", tool="web"), _node("crm", tool="crm"),
+         _node("join", llm=True, config={"systemPrompt": "", "userPrompt": "{query}", "inputFormat": "messages"}), _node("e", "end")],
+        [("s", "rag"), ("s", "web"), ("s", "crm"), ("rag", "join"), ("web", "join"), ("crm", "join"), ("join", "e")],
+    )
+    result = asyncio.run(runner.run_flow(SimpleNamespace(id=2, graph=graph, state={}), db=None))
+
+    assert result["timings"]["total_ms"] < 800
+    contents = [m["content"] for m in result["state"]["messages"]]
+    assert contents[1:4] == ["rag", "web", "crm"]
+    assert "'content': 'crm'" in llm.calls[0][1]["content"]
+    assert [branch["nodes"] for branch in result["timings"]["branches"]] == [["rag"], ["web"], ["crm"], ["join"]]
+
+
+def test_stream_emits_node_tool_and_token_events(llm):
+    graph = _graph(
+        [_node("s", "start"), _node("a", tool="search", llm=True), _node("e", "end")],
+        [("s", "a"), ("a", "e")],
+    )
+
+    async def collect():
+        events = await runner.stream_flow(SimpleNamespace(id=3, graph=graph, state={}), db=None, input_data={"messages": ["hi"]})
+        return [event async for event in events]
+
+    events = asyncio.run(collect())
+    types = [event["type"] for event in events]
+    assert types == ["node_start", "tool_result"] + ["token"] * 4 + ["node_end", "final"]
+    assert "".join(event["content"] for event in events if event["type"] == "token") == "Context: search says hi "
+    assert events[-1]["result"]["output"] == "Context: search says hi "
@@ -0,0 +1,51 @@
+from schemas.sandbox.chatbot import Message
+from services.llms.providers.anthropic import AnthropicAPILLM
+from services.sandbox.chatbot.llm_service import DEFAULT_SYSTEM_PROMPT, LLMService
+
+EPHEMERAL = {"type": "ephemeral"}
+
+
+def test_consecutive_turns_of_the_same_role_are_merged():
+    system, turns = AnthropicAPILLM._to_anthropic_messages([
+        {"role": "system", "content": "Be brief."},
+        {"role": "user", "content": "Hi"},
+        {"role": "user", "content": "Are you there?"},
+        {"role": "assistant", "content": "Yes."},
+        {"role": "user", "content": "Good."},
+    ])
+
+    assert [turn["role"] for turn in turns] == ["user", "assistant", "user"]
+    assert turns[0]["content"] == [{"type": "text", "text": "Hi\n\nAre you there?"}]
+    assert system == [{"type": "text", "text": "Be brief.", "cache_control": EPHEMERAL}]
+
+
+def test_cache_control_marks_the_last_system_block_and_the_last_turn():
+    system, turns = AnthropicAPILLM._to_anthropic_messages([
+        {"role": "system", "content": "You are a tutor."},
+        {"role": "system", "content": ""},
+        {"role": "system", "content": "Answer in French."},
+        {"role": "user", "content": "Bonjour"},
+        {"role": "assistant", "content": "Bonjour !"},
+        {"role": "user", "content": "Ça va ?"},
+    ])
+
+    assert [block.get("cache_control") for block in system] == [None, EPHEMERAL]  # empty system messages are dropped
+    assert [turn["content"][-1].get("cache_control") for turn in turns] == [None, None, EPHEMERAL]
+
+
+def test_no_system_blocks_without_a_system_prompt():
+    system, turns = AnthropicAPILLM._to_anthropic_messages([{"role": "user", "content": "Hi"}])
+    assert system == [] and turns[0]["content"][0]["cache_control"] == EPHEMERAL
+
+
+def test_the_default_system_prompt_is_only_added_when_none_is_given():
+    history = [Message(role="user", content="Hi"), Message(role="assistant", content="Hello"), Message(role="user", content="Bye")]
+    assert LLMService.to_chat_messages(history) == [
+        {"role": "system", "content": DEFAULT_SYSTEM_PROMPT},
+        {"role": "user", "content": "Hi"},
+        {"role": "assistant", "content": "Hello"},
+        {"role": "user", "content": "Bye"},
+    ]
+
+    custom = [Message(role="system", content="Be terse."), Message(role="user", content="Hi")]
+    assert LLMService.to_chat_messages(custom) == [{"role": "system", "content": "Be terse."}, {"role": "user", "content": "Hi"}]
@@ -0,0 +1,47 @@
+from services.llms.local.model_cache import ModelResidencyManager, resolve_load_parameters
+
+
+class FakeLoader:
+    def __init__(self):
+        self.loads = []
+
+    def __call__(self, model_path: str, **load_parameters):
+        self.loads.append((model_path, load_parameters))
+        return object()
+
+
+def _gguf(tmp_path, name: str, size: int) -> str:
+    path = tmp_path / name
+    path.write_bytes(b"\0" * size)
+    return str(path)
+
+
+def test_slots_of_a_mmapped_model_share_its_weights(tmp_path):
+    loader = FakeLoader()
+    manager = ModelResidencyManager(max_models=8, memory_budget_bytes=2500, loader=loader)
+    model = _gguf(tmp_path, "model.gguf", 1000)
+    parameters = resolve_load_parameters({"n_ctx": 2048})
+
+    contexts = [manager.get(model, parameters, slot=slot) for slot in range(3)]
+    assert len({id(context) for context in contexts}) == 3 and len(loader.loads) == 3
+    assert loader.loads[0][1]["n_ctx"] == 2048
+    assert manager.get(model, parameters, slot=1) is contexts[1]
+    stats = manager.stats()
+    assert stats["resident_bytes"] == 1000 and stats["resident_models"] == 3 and stats["evictions"] == 0
+    assert stats["hits"] == 1 and stats["misses"] == 3
+
+
+def test_unmapped_contexts_count_separately_and_are_evicted_least_recently_used(tmp_path):
+    loader = FakeLoader()
+    manager = ModelResidencyManager(max_models=8, memory_budget_bytes=2500, loader=loader)
+    model = _gguf(tmp_path, "model.gguf", 1000)
+    parameters = resolve_load_parameters({"use_mmap": False})
+
+    manager.get(model, parameters, slot=0)
+    manager.get(model, parameters, slot=1)
+    manager.get(model, parameters, slot=0)  # slot 1 is now the least recently used
+    manager.get(model, parameters, slot=2)
+    stats = manager.stats()
+    assert stats["resident_bytes"] == 2000 and stats["evictions"] == 1
+    assert sorted(entry["slot"] for entry in stats["models"]) == [0, 2]
+    assert not any(entry["shared_weights"] for entry in stats["models"])
@@ -0,0 +1,72 @@
+import numpy as np
+from services.llms.local.prompt_cache import PromptCacheManager, PromptStateCache
+
+
+class FakeState:
+    def __init__(self, tokens, size: int):
+        self.tokens = list(tokens)
+        self.llama_state_size = size
+
+
+class FakeLlama:
+    """The parts of a llama.cpp context the prompt cache uses: its tokens and save/load_state."""
+    def __init__(self, state_size: int = 100):
+        self.state_size = state_size
+        self.loads = 0
+        self.evaluate([])
+
+    def evaluate(self, tokens):
+        self.input_ids = np.array(list(tokens) + [0] * 8, dtype=np.intc)
+        self.n_tokens = len(tokens)
+
+    def save_state(self) -> FakeState:
+        return FakeState(self.input_ids[:self.n_tokens].tolist(), self.state_size)
+
+    def load_state(self, state: FakeState) -> None:
+        self.loads += 1
+        self.evaluate(state.tokens)
+
+
+def test_lookup_returns_the_state_with_the_longest_shared_prefix():
+    cache = PromptStateCache(capacity_bytes=1000)
+    cache.put([1, 2, 3], FakeState([1, 2, 3], 10))
+    cache.put([1, 2, 3, 4, 5], FakeState([1, 2, 3, 4, 5], 10))
+    cache.put([7, 8], FakeState([7, 8], 10))
+
+    assert cache.longest_prefix([1, 2, 3, 4, 9]) == ((1, 2, 3, 4, 5), 4)
+    assert cache.longest_prefix([1, 2, 6]) == ((1, 2, 3), 2)  # ties go to the least recently used
+    assert cache.longest_prefix([5, 5]) == (None, 0)
+
+
+def test_states_are_evicted_least_recently_used_past_the_byte_budget():
+    cache = PromptStateCache(capacity_bytes=250)
+    for first in (1, 2):
+        cache.put([first], FakeState([first], 100))
+    assert cache.get((1,)) is not None  # (2,) is now the least recently used
+    cache.put([3], FakeState([3], 100))
+
+    assert cache.get((2,)) is None and cache.get((1,)) and cache.get((3,))
+    assert len(cache) == 2 and cache.size_bytes() == 200
+    cache.put([4], FakeState([4], 251))  # larger than the whole budget: not cached
+    assert cache.get((4,)) is None and len(cache) == 2
+
+
+def test_saved_state_is_restored_for_a_prompt_extending_it():
+    manager = PromptCacheManager(capacity_bytes=1000)
+    client = FakeLlama()
+    history = list(range(1, 11))
+    client.evaluate(history)
+    manager.save("model", client)
+
+    client.evaluate([42, 43])  # another conversation used the context since
+    metrics = manager.prepare("model", client, history + [11, 12])
+    assert metrics == {"prompt_tokens": 12, "tokens_reused": 10, "tokens_evaluated": 2, "source": "cache"}
+    assert client.loads == 1 and client.input_ids[:client.n_tokens].tolist() == history
+
+    client.evaluate(history + [11, 12])
+    again = manager.prepare("model", client, history + [11, 12])
+    assert again["source"] == "context" and again["tokens_reused"] == 11 and client.loads == 1
+
+    stats = manager.stats()
+    assert stats["requests"] == 2 and stats["state_restores"] == 1 and stats["cached_states"] == 1
+    assert stats["tokens_reused"] == 21 and stats["cached_bytes"] == 100
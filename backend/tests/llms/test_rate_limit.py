@@ -0,0 +1,152 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from crud.llms import create_local_llm, delete_local_llm_by_alias, update_local_llm_by_alias
+from db.base import Base
+from db.session import SessionLocal, engine
+from services.llms.local.lm_studio import LMStudioLLM
+from services.llms.rate_limit import ProviderRateLimiter, rate_limiter_registry
+
+
+class FakeProvider:
+    """OpenAI-compatible server that answers 429 past `max_concurrent` requests or for the first `fail_first`."""
+    def __init__(self, max_concurrent: int = 100, fail_first: int = 0, retry_after: str = "0.05", delay: float = 0.05):
+        self.max_concurrent = max_concurrent
+        self.fail_first = fail_first
+        self.retry_after = retry_after
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.requests = 0
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+        provider = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with provider.lock:
+                    provider.requests += 1
+                    throttle = provider.requests <= provider.fail_first or provider.active >= provider.max_concurrent
+                    if throttle:
+                        provider.throttled += 1
+                    else:
+                        provider.active += 1
+                        provider.peak = max(provider.peak, provider.active)
+                if throttle:
+                    body = b'{"error": "rate limited"}'
+                    self.send_response(429)
+                    self.send_header("Retry-After", provider.retry_after)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                try:
+                    threading.Event().wait(provider.delay)
+                    self._respond(payload.get("stream", False))
+                finally:
+                    with provider.lock:
+                        provider.active -= 1
+
+            def _respond(self, stream: bool):
+                self.send_response(200)
+                self.send_header("x-ratelimit-limit-requests", "6000")
+                self.send_header("x-ratelimit-remaining-requests", "5999")
+                self.send_header("x-ratelimit-reset-requests", "10ms")
+                if not stream:
+                    body = json.dumps({"choices": [{"message": {"content": "pong"}}]}).encode()
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for token in ["po", "ng"]:
+                    self.wfile.write(f'data: {json.dumps({"choices": [{"delta": {"content": token}}]})}\n\n'.encode())
+                self.wfile.write(b"data: [DONE]\n\n")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.port = self.server.server_address[1]
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _llm(port: int, limiter: ProviderRateLimiter) -> LMStudioLLM:
+    llm = LMStudioLLM(host="127.0.0.1", port=port)
+    llm.rate_limiter = limiter
+    return llm
+
+
+def test_retries_after_429_and_learns_limits_from_headers():
+    limiter = ProviderRateLimiter("fake", max_retries=4, backoff_base=0.01)
+    with FakeProvider(fail_first=3) as provider:
+        text = _llm(provider.port, limiter).get_chat_completion([{"role": "user", "content": "ping"}])
+
+    assert text == "pong"
+    stats = limiter.stats()
+    assert stats["throttled"] == 3 and stats["retries"] == 3 and stats["succeeded"] == 1
+    assert stats["concurrency_limit"] < 8
+    assert stats["requests_per_minute"] == 6000
+
+
+def test_gives_up_after_max_retries():
+    limiter = ProviderRateLimiter("fake", max_retries=1, backoff_base=0.01)
+    with FakeProvider(fail_first=10) as provider:
+        try:
+            _llm(provider.port, limiter).get_chat_completion([{"role": "user", "content": "ping"}])
+            raise AssertionError("expected the rate limit error to surface")
+        except RuntimeError as e:
+            assert "rate limit" in str(e)
+    assert limiter.stats()["gave_up"] == 1
+
+
+def test_streams_survive_a_429_storm_and_concurrency_adapts():
+    limiter = ProviderRateLimiter("fake", initial_concurrency=16, max_retries=20, backoff_base=0.01)
+
+    async def run(port: int):
+        llm = _llm(port, limiter)
+
+        async def one():
+            tokens = [t async for t in llm.stream_chat_completion([{"role": "user", "content": "ping"}])]
+            return "".join(tokens)
+
+        try:
+            return await asyncio.gather(*[one() for _ in range(24)])
+        finally:
+            await llm.async_client.aclose()
+
+    with FakeProvider(max_concurrent=2) as provider:
+        results = asyncio.run(run(provider.port))
+
+    assert results == ["pong"] * 24
+    stats = limiter.stats()
+    assert stats["throttled"] == provider.throttled > 0
+    assert stats["concurrency_limit"] < 16
+    assert stats["max_queue_time_s"] > 0
+
+
+def test_updating_or_deleting_an_llm_drops_its_learned_limits():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    create_local_llm(db, "throttled-local", "lm_studio", "http://localhost:1234")
+    limiter = rate_limiter_registry.get("throttled-local", is_remote=False)
+    assert rate_limiter_registry.get("throttled-local", is_remote=False) is limiter
+
+    update_local_llm_by_alias(db, "throttled-local", "lm_studio", "http://localhost:5678")
+    updated = rate_limiter_registry.get("throttled-local", is_remote=False)
+    assert updated is not limiter
+    delete_local_llm_by_alias(db, "throttled-local")
+    assert rate_limiter_registry.get("throttled-local", is_remote=False) is not updated
+    db.close()
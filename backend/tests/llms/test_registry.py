@@ -0,0 +1,50 @@
+from services.llms.registry import LLMClientRegistry
+
+
+def test_lookups_are_counted_and_the_least_recently_used_client_is_evicted():
+    registry = LLMClientRegistry(max_size=2)
+    built = []
+
+    def client(alias: str, is_remote: bool = True):
+        return registry.get_or_create(alias, is_remote, lambda: built.append(alias) or object())
+
+    first = client("gpt")
+    assert client("gpt") is first
+    client("claude")
+    client("gpt")  # "claude" is now the least recently used
+    client("mistral")
+
+    assert built == ["gpt", "claude", "mistral"]
+    assert client("gpt") is first and len(built) == 3
+    client("claude")
+    assert built == ["gpt", "claude", "mistral", "claude"]
+    stats = registry.stats()
+    assert stats["hits"] == 3 and stats["misses"] == 4 and stats["evictions"] == 2 and stats["size"] == 2
+    assert stats["hit_rate"] == 3 / 7
+
+
+def test_invalidate_drops_the_remote_and_local_clients_of_an_alias():
+    registry = LLMClientRegistry()
+    remote = registry.get_or_create("shared", True, object)
+    local = registry.get_or_create("shared", False, object)
+    other = registry.get_or_create("other", True, object)
+
+    registry.invalidate("shared")
+    assert registry.generation("shared") == 1 and registry.generation("other") == 0
+    assert registry.get_or_create("shared", True, object) is not remote
+    assert registry.get_or_create("shared", False, object) is not local
+    assert registry.get_or_create("other", True, object) is other
+    assert registry.stats()["invalidations"] == 2
+
+
+def test_a_client_built_while_its_alias_is_invalidated_is_not_cached():
+    registry = LLMClientRegistry()
+
+    def factory():
+        registry.invalidate("gpt")  # e.g. the API key is rotated mid-build
+        return object()
+
+    stale = registry.get_or_create("gpt", True, factory)
+    assert registry.stats()["size"] == 0
+    fresh = registry.get_or_create("gpt", True, object)
+    assert fresh is not stale and registry.get_or_create("gpt", True, object) is fresh
@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import time
+import pytest
+from services.llms.local.scheduler import LocalInferenceScheduler, SchedulerOverloadedError
+
+
+def _model(scheduler: LocalInferenceScheduler) -> dict:
+    return scheduler.stats()["models"][0]
+
+
+def test_waiters_are_served_in_fifo_order():
+    scheduler = LocalInferenceScheduler()
+    served = []
+
+    async def request(name: str):
+        async with scheduler.slot("model"):
+            served.append(name)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        holder = await scheduler.acquire("model")
+        tasks = []
+        for name in ("first", "second", "third"):
+            tasks.append(asyncio.create_task(request(name)))
+            await asyncio.sleep(0)  # enqueue in this order
+        assert _model(scheduler)["queue_depth"] == 3
+        scheduler.release("model", holder)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert served == ["first", "second", "third"]
+    stats = _model(scheduler)
+    assert stats["completed"] == 4 and stats["active"] == 0 and stats["max_queue_depth"] == 3
+
+
+def test_cancelled_waiters_never_hold_a_slot():
+    scheduler = LocalInferenceScheduler()
+
+    async def run():
+        holder = await scheduler.acquire("model")
+        waiting = asyncio.create_task(scheduler.acquire("model"))
+        picked = asyncio.create_task(scheduler.acquire("model"))
+        await asyncio.sleep(0)
+        waiting.cancel()  # still queued
+        await asyncio.sleep(0)
+        scheduler.release("model", holder)  # picks `picked`...
+        picked.cancel()  # ...which gives up before it could use the slot
+        await asyncio.gather(waiting, picked, return_exceptions=True)
+        await asyncio.sleep(0)
+        return await asyncio.wait_for(scheduler.acquire("model"), 1)
+
+    assert asyncio.run(run()) == 0
+    stats = _model(scheduler)
+    assert stats["completed"] == 1 and stats["cancelled"] == 2 and stats["active"] == 1 and stats["queue_depth"] == 0
+
+
+def test_queue_timeout_and_depth_reject_requests():
+    scheduler = LocalInferenceScheduler(max_queue_depth=1, queue_timeout=0.05)
+    held = scheduler.acquire_sync("model")
+    with pytest.raises(SchedulerOverloadedError, match="Timed out"):
+        scheduler.acquire_sync("model")
+
+    async def run():
+        waiting = asyncio.create_task(scheduler.acquire("model"))
+        await asyncio.sleep(0)
+        with pytest.raises(SchedulerOverloadedError, match="queue is full"):
+            await scheduler.acquire("model")
+        with pytest.raises(SchedulerOverloadedError, match="Timed out"):
+            await waiting
+
+    asyncio.run(run())
+    scheduler.release("model", held)
+    stats = _model(scheduler)
+    assert stats["rejected"] == 3 and stats["queue_depth"] == 0 and stats["active"] == 0 and stats["completed"] == 1
+
+
+def test_slot_count_follows_n_parallel_changes():
+    scheduler = LocalInferenceScheduler()
+    first = scheduler.acquire_sync("model", slots=1)
+    woken = []
+    waiter = threading.Thread(target=lambda: woken.append(scheduler.acquire_sync("model", slots=1)))
+    waiter.start()
+    while _model(scheduler)["queue_depth"] == 0:
+        time.sleep(0.001)
+
+    assert scheduler.acquire_sync("model", slots=3) == 2  # the queued request gets the first new slot
+    waiter.join(1)
+    assert woken == [1] and _model(scheduler)["slots"] == 3
+
+    scheduler.release("model", 2)
+    scheduler.queue_timeout = 0.05
+    with pytest.raises(SchedulerOverloadedError):
+        scheduler.acquire_sync("model", slots=1)  # slots 1 and 2 are gone, slot 0 is still held
+    scheduler.release("model", 1)  # retires instead of being reused
+    with pytest.raises(SchedulerOverloadedError):
+        scheduler.acquire_sync("model", slots=1)
+    scheduler.release("model", first)
+    assert scheduler.acquire_sync("model", slots=1) == 0
+    stats = _model(scheduler)
+    assert stats["slots"] == 1 and stats["active"] == 1 and stats["completed"] == 3
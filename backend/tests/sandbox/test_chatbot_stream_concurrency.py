@@ -0,0 +1,82 @@
+import asyncio
+import time
+import httpx
+from fastapi import FastAPI
+from services.llms.base import BaseLocalLLM
+from services.llms.local.streaming import iterate_in_executor
+import api.chatbot as chatbot
+
+
+TOKENS = 5
+TOKEN_DELAY = 0.1
+PARALLEL_REQUESTS = 4
+
+
+class BlockingLocalLLM(BaseLocalLLM):
+    """Local provider whose decoding loop blocks, like llama.cpp."""
+    def __init__(self):
+        super().__init__("blocking-local")
+
+    def get_chat_completion(self, messages, **kwargs) -> str:
+        return "".join(self._decode())
+
+    async def stream_chat_completion(self, messages, **kwargs):
+        async for token in iterate_in_executor(self._decode):
+            yield token
+
+    def _decode(self):
+        for i in range(TOKENS):
+            time.sleep(TOKEN_DELAY)
+            yield f"tok{i} "
+
+    def list_models(self) -> list[str]:
+        return ["blocking"]
+
+    def list_embeddings_models(self) -> list[str]:
+        return []
+
+    def to_code(self, model: str) -> str:
+        return ""
+
+    def to_node(self) -> dict:
+        return {}
+
+    def get_tunable_parameters(self, model: str) -> dict:
+        return {}
+
+
+async def _stream_chat(client: httpx.AsyncClient) -> str:
+    response = await client.post("/api/playground/chatbot/chat/stream", json={
+        "messages": [{"role": "user", "content": "hi"}],
+        "model": "blocking",
+        "llm_alias": "blocking",
+        "llm_type": "local",
+    })
+    assert response.status_code == 200
+    return response.text
+
+
+async def _timed_requests(n: int) -> tuple[float, list[str]]:
+    app = FastAPI()
+    app.include_router(chatbot.router, prefix="/api")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        start = time.perf_counter()
+        bodies = await asyncio.gather(*[_stream_chat(client) for _ in range(n)])
+        return time.perf_counter() - start, bodies
+
+
+def test_parallel_streams_finish_in_about_the_time_of_one(monkeypatch):
+    llm = BlockingLocalLLM()
+    monkeypatch.setattr(chatbot.llm_service, "llm_factory", lambda **kwargs: llm)
+    # Identical requests would otherwise be coalesced into one upstream call.
+    monkeypatch.setattr(chatbot.llm_service, "single_flight_enabled", False)
+
+    single, _ = asyncio.run(_timed_requests(1))
+    parallel, bodies = asyncio.run(_timed_requests(PARALLEL_REQUESTS))
+
+    for body in bodies:
+        assert "tok4" in body
+        assert body.rstrip().endswith("data: [DONE]")
+    # Blocking the event loop would serialise the streams (~PARALLEL_REQUESTS x single).
+    assert parallel < single * 2
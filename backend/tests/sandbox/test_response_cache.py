@@ -0,0 +1,78 @@
+import asyncio
+import time
+from schemas.sandbox.chatbot import Message
+from services.sandbox.chatbot import llm_service as llm_service_module
+from services.sandbox.chatbot.llm_service import LLMService
+from services.sandbox.chatbot.response_cache import ResponseCache, build_cache_key
+
+
+def _key(content: str, **params) -> str:
+    return build_cache_key("alias", "Remote", "model", [{"role": "user", "content": content}], {"temperature": 0.7, **params})
+
+
+def test_keys_ignore_formatting_but_not_sampling_parameters():
+    assert _key("What is RAG?") == _key("  What is RAG?  \r\n") == _key("What is RAG?", top_p=None)
+    assert _key("line one  \r\nline two") == _key("line one\nline two")
+    assert _key("What is RAG?") != _key("what is rag?")
+    assert _key("What is RAG?") != _key("What is RAG?", temperature=0.2)
+    assert _key("What is RAG?") == build_cache_key("alias", "remote", "model", [{"role": "user", "content": "What is RAG?"}], {"temperature": 0.7})
+
+
+def test_entries_expire_in_both_tiers(tmp_path):
+    cache = ResponseCache(db_path=str(tmp_path / "cache.db"), ttl_s=0.05)
+    cache.put("a", ["hello ", "world"])
+    assert cache.get("a") == ["hello ", "world"]
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["expired"] == 2 and stats["memory_entries"] == 0 and stats["disk_entries"] == 0 and stats["misses"] == 1
+
+
+def test_disk_tier_evicts_least_recently_used_past_its_size_cap(tmp_path):
+    cache = ResponseCache(max_entries=1, db_path=str(tmp_path / "cache.db"), max_disk_bytes=100)
+    for key in ("a", "b"):
+        cache.put(key, ["x" * 40])
+    assert cache.get("a") == ["x" * 40]  # from disk: "b" is now the least recently used
+    cache.put("c", ["x" * 40])
+
+    assert cache.get("b") is None and cache.get("a") is not None and cache.get("c") is not None
+    stats = cache.stats()
+    assert stats["disk_entries"] == 2 and stats["disk_bytes"] <= 100 and stats["disk_hits"] >= 1
+
+
+def test_memory_tier_keeps_to_its_byte_budget():
+    cache = ResponseCache(max_entries=10, db_path=None, max_memory_bytes=100)
+    for key in ("a", "b", "c"):
+        cache.put(key, ["é" * 20])  # 40 bytes each
+    assert cache.get("a") is None and cache.get("b") and cache.get("c")
+    cache.put("huge", ["x" * 101])
+    assert cache.get("huge") is None and cache.get("c")
+    assert cache.stats()["memory_bytes"] == 80
+
+
+class CountingLLM:
+    def __init__(self):
+        self.calls = 0
+
+    async def stream_chat_completion(self, messages, **kwargs):
+        self.calls += 1
+        for token in ("cached ", "answer"):
+            yield token
+
+
+def test_cached_completion_is_replayed_as_the_same_stream_chunks(monkeypatch, tmp_path):
+    monkeypatch.setattr(llm_service_module, "response_cache", ResponseCache(db_path=str(tmp_path / "cache.db")))
+    llm = CountingLLM()
+    service = LLMService()
+    service.llm_factory = lambda **kwargs: llm
+    service.semantic_cache_enabled = False
+
+    async def stream() -> list:
+        chunks = service.generate_chat_completion([Message(role="user", content="hi")], "model", "alias", stream=True, cache=True)
+        return [chunk["choices"][0] async for chunk in chunks]
+
+    first = asyncio.run(stream())
+    replayed = asyncio.run(stream())
+    assert llm.calls == 1
+    assert replayed == first and [choice["delta"].get("content") for choice in replayed] == ["cached ", "answer", None]
+    assert replayed[-1]["finish_reason"] == "stop"
@@ -0,0 +1,129 @@
+import asyncio
+import httpx
+import numpy as np
+from fastapi import FastAPI
+from services.sandbox.chatbot.semantic_cache import BaseEmbedder, SemanticCache
+import api.chatbot as chatbot
+
+
+class StubEmbedder(BaseEmbedder):
+    """Deterministic embedder: questions about the same topic word map to the same direction."""
+    TOPICS = ["weather", "capital", "recipe"]
+
+    def __init__(self):
+        self.dim = len(self.TOPICS) + 1
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.full(self.dim, 0.1, dtype=np.float32)
+        for i, topic in enumerate(self.TOPICS):
+            if topic in text.lower():
+                vector[i] = 1.0
+        return vector / np.linalg.norm(vector)
+
+
+def _cache(**kwargs) -> SemanticCache:
+    return SemanticCache(embedder=StubEmbedder(), threshold=0.95, **kwargs)
+
+
+def test_similar_question_hits_within_scope():
+    cache = _cache()
+    scope = cache.make_scope("gpt", "remote", "gpt-4o", "You are a helpful assistant.")
+    cache.store(scope, "What's the weather in Paris?", ["Sunny."])
+
+    hit = cache.lookup(scope, "what is the WEATHER in paris")
+    assert hit is not None and hit[0] == ["Sunny."] and hit[1] > 0.95
+    assert cache.lookup(scope, "What is the capital of France?") is None
+
+    other_prompt = cache.make_scope("gpt", "remote", "gpt-4o", "Answer like a pirate.")
+    other_model = cache.make_scope("gpt", "remote", "gpt-4o-mini", "You are a helpful assistant.")
+    assert cache.lookup(other_prompt, "What's the weather in Paris?") is None
+    assert cache.lookup(other_model, "What's the weather in Paris?") is None
+
+
+def test_expired_and_evicted_entries_miss():
+    cache = _cache(max_entries=2)
+    scope = cache.make_scope("gpt", "remote", "gpt-4o", "")
+    cache.store(scope, "weather?", ["Sunny."], ttl_s=0)
+    assert cache.lookup(scope, "weather?") is None
+
+    cache.store(scope, "weather?", ["Sunny."])
+    cache.store(scope, "capital?", ["Paris."])
+    cache.store(scope, "recipe?", ["Crepes."])
+    assert cache.lookup(scope, "weather?") is None
+    assert cache.lookup(scope, "recipe?")[0] == ["Crepes."]
+    assert cache.stats()["entries"] == 2
+
+
+class CountingLLM:
+    def __init__(self):
+        self.calls = 0
+
+    def get_chat_completion(self, messages, **kwargs) -> str:
+        self.calls += 1
+        return f"answer {self.calls}"
+
+    async def stream_chat_completion(self, messages, **kwargs):
+        self.calls += 1
+        yield f"answer {self.calls}"
+
+
+async def _ask(client: httpx.AsyncClient, question: str, headers=None) -> str:
+    response = await client.post("/api/playground/chatbot/chat", headers=headers, json={
+        "messages": [{"role": "user", "content": question}],
+        "model": "gpt-4o",
+        "llm_alias": "gpt",
+        "llm_type": "remote",
+    })
+    assert response.status_code == 200
+    return response.json()["choices"][0]["message"]["content"]
+
+
+def test_service_serves_similar_questions_from_cache(monkeypatch):
+    llm = CountingLLM()
+    monkeypatch.setattr(chatbot.llm_service, "llm_factory", lambda **kwargs: llm)
+    monkeypatch.setattr(chatbot.llm_service, "semantic_cache", _cache())
+    monkeypatch.setattr(chatbot.llm_service, "semantic_cache_enabled", True)
+
+    async def run():
+        app = FastAPI()
+        app.include_router(chatbot.router, prefix="/api")
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            first = await _ask(client, "What's the weather like?")
+            second = await _ask(client, "what is the weather like")
+            bypassed = await _ask(client, "what is the weather like", headers={"X-Semantic-Cache": "bypass"})
+            return first, second, bypassed
+
+    first, second, bypassed = asyncio.run(run())
+    assert first == second == "answer 1"
+    assert bypassed == "answer 2"
+    assert llm.calls == 2
+
+
+def test_follow_ups_in_different_conversations_do_not_share_answers(monkeypatch):
+    llm = CountingLLM()
+    monkeypatch.setattr(chatbot.llm_service, "llm_factory", lambda **kwargs: llm)
+    monkeypatch.setattr(chatbot.llm_service, "semantic_cache", _cache())
+    monkeypatch.setattr(chatbot.llm_service, "semantic_cache_enabled", True)
+
+    def conversation(topic: str) -> list:
+        return [
+            {"role": "user", "content": f"Tell me about the {topic}."},
+            {"role": "assistant", "content": f"Here is the {topic}."},
+            {"role": "user", "content": "Explain that in more detail"},
+        ]
+
+    async def follow_up(client: httpx.AsyncClient, topic: str) -> str:
+        response = await client.post("/api/playground/chatbot/chat", json={
+            "messages": conversation(topic), "model": "gpt-4o", "llm_alias": "gpt", "llm_type": "remote",
+        })
+        return response.json()["choices"][0]["message"]["content"]
+
+    async def run():
+        app = FastAPI()
+        app.include_router(chatbot.router, prefix="/api")
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return [await follow_up(client, topic) for topic in ("weather", "recipe", "weather")]
+
+    weather, recipe, weather_again = asyncio.run(run())
+    assert weather != recipe and weather_again == weather
+    assert llm.calls == 2
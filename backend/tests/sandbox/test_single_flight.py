@@ -0,0 +1,106 @@
+import asyncio
+import pytest
+from services.sandbox.chatbot.single_flight import SingleFlight
+
+
+class Upstream:
+    """A provider stream the test feeds chunk by chunk; `None` ends it and an exception is raised to the reader."""
+    def __init__(self):
+        self.calls = 0
+        self.closed = False
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def stream(self):
+        self.calls += 1
+        try:
+            while True:
+                item = await self.queue.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self.closed = True
+
+
+async def _collect(flight: SingleFlight, upstream: Upstream, key: str = "key") -> list:
+    return [chunk async for chunk in flight.stream(key, upstream.stream)]
+
+
+def test_identical_concurrent_requests_share_one_upstream_call():
+    flight = SingleFlight()
+
+    async def run():
+        upstream = Upstream()
+        readers = [asyncio.create_task(_collect(flight, upstream)) for _ in range(3)]
+        await asyncio.sleep(0)
+        for item in ("Hel", "lo", None):
+            upstream.queue.put_nowait(item)
+        return upstream, await asyncio.gather(*readers)
+
+    upstream, results = asyncio.run(run())
+    assert upstream.calls == 1 and results == [["Hel", "lo"]] * 3
+    stats = flight.stats()
+    assert stats["upstream_calls"] == 1 and stats["coalesced"] == 2 and stats["in_flight"] == 0
+
+
+def test_a_late_subscriber_gets_a_replay_then_live_chunks():
+    flight = SingleFlight()
+
+    async def run():
+        upstream = Upstream()
+        first = asyncio.create_task(_collect(flight, upstream))
+        upstream.queue.put_nowait("a")
+        upstream.queue.put_nowait("b")
+        while flight.stats()["in_flight"] == 0 or upstream.queue.qsize():
+            await asyncio.sleep(0)
+        late = asyncio.create_task(_collect(flight, upstream))
+        await asyncio.sleep(0)
+        upstream.queue.put_nowait("c")
+        upstream.queue.put_nowait(None)
+        return await first, await late
+
+    first, late = asyncio.run(run())
+    assert first == late == ["a", "b", "c"]
+    assert flight.stats()["replayed_chunks"] == 2
+
+
+def test_an_upstream_error_reaches_every_subscriber():
+    flight = SingleFlight()
+
+    async def run():
+        upstream = Upstream()
+        readers = [asyncio.create_task(_collect(flight, upstream)) for _ in range(2)]
+        await asyncio.sleep(0)
+        upstream.queue.put_nowait("partial")
+        upstream.queue.put_nowait(ValueError("provider failed"))
+        return await asyncio.gather(*readers, return_exceptions=True)
+
+    errors = asyncio.run(run())
+    assert all(isinstance(error, ValueError) and str(error) == "provider failed" for error in errors)
+    assert flight.stats()["failed"] == 1 and flight.stats()["in_flight"] == 0
+
+
+def test_the_upstream_call_is_cancelled_when_the_last_subscriber_leaves():
+    flight = SingleFlight()
+
+    async def run():
+        upstream = Upstream()
+        readers = [asyncio.create_task(_collect(flight, upstream)) for _ in range(2)]
+        await asyncio.sleep(0)
+        upstream.queue.put_nowait("a")
+        await asyncio.sleep(0.01)
+
+        readers[0].cancel()
+        await asyncio.sleep(0.01)
+        assert not upstream.closed and flight.stats()["subscribers"] == 1
+        readers[1].cancel()
+        await asyncio.gather(*readers, return_exceptions=True)
+        await asyncio.sleep(0.01)
+        return upstream
+
+    upstream = asyncio.run(run())
+    assert upstream.closed and upstream.calls == 1
+    stats = flight.stats()
+    assert stats["cancelled"] == 1 and stats["in_flight"] == 0
@@ -0,0 +1,52 @@
+import ast
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from schemas.tools import ToolCreate
+from services.flows.runner import load_tool_function
+from services.tools.factory import get_tool
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    token_requests = 0
+    client_ports = set()
+
+    def _reply(self, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        type(self).token_requests += 1
+        self._reply({"access_token": "secret-token", "expires_in": 3600})
+
+    def do_GET(self):
+        type(self).client_ports.add(self.client_address[1])
+        self._reply({"path": self.path, "authorization": self.headers.get("Authorization")})
+
+    def log_message(self, *args):
+        pass
+
+
+def test_generated_tools_reuse_connections_and_tokens():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        tool = get_tool(ToolCreate(name="sap orders", description="", type="sap", is_active=True, config={
+            "system_url": url, "auth_type": "oauth", "oauth_token_endpoint": f"{url}/token", "username": "user", "password": "pw",
+        }))
+        ast.parse(tool.to_code())  # standalone code carries its runtime
+        fn = load_tool_function("sap orders", tool.to_code(include_runtime=False), tool.runtimes)
+
+        results = [fn("q", endpoint="/orders") for _ in range(5)]
+        assert results[-1] == {"path": "/orders", "authorization": "Bearer secret-token"}
+        assert _Handler.token_requests == 1
+        assert len(_Handler.client_ports) == 1
+    finally:
+        server.shutdown()
@@ -0,0 +1,221 @@
+import asyncio
+import time
+import os
+from types import SimpleNamespace
+import pytest
+from fastapi import HTTPException
+from api import tools as tools_api
+from crud.ingestion import create_ingestion_job, get_ingested_documents, get_ingestion_job_by_id, get_manifest_summary
+from crud.tools import create_tool, get_tool_by_name
+from db.base import Base
+from db.session import SessionLocal, engine
+from models.ingestion import IngestionMode, IngestionStatus
+from models.tools import ToolType
+from services.sandbox.chatbot.semantic_cache import HashingEmbedder
+from services.tools.rag.ingestion import IngestionPipeline, IngestionRunner, list_input_files
+
+
+class LocalEmbedder:
+    def __init__(self, delay_s: float = 0.0):
+        self.embedder = HashingEmbedder(dim=64)
+        self.delay_s = delay_s
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        time.sleep(self.delay_s)
+        return [self.embedder.embed(text).tolist() for text in texts]
+
+
+class MemoryWriter:
+    def __init__(self):
+        self.chunks = {}
+        self.upserts = 0
+
+    def upsert(self, ids, texts, embeddings, metadatas):
+        self.upserts += 1
+        self.chunks.update({id: (text, metadata) for id, text, metadata in zip(ids, texts, metadatas)})
+
+    def delete(self, ids):
+        for id in ids:
+            self.chunks.pop(id, None)
+
+    def reset(self):
+        self.chunks.clear()
+
+
+def _tool(db, collection: str):
+    tool = get_tool_by_name(db, "ingest docs")
+    return tool or create_tool(db, "ingest docs", "", ToolType.RAG, {"library": "chromadb", "index_name": collection}, None, True)
+
+
+def _corpus(root, files: int = 3):
+    (root / "sub").mkdir()
+    (root / "a.txt").write_text("Invoices are paid within 30 days. " * 40)
+    (root / "copy_of_a.md").write_text("Invoices are paid within 30 days. " * 40)
+    (root / "page.html").write_text("<html><style>p {}</style><body><p>Refunds take 5 days.</p></body></html>")
+    for i in range(files):
+        (root / "sub" / f"doc{i}.txt").write_text(f"Document {i}. " + "Shipping is free above 50 euros. " * 20)
+    (root / "image.png").write_bytes(b"\x89PNG")
+
+
+def test_pipeline_dedupes_by_content_and_skips_ingested_files(tmp_path):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    tool = _tool(db, "pipeline")
+    _corpus(tmp_path)
+    paths = list_input_files(tmp_path)
+    assert len(paths) == 6  # the image is not a supported document
+
+    embedder, writer = LocalEmbedder(), MemoryWriter()
+    pipeline = IngestionPipeline(tool.id, "pipeline", embedder, writer, chunk_size=200, chunk_overlap=20, embed_batch_size=4, queue_size=1)
+    stats = pipeline.run(paths)
+    assert stats["processed_files"] == 5 and stats["skipped_files"] == 1 and stats["failed_files"] == 0
+    assert stats["total_chunks"] == len(writer.chunks) > 5 and stats["chunks_per_s"] > 0
+    assert any(text == "Refunds take 5 days." for text, _ in writer.chunks.values())
+
+    manifest = {document.path: document for document in get_ingested_documents(db, tool.id, "pipeline")}
+    assert len(manifest) == 6
+    copy, original = manifest[str(tmp_path / "copy_of_a.md")], manifest[str(tmp_path / "a.txt")]
+    assert copy.chunk_ids == original.chunk_ids and copy.content_hash == original.content_hash
+
+    upserts = writer.upserts
+    again = IngestionPipeline(tool.id, "pipeline", embedder, writer, chunk_size=200, chunk_overlap=20).run(paths)
+    assert again["skipped_files"] == 6 and again["processed_files"] == 0 and writer.upserts == upserts
+    db.close()
+
+
+def test_cancelled_job_resumes_without_re_embedding(tmp_path):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    tool = _tool(db, "pipeline")
+    _corpus(tmp_path, files=30)
+    job = create_ingestion_job(db, tool.id, str(tmp_path))
+    embedder, writer = LocalEmbedder(delay_s=0.02), MemoryWriter()
+    runner = IngestionRunner(
+        progress_interval_s=0.05,
+        pipeline_factory=lambda tool, job_id, counters: IngestionPipeline(
+            tool.id, "resume", embedder, writer, chunk_size=200, chunk_overlap=20, job_id=job_id, embed_batch_size=2, queue_size=1, resumed_counters=counters,
+        ),
+    )
+
+    async def run():
+        runner.start(job.id)
+        await asyncio.sleep(0.3)
+        assert await runner.cancel(job.id)
+        partial = SessionLocal()
+        cancelled = get_ingestion_job_by_id(partial, job.id)
+        assert cancelled.status == IngestionStatus.CANCELLED and 0 < cancelled.processed_files < 32
+        partial.close()
+
+        runner.start(job.id)
+        await runner._tasks[job.id]
+
+    asyncio.run(run())
+    db.refresh(job)
+    assert job.status == IngestionStatus.COMPLETED and job.total_files == 33
+    assert job.processed_files == 32 and job.skipped_files == 1 and job.total_chunks == len(writer.chunks)
+    assert job.stats["docs_per_s"] > 0 and set(job.stats["busy_seconds"]) == {"parse", "chunk", "embed", "write"}
+    assert len(get_ingested_documents(db, tool.id, "resume")) == 33
+    db.close()
+
+
+def test_reindex_only_re_embeds_changed_files_and_drops_removed_ones(tmp_path):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    tool = _tool(db, "pipeline")
+    _corpus(tmp_path, files=10)
+    embedder, writer = LocalEmbedder(), MemoryWriter()
+
+    def reindex():
+        job = create_ingestion_job(db, tool.id, str(tmp_path), mode=IngestionMode.REINDEX)
+        runner = IngestionRunner(pipeline_factory=lambda tool, job_id, counters: IngestionPipeline(
+            tool.id, "reindex", embedder, writer, chunk_size=200, chunk_overlap=20, job_id=job_id, resumed_counters=counters,
+        ))
+
+        async def run():
+            runner.start(job.id)
+            await runner._tasks[job.id]
+
+        asyncio.run(run())
+        db.refresh(job)
+        assert job.status == IngestionStatus.COMPLETED
+        return job
+
+    first = reindex()
+    assert first.processed_files == 12 and first.skipped_files == 1
+    texts = lambda: sorted(text for text, _ in writer.chunks.values())
+    initial_chunks = len(writer.chunks)
+
+    (tmp_path / "sub" / "doc3.txt").write_text("Document 3 now covers returns.")
+    (tmp_path / "sub" / "doc4.txt").unlink()
+    (tmp_path / "a.txt").unlink()  # its content lives on in copy_of_a.md
+    os.utime(tmp_path / "page.html", (1, 1))  # touched, same content
+    calls = embedder.calls
+    second = reindex()
+    assert second.processed_files == 1 and second.removed_files == 2 and second.skipped_files == 10
+    assert embedder.calls == calls + 1
+    assert "Document 3 now covers returns." in texts()
+    assert not any(text.startswith("Document 3.") or text.startswith("Document 4.") for text in texts())
+    assert any(text.startswith("Invoices are paid") for text in texts())
+    assert len(writer.chunks) < initial_chunks
+
+    summary = get_manifest_summary(db, tool.id, "reindex")
+    assert summary["files"] == 11 and summary["chunks"] == len(writer.chunks)
+    third = reindex()
+    assert third.processed_files == 0 and third.skipped_files == 11 and embedder.calls == calls + 1
+    db.close()
+
+
+def test_chunking_or_embedding_model_changes_re_embed_ingested_files(tmp_path):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    tool = _tool(db, "pipeline")
+    _corpus(tmp_path)
+    paths = list_input_files(tmp_path)
+    embedder, writer = LocalEmbedder(), MemoryWriter()
+    pipeline = lambda **settings: IngestionPipeline(tool.id, "settings", embedder, writer, **settings)
+
+    first = pipeline(chunk_size=200, chunk_overlap=20, embedding_model="model-a").run(paths)
+    assert first["processed_files"] == 5 and not first["rebuilt"]
+    small_chunks = set(writer.chunks)
+
+    rechunked = pipeline(chunk_size=400, chunk_overlap=20, embedding_model="model-a").run(paths)
+    assert rechunked["processed_files"] == 5 and rechunked["skipped_files"] == 1 and not rechunked["rebuilt"]
+    assert not small_chunks & set(writer.chunks) and len(writer.chunks) < len(small_chunks)
+    manifest = get_ingested_documents(db, tool.id, "settings")
+    assert {(document.chunk_size, document.embedding_model) for document in manifest} == {(400, "model-a")}
+
+    (tmp_path / "page.html").unlink()
+    rebuilt = pipeline(chunk_size=400, chunk_overlap=20, embedding_model="model-b").run(paths[:2])
+    assert rebuilt["rebuilt"] and rebuilt["processed_files"] == 4 and rebuilt["skipped_files"] == 1
+    db.expire_all()
+    manifest = get_ingested_documents(db, tool.id, "settings")
+    assert len(manifest) == 5 and {document.embedding_model for document in manifest} == {"model-b"}
+    assert get_manifest_summary(db, tool.id, "settings")["chunks"] == len(writer.chunks)
+    db.close()
+
+
+def test_resume_is_refused_while_another_job_of_the_tool_runs(tmp_path, monkeypatch):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    tool = _tool(db, "pipeline")
+    running, cancelled = create_ingestion_job(db, tool.id, str(tmp_path)), create_ingestion_job(db, tool.id, str(tmp_path))
+    started = []
+    monkeypatch.setattr(tools_api, "ingestion_runner", SimpleNamespace(is_running=lambda job_id: job_id == running.id, start=started.append))
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(tools_api.resume_ingestion(cancelled.id, db))
+    assert error.value.status_code == 409 and started == []  # the running job is still pending in the database
+    db.close()
+
+
+def test_ingestion_is_refused_for_rag_libraries_without_a_writer(tmp_path):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    tool = get_tool_by_name(db, "faiss docs") or create_tool(db, "faiss docs", "", ToolType.RAG, {"library": "faiss"}, None, True)
+
+    with pytest.raises(HTTPException) as error:
+        tools_api._get_rag_tool(db, tool.id)
+    assert error.value.status_code == 400 and "faiss" in error.value.detail
+    db.close()
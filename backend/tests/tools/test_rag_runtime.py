@@ -0,0 +1,58 @@
+import ast
+import threading
+import time
+from core.config import root_dir
+from schemas.tools import ToolCreate
+from services.tools.base import RAG_RUNTIME, render_runtime
+from services.tools.factory import get_tool
+
+
+def _runtime() -> dict:
+    namespace = {}
+    exec(render_runtime(RAG_RUNTIME), namespace)
+    return namespace
+
+
+def test_vector_store_is_built_once_across_threads():
+    builds = []
+    store = _runtime()["LazyResource"](lambda: builds.append(time.sleep(0.05)) or object())
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(store.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(builds) == 1 and len({id(result) for result in results}) == 1
+
+
+def test_query_cache_evicts_least_recently_used_and_expired_results():
+    cache = _runtime()["QueryCache"](max_size=2, ttl_s=60)
+    cache.put("a", ["doc a"])
+    cache.put("b", ["doc b"])
+    cache.get("a")
+    cache.put("c", ["doc c"])
+    assert cache.get("a") == ["doc a"] and cache.get("b") is None
+
+    expiring = _runtime()["QueryCache"](max_size=2, ttl_s=0)
+    expiring.put("a", ["doc a"])
+    assert expiring.get("a") is None
+
+
+def test_rag_tools_render_search_settings_and_shared_clients():
+    for library in ("chromadb", "qdrant"):
+        tool = get_tool(ToolCreate(name="docs search", description="", type="rag", is_active=True, config={
+            "library": library, "vector_store_url": "http://localhost:8000", "index_name": "docs", "retriever_top_k": 8, "similarity_threshold": 0.4, "hnsw_ef": 128,
+        }))
+        code = tool.to_code()
+        ast.parse(code)
+        assert "DOCS_SEARCH_TOP_K = 8" in code and "DOCS_SEARCH_HNSW_EF = 128" in code
+        assert "_docs_search_cache = QueryCache(max_size=128" in code and ".warm_up(" in code
+        assert "class LazyResource" not in tool.to_code(include_runtime=False)
+
+
+def test_local_vector_store_path_is_rendered_absolute():
+    for library, client in (("chromadb", "persist_directory="), ("qdrant", "QdrantClient(path=")):
+        tool = get_tool(ToolCreate(name="docs search", description="", type="rag", is_active=True, config={
+            "library": library, "vector_store_path": "storage/vectors", "index_name": "docs",
+        }))
+        assert f'{client}"{root_dir / "storage/vectors"}"' in tool.to_code()
@@ -0,0 +1,27 @@
+from core.templates import TemplateRegistry, template_registry
+from schemas.tools import ToolCreate
+from services.tools.factory import get_tool
+
+
+def _web_search(name: str) -> ToolCreate:
+    return ToolCreate(name=name, description="", type="web_search", config={"library": "duckduckgo", "max_results": 3}, is_active=True)
+
+
+def test_tools_share_compiled_templates():
+    first, second = get_tool(_web_search("search one")), get_tool(_web_search("search two"))
+    assert first.env is second.env is template_registry.env
+
+    first.to_code()
+    loads = template_registry.stats()["loads"]
+    assert "def search_two(" in second.to_code()
+    assert template_registry.stats()["loads"] == loads
+
+
+def test_precompile_and_bytecode_cache(tmp_path):
+    registry = TemplateRegistry(bytecode_cache_dir=str(tmp_path / "bytecode"))
+    assert registry.precompile() == registry.stats()["compiled"] > 0
+    assert any((tmp_path / "bytecode").iterdir())
+
+    loads = registry.stats()["loads"]
+    registry.render("flows/langgraph_main.jinja2", nodes=[], edges=[], llms=[], tools=[])
+    assert registry.stats()["loads"] == loads
@@ -59,7 +59,9 @@ export const FlowCanvas: React.FC<FlowCanvasProps> = ({
     addNode,
     setNodes,
     setEdges,
-    setState
+    setState,
+    target,
+    setTarget
   } = useFlowStore();
   
   // State for the modals
@@ -239,14 +241,16 @@ export const FlowCanvas: React.FC<FlowCanvasProps> = ({
       nodes,
       edges,
       state: stateFields,
+      target,
     };
-  }, [nodes, edges, stateFields]);
+  }, [nodes, edges, stateFields, target]);
 
   // Load a flow from serialized data
   const loadFlow = useCallback((serializedGraph: any) => {
     if (serializedGraph?.nodes && serializedGraph?.edges) {
       setNodes(serializedGraph.nodes);
       setEdges(serializedGraph.edges);
+      setTarget(serializedGraph.target === 'async' ? 'async' : 'sync');
       
       // Load state fields if they exist
       if (serializedGraph.state) {
@@ -262,7 +266,7 @@ export const FlowCanvas: React.FC<FlowCanvasProps> = ({
         setStateFields(stateFields);
       }
     }
-  }, [setNodes, setEdges]);
+  }, [setNodes, setEdges, setTarget]);
 
   const handleAddNode = useCallback((type: NodeType = 'node') => {
     if (!reactFlowWrapper.current) return;
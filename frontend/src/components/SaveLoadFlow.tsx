@@ -122,7 +122,8 @@ const SaveLoadFlow: React.FC<SaveLoadFlowProps> = ({ serializedGraph, onLoad })
               color: edge.markerEnd.color
             } : {"type": "arrowclosed", "color": "#94a3b8"},
             selected: edge.selected || false
-          })) || []
+          })) || [],
+          target: serializedGraph.target || 'sync'
         },
         state: serializedGraph.state && serializedGraph.state.fields 
       ? serializedGraph.state 
@@ -167,7 +168,8 @@ const SaveLoadFlow: React.FC<SaveLoadFlowProps> = ({ serializedGraph, onLoad })
         onLoad({
           nodes: selectedFlow.graph?.nodes || [],
           edges: selectedFlow.graph?.edges || [],
-          state: selectedFlow.state || []
+          state: selectedFlow.state || [],
+          target: selectedFlow.graph?.target || 'sync'
         });
         setSnackbar({
           open: true,
@@ -1,5 +1,5 @@
 import { useState, useRef, useEffect, lazy, Suspense } from 'react';
-import useFlowStore from '../../store/useFlowStore';
+import useFlowStore, { type CodeTarget } from '../../store/useFlowStore';
 import { FiCode } from 'react-icons/fi';
 import { GrDeploy } from "react-icons/gr";
 
@@ -26,6 +26,9 @@ const CodeSidebar = ({ flowId }: CodeSidebarProps) => {
     const [isCollapsed, setIsCollapsed] = useState(false);
     const [selectedFramework, setSelectedFramework] = useState<'langgraph' | 'ms-framework'>('langgraph');
     const [selectedEnvironment, setSelectedEnvironment] = useState<'dev' | 'uat' | 'prod'>('dev');
+    // Saved with the flow as graph.target and restored when it is loaded
+    const selectedTarget = useFlowStore((state) => state.target);
+    const setSelectedTarget = useFlowStore((state) => state.setTarget);
     const sidebarRef = useRef<HTMLDivElement>(null);
 
     const toggleCollapse = () => {
@@ -73,9 +76,11 @@ const CodeSidebar = ({ flowId }: CodeSidebarProps) => {
                 description: `Generated on ${new Date().toLocaleString()}`,
                 graph: {
                     nodes,
-                    edges
+                    edges,
+                    target: selectedTarget
                 },
-                state: { fields: flowState || [] } // Use state from the flow store
+                state: { fields: flowState || [] }, // Use state from the flow store
+                target: selectedTarget
             };
 
             console.log('Sending flow data to backend:', JSON.stringify(flowData, null, 2));
@@ -188,6 +193,16 @@ const CodeSidebar = ({ flowId }: CodeSidebarProps) => {
                         <option value="langgraph">LangGraph</option>
                         <option value="ms-framework">MS Framework</option>
                     </select>
+                    <select
+                        id="target-select"
+                        value={selectedTarget}
+                        onChange={(e) => setSelectedTarget(e.target.value as CodeTarget)}
+                        className="py-2 px-3 rounded-md bg-gray-700 text-white focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-transparent"
+                        title="Generate blocking nodes, or async nodes that serve many sessions on one worker"
+                    >
+                        <option value="sync">Sync</option>
+                        <option value="async">Async</option>
+                    </select>
                     <button
                         onClick={handleGenerateCode}
                         disabled={isGenerating}
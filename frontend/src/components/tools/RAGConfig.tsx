@@ -94,6 +94,22 @@ export const RAGConfig: React.FC<RAGConfigProps> = ({
         </div>
       )}
 
+      <div>
+        <label htmlFor="source_path" className="block text-sm font-medium text-gray-300 mb-1">
+          Source Documents Directory
+        </label>
+        <input
+          type="text"
+          id="source_path"
+          name="config.source_path"
+          className="shadow-sm focus:ring-blue-500 focus:border-blue-500 block w-full sm:text-sm border border-gray-600 rounded-md bg-gray-800 text-white p-2"
+          placeholder="storage/docs"
+          value={formData.config?.source_path || ''}
+          onChange={onInputChange}
+        />
+        <p className="mt-1 text-xs text-gray-400">Re-indexing only re-embeds files changed since the last run and removes deleted ones.</p>
+      </div>
+
       <div className="space-y-4 mt-6">
         <h4 className="text-md font-medium text-gray-300">Retrieval Settings</h4>
         
@@ -4,6 +4,9 @@ import { type StateField } from '../components/StateModal';
 
 export type NodeType = 'node' | 'router' | 'trigger' | 'start' | 'end';
 
+// Generated code: blocking nodes, or async nodes that serve many sessions on one worker
+export type CodeTarget = 'sync' | 'async';
+
 export interface LLMData {
   alias: string;
   provider: string;
@@ -31,11 +34,13 @@ export interface FlowState {
   nodes: Node<NodeData>[];
   edges: Edge[];
   state: StateField[];
+  target: CodeTarget;
   
   // Actions
   setNodes: (nodes: Node<NodeData>[]) => void;
   setEdges: (edges: Edge[]) => void;
   setState: (state: StateField[]) => void;
+  setTarget: (target: CodeTarget) => void;
   
   // Node Actions
   addNode: (node: Node<NodeData>) => void;
@@ -108,11 +113,13 @@ const useFlowStore = create<FlowState>((set, get) => ({
   nodes: [],
   edges: [],
   state: [],
+  target: 'sync',
   
   // Update state
   setNodes: (nodes) => set({ nodes }),
   setEdges: (edges) => set({ edges }),
   setState: (state) => set({ state }),
+  setTarget: (target) => set({ target }),
   
   // Node actions
   addNode: (node) => set((state) => ({ nodes: [...state.nodes, node] })),